@@ -1,6 +1,6 @@
-import requests
 import streamlit as st
 import uuid
+from core.firebase_client import obter_cliente
 
 
 # Pega URL do Firebase dos Secrets
@@ -27,15 +27,11 @@ def autenticar_usuario(usuario, senha):
 
         # Tenta buscar na raiz de usuários (caso você mude a estrutura)
         # Ou ajuste aqui para f"{url_base}Academic_Assistant/usuarios/{usuario}.json" se quiser manter isolado
-        endpoint = f"{url_base}usuarios/{usuario}.json"
-
-        response = requests.get(endpoint, timeout=10)
-
-        if response.status_code != 200:
+        try:
+            dados = obter_cliente(url_base).get_cacheado(f"usuarios/{usuario}")
+        except Exception:
             return False, "Erro de conexão com servidor.", None
 
-        dados = response.json()
-
         if not dados:
             return False, "Usuário não encontrado.", None
 
@@ -66,9 +62,7 @@ def registrar_planilha_usuario(usuario, sheet_id):
     if not url_base: return False
 
     try:
-        endpoint = f"{url_base}usuarios/{usuario}.json"
         # Patch atualiza apenas o campo enviado
-        requests.patch(endpoint, json={"finance_sheet_id": sheet_id})
-        return True
+        return obter_cliente(url_base).patch(f"usuarios/{usuario}", {"finance_sheet_id": sheet_id})
     except:
         return False
\ No newline at end of file
@@ -0,0 +1,61 @@
+"""
+Benchmark do pré-processamento de áudio (core.preprocessamento_audio) sobre
+gravações sintéticas no formato do gravador (WAV 44,1 kHz 16 bits): fala
+simulada com silêncio nas pontas, clipe mudo e clipe só com ruído de fundo.
+Mede o tamanho do upload antes/depois, o tempo do pré-processamento e se os
+clipes sem fala são barrados antes da API.
+
+Uso: python -m benchmarks.bench_audio [segundos_de_fala]
+"""
+import io
+import sys
+import time
+import wave
+
+import numpy as np
+
+from core.preprocessamento_audio import FLAC_AVAILABLE, preparar_audio
+
+
+def gerar_wav(segundos_fala, silencio=1.5, taxa=44100, canais=2, ruido=0.003, semente=7):
+    rnd = np.random.default_rng(semente)
+    t = np.arange(int(segundos_fala * taxa)) / taxa
+    # "Sílabas": tons modulados em rajadas de ~200 ms
+    envelope = (np.sin(2 * np.pi * 2.5 * t) > 0).astype(np.float32)
+    fala = 0.3 * envelope * (np.sin(2 * np.pi * 220 * t) + 0.5 * np.sin(2 * np.pi * 660 * t))
+    pausa = np.zeros(int(silencio * taxa))
+    sinal = np.concatenate([pausa, fala, pausa]) + rnd.normal(0, ruido, len(pausa) * 2 + len(fala))
+    return para_wav(sinal, taxa, canais)
+
+
+def para_wav(sinal, taxa, canais):
+    pcm = (np.clip(sinal, -1, 1) * 32767).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(canais)
+        w.setsampwidth(2)
+        w.setframerate(taxa)
+        w.writeframes(np.repeat(pcm, canais).tobytes())
+    return buffer.getvalue()
+
+
+if __name__ == "__main__":
+    segundos = float(sys.argv[1]) if len(sys.argv) > 1 else 4.0
+    rnd = np.random.default_rng(1)
+    casos = {
+        "fala": gerar_wav(segundos),
+        "mudo": para_wav(np.zeros(44100 * 3), 44100, 2),
+        "só ruído": para_wav(rnd.normal(0, 0.01, 44100 * 3), 44100, 2),
+    }
+    print(f"codec: {'FLAC' if FLAC_AVAILABLE else 'WAV (instale soundfile para FLAC)'}")
+    for nome, bruto in casos.items():
+        inicio = time.perf_counter()
+        for _ in range(10):
+            preparado = preparar_audio(bruto)
+        ms = (time.perf_counter() - inicio) / 10 * 1000
+        if preparado is None:
+            print(f"{nome:9s} {len(bruto) / 1024:7.0f} KB -> barrado (sem fala)      {ms:6.1f} ms")
+        else:
+            arquivo, dados = preparado
+            print(f"{nome:9s} {len(bruto) / 1024:7.0f} KB -> {len(dados) / 1024:6.0f} KB {arquivo:10s}"
+                  f" ({len(bruto) / len(dados):.1f}x menor)  {ms:6.1f} ms")
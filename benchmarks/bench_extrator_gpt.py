@@ -0,0 +1,74 @@
+"""
+Benchmark do ExtratorGPT contra o stub local (benchmarks.stub_openai):
+extração antiga (gpt-4-turbo sem stream, espera o objeto inteiro) contra o
+roteamento por modelo com stream, medindo o tempo até a pergunta de
+follow-up ficar disponível para o TTS e a taxa de escalada.
+
+Uso: python -m benchmarks.bench_extrator_gpt [fração_de_falha_do_modelo_rápido]
+"""
+import json
+import statistics
+import sys
+import time
+
+from openai import OpenAI
+
+from benchmarks.stub_openai import iniciar_em_segundo_plano
+from core.extrator_gpt import ESQUEMA, INSTRUCAO_CONFIANCA, ExtratorGPT
+
+# (dados_parciais, fala)
+TURNOS = [
+    ({}, "comprei um tênis na loja do shopping"),
+    ({"item": "Tênis", "categoria": "Compras"}, "acho que foi uns 250"),
+    ({}, "gastei 30 no almoço hoje com o pessoal do trabalho"),
+    ({"item": "Almoço"}, "paguei com vale refeição"),
+    ({}, "assinei a academia do bairro"),
+    ({"item": "Academia"}, "noventa e nove por mês"),
+]
+
+
+def prompt_de(dados, fala):
+    return (f'Você é o MYND CFO. Extraia dados financeiros. Dados parciais: {json.dumps(dados, ensure_ascii=False)}\n'
+            f'Frase: "{fala}"\nJSON OBRIGATÓRIO: {ESQUEMA}\n{INSTRUCAO_CONFIANCA}')
+
+
+def antigo(client, dados, fala):
+    inicio = time.perf_counter()
+    resp = client.chat.completions.create(model="gpt-4-turbo",
+                                          messages=[{"role": "system", "content": prompt_de(dados, fala)}],
+                                          response_format={"type": "json_object"})
+    json.loads(resp.choices[0].message.content)
+    fim = time.perf_counter() - inicio
+    return fim, fim
+
+
+def novo(extrator, dados, fala):
+    inicio = time.perf_counter()
+    pergunta = []
+    resultado, _ = extrator.extrair(fala, dados, prompt_de(dados, fala),
+                                    ao_pergunta=lambda p: pergunta.append(time.perf_counter() - inicio))
+    fim = time.perf_counter() - inicio
+    return (pergunta[0] if pergunta else fim), fim
+
+
+if __name__ == "__main__":
+    falha = float(sys.argv[1]) if len(sys.argv) > 1 else 0.1
+    servidor, base_url = iniciar_em_segundo_plano(falha_rapido=falha, semente=1)
+    client = OpenAI(api_key="stub", base_url=base_url)
+    extrator = ExtratorGPT(client)
+
+    resultados = {"antigo": [], "novo": []}
+    for _ in range(3):
+        for dados, fala in TURNOS:
+            resultados["antigo"].append(antigo(client, dados, fala))
+            resultados["novo"].append(novo(extrator, dados, fala))
+    servidor.shutdown()
+
+    print(f"{len(TURNOS) * 3} turnos, falha do modelo rápido {falha:.0%}")
+    for nome, tempos in resultados.items():
+        pergunta = [p for p, _ in tempos]
+        total = [t for _, t in tempos]
+        print(f"{nome:7s} pergunta p50 {statistics.median(pergunta) * 1000:6.0f} ms   "
+              f"objeto p50 {statistics.median(total) * 1000:6.0f} ms   "
+              f"p95 {sorted(total)[int(0.95 * (len(total) - 1))] * 1000:6.0f} ms")
+    print(f"chamadas: {dict(extrator.contagem)}")
@@ -0,0 +1,113 @@
+"""
+Benchmark do caminho rápido de extração (core.extrator_regras) sobre um corpus
+rotulado de falas reais de follow-up. Mede a taxa de acerto (falas resolvidas
+sem GPT), a precisão dessas respostas, os falsos positivos (falas que deveriam
+ir ao GPT) e a latência das regras contra a latência típica do GPT.
+
+esperado=None significa "tem que ir ao GPT" (item/categoria novos, frase ambígua).
+
+Uso: python -m benchmarks.bench_extrator_regras [latencia_gpt_segundos]
+"""
+import sys
+import time
+
+from core.extrator_regras import extrair_por_regras
+
+LATENCIA_GPT = 1.8  # p50 observado do gpt-4-turbo com response_format json
+
+TENIS = {"item": "Tênis", "categoria": "Compras"}
+TENIS_VALOR = {"item": "Tênis", "categoria": "Compras", "valor": 250.0}
+LANCHE = {"item": "Lanche", "categoria": "Alimentação"}
+LANCHE_VALOR = {"item": "Lanche", "categoria": "Alimentação", "valor": 32.0}
+
+CORPUS = [
+    # (dados_parciais, fala, esperado)
+    (TENIS, "250 reais", {"valor": 250.0}),
+    (TENIS, "duzentos e cinquenta reais", {"valor": 250.0}),
+    (TENIS, "R$ 249,90", {"valor": 249.9}),
+    (TENIS, "foi 1.200 reais", {"valor": 1200.0}),
+    (TENIS, "custou cento e vinte e cinco", {"valor": 125.0}),
+    (TENIS, "vinte e nove reais e noventa", {"valor": 29.9}),
+    (TENIS, "mil e quinhentos", {"valor": 1500.0}),
+    (TENIS, "paguei 45,90 no pix", {"valor": 45.9, "pagamento": "Pix"}),
+    (TENIS_VALOR, "Débito.", {"pagamento": "Débito"}),
+    (TENIS_VALOR, "no crédito", {"pagamento": "Crédito"}),
+    (TENIS_VALOR, "foi no cartão de crédito", {"pagamento": "Crédito"}),
+    (TENIS_VALOR, "Pix", {"pagamento": "Pix"}),
+    (TENIS_VALOR, "em dinheiro", {"pagamento": "Dinheiro"}),
+    (TENIS_VALOR, "boleto", {"pagamento": "Boleto"}),
+    ({**TENIS_VALOR, "pagamento": "Pix"}, "online", {"local_compra": "Online"}),
+    ({**TENIS_VALOR, "pagamento": "Pix"}, "foi pela internet", {"local_compra": "Online"}),
+    ({**TENIS_VALOR, "pagamento": "Pix"}, "loja física", {"local_compra": "Loja Física"}),
+    ({**TENIS_VALOR, "pagamento": "Pix"}, "presencial", {"local_compra": "Loja Física"}),
+    ({**TENIS_VALOR, "pagamento": "Pix"}, "no aplicativo", {"local_compra": "Online"}),
+    (LANCHE, "32 reais no débito", {"valor": 32.0, "pagamento": "Débito"}),
+    (LANCHE, "trinta e dois", {"valor": 32.0}),
+    (LANCHE_VALOR, "crédito", {"pagamento": "Crédito"}),
+    (LANCHE, "cinquenta centavos", {"valor": 0.5}),
+    ({"item": "Netflix", "categoria": "Assinaturas", "valor": 55.9}, "crédito, todo mês",
+     {"pagamento": "Crédito", "recorrencia": "Mensal"}),
+    ({"item": "Academia", "categoria": "Saúde", "valor": 99.0}, "mensal no pix",
+     {"pagamento": "Pix", "recorrencia": "Mensal"}),
+    (TENIS, "cancela", {"cancelar": True}),
+    (TENIS_VALOR, "esquece", {"cancelar": True}),
+    (LANCHE, "deixa pra lá", {"cancelar": True}),
+    (LANCHE, "cancelar tudo", {"cancelar": True}),
+    (TENIS, "Não, pode cancelar isso.", {"cancelar": True}),
+    # Tem que ir ao GPT
+    ({}, "comprei um tênis de 250 reais no pix", None),
+    ({}, "gastei 30 reais de uber", None),
+    ({}, "almoço 42 reais débito", None),
+    (TENIS, "na verdade foi uma camisa", None),
+    (TENIS_VALOR, "sim", None),
+    (TENIS_VALOR, "não sei", None),
+    (LANCHE, "32 reais e mais 10 de gorjeta", None),
+    ({}, "quanto eu gastei esse mês", None),
+    (TENIS_VALOR, "metade no pix e metade no débito", None),
+    ({}, "mercado 180 no crédito", None),
+    (LANCHE, "paguei o cancelamento do plano 50 reais", None),
+    ({}, "taxa de cancelamento 30 reais", None),
+]
+
+
+def confere(resultado, esperado):
+    if esperado is None or resultado is None:
+        return False
+    return all(resultado.get(k) == v for k, v in esperado.items())
+
+
+if __name__ == "__main__":
+    latencia_gpt = float(sys.argv[1]) if len(sys.argv) > 1 else LATENCIA_GPT
+    repeticoes = 200
+
+    acertos = corretos = falsos_positivos = perdidos = 0
+    for parciais, fala, esperado in CORPUS:
+        resultado = extrair_por_regras(fala, dict(parciais))
+        if resultado is None:
+            if esperado is not None:
+                perdidos += 1
+                print(f"  → GPT (perdido): {fala!r}")
+            continue
+        acertos += 1
+        if esperado is None:
+            falsos_positivos += 1
+            print(f"  ✗ falso positivo: {fala!r} -> {resultado}")
+        elif confere(resultado, esperado):
+            corretos += 1
+        else:
+            print(f"  ✗ errado: {fala!r} -> {resultado} (esperado {esperado})")
+
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        for parciais, fala, _ in CORPUS:
+            extrair_por_regras(fala, parciais)
+    por_fala = (time.perf_counter() - inicio) / (repeticoes * len(CORPUS))
+
+    resolviveis = sum(1 for *_, esperado in CORPUS if esperado is not None)
+    print(f"{len(CORPUS)} falas ({resolviveis} resolvíveis por regra)")
+    print(f"resolvidas sem GPT:  {acertos}/{len(CORPUS)} ({acertos / len(CORPUS):.0%})"
+          f"  cobertura das resolvíveis: {corretos}/{resolviveis}")
+    print(f"corretas:            {corretos}/{acertos}  falsos positivos: {falsos_positivos}  perdidas: {perdidos}")
+    print(f"latência das regras: {por_fala * 1e6:.1f} µs/fala (GPT ~{latencia_gpt:.1f} s)")
+    print(f"economia estimada:   {acertos * latencia_gpt:.1f} s no corpus, "
+          f"{acertos / len(CORPUS) * latencia_gpt * 1000:.0f} ms por fala em média")
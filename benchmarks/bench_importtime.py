@@ -0,0 +1,99 @@
+"""
+Orçamento de cold start: mede, com `python -X importtime`, os imports que cada
+app faz antes do primeiro frame e falha (exit 1) se algum passar do orçamento
+ou não puder ser medido (ex: dependência faltando).
+
+- webapp.py: imports de módulo até o primeiro `st.stop()` (tela de login)
+- mobile_main.py: todos os imports de módulo (os de dentro de funções são lazy)
+
+Os imports são lidos do código com ast, então o script não executa os apps.
+Cada medição roda num interpretador novo; vale a menor de algumas rodadas.
+
+Uso: python -m benchmarks.bench_importtime [--webapp-ms 900] [--mobile-ms 700] [--rodadas 3]
+"""
+import argparse
+import ast
+import os
+import re
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ORCAMENTO_MS = {"webapp.py": 900, "mobile_main.py": 700}
+LINHA = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def _e_st_stop(no):
+    return any(isinstance(n, ast.Call) and ast.unparse(n.func) == "st.stop" for n in ast.walk(no))
+
+
+def imports_de_abertura(arquivo, parar_em_st_stop=False):
+    """Imports de nível de módulo (inclusive dentro de try/if) executados na abertura."""
+    with open(os.path.join(RAIZ, arquivo), encoding="utf-8") as f:
+        arvore = ast.parse(f.read())
+    linhas = []
+
+    def visitar(nos):
+        for no in nos:
+            if parar_em_st_stop and _e_st_stop(no):
+                return True
+            if isinstance(no, (ast.Import, ast.ImportFrom)):
+                linhas.append(ast.unparse(no))
+            elif isinstance(no, ast.Try):
+                visitar(no.body)
+            elif isinstance(no, ast.If) and "__main__" not in ast.unparse(no.test):
+                visitar(no.body)
+        return False
+
+    visitar(arvore.body)
+    return linhas
+
+
+def medir(imports, rodadas=3):
+    """-> (ms total, [(ms, módulo)] dos mais caros, erro ou None)"""
+    codigo = "\n".join(imports)
+    melhor = None
+    for _ in range(rodadas):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", codigo],
+                              cwd=RAIZ, capture_output=True, text=True)
+        if proc.returncode != 0:
+            erro = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "falhou"
+            return None, [], erro
+        total, modulos = 0, []
+        for linha in proc.stderr.splitlines():
+            m = LINHA.match(linha)
+            if not m:
+                continue
+            cumulativo, recuo, nome = int(m.group(2)), m.group(3), m.group(4)
+            if not recuo:  # só os de primeiro nível somam no total
+                total += cumulativo
+                modulos.append((cumulativo / 1000, nome))
+        if melhor is None or total < melhor[0]:
+            melhor = (total, modulos)
+    return melhor[0] / 1000, sorted(melhor[1], reverse=True)[:8], None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--webapp-ms", type=float, default=ORCAMENTO_MS["webapp.py"])
+    parser.add_argument("--mobile-ms", type=float, default=ORCAMENTO_MS["mobile_main.py"])
+    parser.add_argument("--rodadas", type=int, default=3)
+    args = parser.parse_args()
+
+    alvos = [
+        ("webapp.py", imports_de_abertura("webapp.py", parar_em_st_stop=True), args.webapp_ms),
+        ("mobile_main.py", imports_de_abertura("mobile_main.py"), args.mobile_ms),
+    ]
+    estourou = False
+    for arquivo, imports, orcamento in alvos:
+        ms, pesados, erro = medir(imports, args.rodadas)
+        if erro:  # sem medida não há como provar que cabe no orçamento: conta como estouro
+            print(f"❌ {arquivo}: não medido ({erro})")
+            estourou = True
+            continue
+        ok = ms <= orcamento
+        estourou |= not ok
+        print(f"{'✅' if ok else '❌'} {arquivo}: {ms:.0f} ms de imports (orçamento {orcamento:.0f} ms)")
+        for tempo, nome in pesados:
+            print(f"     {tempo:7.1f} ms  {nome}")
+    sys.exit(1 if estourou else 0)
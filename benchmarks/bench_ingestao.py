@@ -0,0 +1,78 @@
+"""
+Benchmark da ingestão do ledger: caminho antigo do dashboard (apply de
+limpar_moeda linha a linha + to_numeric) contra core.ingestao.tipar_ledger.
+"antigo" mede só o valor, como o dashboard fazia; "antigo tipado" acrescenta
+to_datetime e category pelo caminho pandas comum, para comparar o mesmo resultado.
+
+Uso: python -m benchmarks.bench_ingestao [linhas]
+"""
+import random
+import sys
+import time
+
+import pandas as pd
+
+from core.armazenamento import COLUNAS
+from core.ingestao import FORMATO_DATA, limpar_moeda, tipar_ledger
+
+
+def gerar_payload(n, semente=42):
+    rnd = random.Random(semente)
+    categorias = ["Lanche", "Mercado", "Compras", "Compras Online", "Transporte", "Lazer"]
+    pagamentos = ["Débito", "Crédito", "Pix", "Dinheiro"]
+    formatos = ["R$ {:,.2f}", "{:.2f}", "{:,.2f}"]
+    linhas = [COLUNAS]
+    for i in range(n):
+        valor = rnd.uniform(1, 5000)
+        texto = rnd.choice(formatos).format(valor).replace(",", "X").replace(".", ",").replace("X", ".")
+        linhas.append([
+            f"{rnd.randint(1, 28):02d}/{rnd.randint(1, 12):02d}/2025 {rnd.randint(0, 23):02d}:00:00",
+            f"item {i}", texto, rnd.choice(categorias), rnd.choice(pagamentos), "",
+            rnd.choice(["Único", "Mensal"]), "Confirmado"
+        ])
+    return linhas
+
+
+def antigo(payload):
+    df = pd.DataFrame(payload[1:], columns=payload[0])
+    df["Valor"] = df["Valor"].apply(limpar_moeda)
+    df["Valor"] = pd.to_numeric(df["Valor"], errors='coerce').fillna(0)
+    return df
+
+
+def antigo_tipado(payload):
+    df = antigo(payload)
+    df["Data/Hora"] = pd.to_datetime(df["Data/Hora"], format=FORMATO_DATA, errors='coerce')
+    for col in ["Categoria", "Pagamento", "Recorrência"]:
+        df[col] = df[col].astype("category")
+    return df
+
+
+def medir(func, payload, repeticoes=5):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        df = func(payload)
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), df
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    payload = gerar_payload(n)
+
+    t_antigo, df_antigo = medir(antigo, payload)
+    t_tipado, df_tipado = medir(antigo_tipado, payload)
+    t_novo, df_novo = medir(tipar_ledger, payload)
+
+    assert (df_antigo["Valor"] == df_novo["Valor"]).all(), "valores divergentes"
+    assert (df_tipado["Data/Hora"] == df_novo["Data/Hora"]).all(), "datas divergentes"
+
+    def mb(df):
+        return df.memory_usage(deep=True).sum() / 1e6
+
+    print(f"{n} linhas")
+    print(f"antigo (apply, só valor):          {t_antigo * 1000:8.1f} ms  {mb(df_antigo):6.1f} MB")
+    print(f"antigo tipado (valor+data+cat):    {t_tipado * 1000:8.1f} ms  {mb(df_tipado):6.1f} MB")
+    print(f"tipar_ledger (valor+data+cat):     {t_novo * 1000:8.1f} ms  {mb(df_novo):6.1f} MB")
+    print(f"speedup: {t_tipado / t_novo:.1f}x (mesmo resultado), {t_antigo / t_novo:.1f}x (vs. só valor)")
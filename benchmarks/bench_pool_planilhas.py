@@ -0,0 +1,182 @@
+"""
+Benchmark do pool de planilhas (core.pool_planilhas) com dublês em memória:
+DriveFalso (cópia com latência configurável, como a Drive API) e FirebaseFalso
+(get/put com a mesma semântica de ETag nulo do ClienteFirebase).
+
+Mede o tempo do primeiro login com cópia síncrona (como era) e com o pool,
+e confere que logins simultâneos nunca recebem a mesma planilha, nem quem
+reivindica a partir de uma lista do pool lida antes de outra planilha ser concluída.
+
+Uso: python -m benchmarks.bench_pool_planilhas [latencia_copia_s] [logins_simultaneos]
+"""
+import copy
+import hashlib
+import json
+import statistics
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from core.firebase_client import NULL_ETAG
+from core.pool_planilhas import ProvisionadorPlanilhas
+
+
+class DriveFalso:
+    """Drive em memória: cada cópia demora `latencia` segundos e gera um id novo."""
+
+    def __init__(self, latencia=2.0):
+        self.latencia = latencia
+        self.arquivos = {}
+        self._lock = threading.Lock()
+
+    def copiar(self, template_id, nome):
+        time.sleep(self.latencia)
+        novo_id = uuid.uuid4().hex
+        with self._lock:
+            self.arquivos[novo_id] = {"nome": nome, "origem": template_id}
+        return novo_id
+
+    def renomear(self, arquivo_id, nome):
+        with self._lock:
+            self.arquivos[arquivo_id]["nome"] = nome
+
+
+class FirebaseFalso:
+    """Realtime Database em memória com get/put/delete e escrita condicional por ETag."""
+
+    def __init__(self, latencia=0.05):
+        self.latencia = latencia
+        self.raiz = {}
+        self._lock = threading.Lock()
+
+    def _partes(self, caminho):
+        return [p for p in caminho.strip("/").split("/") if p]
+
+    def _ler(self, caminho):
+        no = self.raiz
+        for parte in self._partes(caminho):
+            if not isinstance(no, dict) or parte not in no:
+                return None
+            no = no[parte]
+        return copy.deepcopy(no)
+
+    def _etag(self, dados):
+        return NULL_ETAG if dados is None else hashlib.md5(json.dumps(dados, sort_keys=True).encode()).hexdigest()
+
+    def get(self, caminho):
+        time.sleep(self.latencia)
+        with self._lock:
+            return self._ler(caminho)
+
+    def get_com_etag(self, caminho):
+        time.sleep(self.latencia)
+        with self._lock:
+            dados = self._ler(caminho)
+            return dados, self._etag(dados)
+
+    def put(self, caminho, dados, etag=None):
+        time.sleep(self.latencia)
+        partes = self._partes(caminho)
+        with self._lock:
+            if etag and etag != self._etag(self._ler(caminho)):
+                return False
+            no = self.raiz
+            for parte in partes[:-1]:
+                no = no.setdefault(parte, {})
+            no[partes[-1]] = copy.deepcopy(dados)
+            return True
+
+    def delete(self, caminho):
+        time.sleep(self.latencia)
+        partes = self._partes(caminho)
+        with self._lock:
+            no = self.raiz
+            for parte in partes[:-1]:
+                no = no.get(parte, {})
+            no.pop(partes[-1], None)
+            return True
+
+
+def login_sem_pool(drive, firebase, usuario):
+    sheet_id = drive.copiar("TEMPLATE", f"MYND_Finance_{usuario}")
+    firebase.put(f"users/{usuario}/sheet_id", sheet_id)
+    return sheet_id
+
+
+def login_com_pool(provisionador, drive, firebase, usuario):
+    sheet_id = provisionador.reivindicar(usuario) or drive.copiar("TEMPLATE", f"MYND_Finance_{usuario}")
+    firebase.put(f"users/{usuario}/sheet_id", sheet_id)
+    provisionador.concluir(sheet_id)
+    return sheet_id
+
+
+def medir(func, *args):
+    inicio = time.perf_counter()
+    resultado = func(*args)
+    return time.perf_counter() - inicio, resultado
+
+
+if __name__ == "__main__":
+    latencia = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    simultaneos = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    drive, firebase = DriveFalso(latencia), FirebaseFalso()
+    sem_pool = [medir(login_sem_pool, drive, firebase, f"antigo{i}")[0] for i in range(3)]
+
+    drive, firebase = DriveFalso(latencia), FirebaseFalso()
+    prov = ProvisionadorPlanilhas(drive, firebase, "TEMPLATE", alvo=simultaneos)
+    prov.reabastecer()
+    prov.iniciar()
+
+    # Logins simultâneos disputando o pool: todos devem receber planilhas diferentes
+    with ThreadPoolExecutor(simultaneos) as executor:
+        resultados = list(executor.map(lambda i: medir(login_com_pool, prov, drive, firebase, f"user{i}"),
+                                       range(simultaneos)))
+    tempos = [t for t, _ in resultados]
+    ids = [sid for _, sid in resultados]
+    assert len(set(ids)) == len(ids), "planilha entregue a dois usuários"
+
+    # Relogin de quem reivindicou mas não gravou no perfil: recebe a mesma planilha
+    while not prov.livres():  # espera a reposição em segundo plano
+        time.sleep(0.1)
+    reservada = prov.reivindicar("caiu_antes_do_perfil")
+    assert reservada and prov.reivindicar("caiu_antes_do_perfil") == reservada
+
+    # Concluídas saem do pool: o nó lido a cada login não cresce com o número de usuários
+    prov.concluir(reservada)
+    time.sleep(latencia + 1)
+    pool = firebase.get("pool_planilhas") or {}
+    assert not set(ids) & set(pool), "planilha concluída continua no pool"
+    tamanho_pool = len(pool)
+
+    # Lista velha do pool: B leu o pool, A reivindicou, concluiu e o nó foi apagado; B não pode
+    # ficar com a planilha de A nem deixar um nó `{dono: B}` órfão
+    drive_b, firebase_b = DriveFalso(0), FirebaseFalso(0)
+    prov_a = ProvisionadorPlanilhas(drive_b, firebase_b, "TEMPLATE", alvo=1)
+    prov_a.reabastecer()
+    lista_velha = firebase_b.get("pool_planilhas")
+    da_a = prov_a.reivindicar("A")
+    prov_a.concluir(da_a)
+    prov_a._apagar_concluidas()
+    prov_b = ProvisionadorPlanilhas(drive_b, firebase_b, "TEMPLATE", alvo=1)
+    prov_b._pool = lambda: copy.deepcopy(lista_velha)
+    assert prov_b.reivindicar("B") is None, "planilha concluída entregue de novo"
+    assert firebase_b.get(f"pool_planilhas/{da_a}") is None, "nó órfão deixado no pool"
+
+    # Pool vazio: cai na cópia síncrona
+    prov.alvo = 0
+    pool = firebase.get("pool_planilhas") or {}
+    for sid, info in pool.items():
+        if not info.get("dono"):
+            firebase.put(f"pool_planilhas/{sid}/dono", "esgotado")
+    t_vazio, _ = medir(login_com_pool, prov, drive, firebase, "tardio")
+
+    print(f"cópia do Drive simulada: {latencia:.1f} s")
+    print(f"sem pool:    primeiro login p50 {statistics.median(sem_pool) * 1000:7.0f} ms")
+    print(f"com pool:    primeiro login p50 {statistics.median(tempos) * 1000:7.0f} ms  "
+          f"max {max(tempos) * 1000:7.0f} ms ({simultaneos} simultâneos, ids únicos)")
+    print(f"pool vazio:  primeiro login     {t_vazio * 1000:7.0f} ms (cópia na hora)")
+    print(f"cópias em segundo plano: {prov.copias}, reivindicadas: {prov.reivindicadas}, "
+          f"nós no pool depois dos logins: {tamanho_pool}")
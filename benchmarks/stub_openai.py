@@ -0,0 +1,136 @@
+"""
+Servidor local que imita POST /v1/chat/completions da OpenAI (com e sem stream),
+para exercitar o ExtratorGPT sem rede nem custo.
+
+Cada modelo tem um tempo até o primeiro token e um tempo por pedaço; a resposta
+é montada a partir da fala no prompt (valor = primeiro número, confiança alta
+para falas curtas). --falha-rapido faz o modelo rápido devolver JSON quebrado
+nessa fração das chamadas, para testar a escalada.
+
+Uso: python -m benchmarks.stub_openai [--porta 8765] [--falha-rapido 0.2]
+     OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=x python mobile_main.py
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# modelo -> (segundos até o primeiro token, segundos por pedaço)
+LATENCIAS = {
+    "gpt-4o-mini": (0.25, 0.004),
+    "gpt-4-turbo": (0.9, 0.025),
+}
+LATENCIA_PADRAO = (0.5, 0.01)
+TAMANHO_PEDACO = 4  # caracteres por chunk, perto de um token
+
+
+def responder(prompt, modelo, falha):
+    """Monta o JSON de extração a partir da fala citada no prompt."""
+    fala = re.search(r'(?:User|Frase): "(.*?)"', prompt, re.S)
+    fala = fala.group(1) if fala else ""
+    numero = re.search(r"\d+(?:[.,]\d+)?", fala)
+    valor = float(numero.group().replace(",", ".")) if numero else None
+    curta = len(fala.split()) <= 8
+    dados = {
+        "cancelar": "cancel" in fala.lower(),
+        "confianca": 0.9 if curta or modelo != "gpt-4o-mini" else 0.4,
+        "missing_info": None if valor else "Qual o valor?",
+        "item": None if curta else fala.split()[0],
+        "valor": valor,
+        "categoria": None,
+        "pagamento": None,
+        "recorrencia": "Único",
+        "local_compra": None,
+    }
+    texto = json.dumps(dados, ensure_ascii=False)
+    if falha:
+        texto = texto[: len(texto) // 2]
+    return texto
+
+
+def criar_servidor(porta=0, falha_rapido=0.0, semente=None):
+    rnd = random.Random(semente)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.0"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            if not self.path.endswith("/chat/completions"):
+                self.send_error(404)
+                return
+            corpo = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            modelo = corpo.get("model", "")
+            prompt = "\n".join(m.get("content", "") for m in corpo.get("messages", []))
+            falha = modelo == "gpt-4o-mini" and rnd.random() < falha_rapido
+            texto = responder(prompt, modelo, falha)
+            primeiro, por_pedaco = LATENCIAS.get(modelo, LATENCIA_PADRAO)
+            ident = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+            time.sleep(primeiro)
+
+            if not corpo.get("stream"):
+                time.sleep(por_pedaco * len(texto) / TAMANHO_PEDACO)
+                self._json({
+                    "id": ident, "object": "chat.completion", "created": int(time.time()), "model": modelo,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": texto},
+                                 "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(texto) // 4,
+                              "total_tokens": (len(prompt) + len(texto)) // 4},
+                })
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+
+            def evento(delta, fim=None):
+                dados = {"id": ident, "object": "chat.completion.chunk", "created": int(time.time()),
+                         "model": modelo, "choices": [{"index": 0, "delta": delta, "finish_reason": fim}]}
+                self.wfile.write(f"data: {json.dumps(dados, ensure_ascii=False)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+            try:
+                evento({"role": "assistant", "content": ""})
+                for i in range(0, len(texto), TAMANHO_PEDACO):
+                    evento({"content": texto[i:i + TAMANHO_PEDACO]})
+                    time.sleep(por_pedaco)
+                evento({}, "stop")
+                self.wfile.write(b"data: [DONE]\n\n")
+            except OSError:  # cliente desistiu do stream
+                pass
+
+        def _json(self, dados):
+            corpo = json.dumps(dados, ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", porta), Handler)
+    servidor.daemon_threads = True
+    return servidor
+
+
+def iniciar_em_segundo_plano(falha_rapido=0.0, semente=None):
+    """Sobe o stub numa porta livre; retorna (servidor, base_url)."""
+    servidor = criar_servidor(0, falha_rapido, semente)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://127.0.0.1:{servidor.server_port}/v1"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--falha-rapido", type=float, default=0.0)
+    args = parser.parse_args()
+    servidor = criar_servidor(args.porta, args.falha_rapido)
+    print(f"✅ Stub OpenAI em http://127.0.0.1:{servidor.server_port}/v1")
+    servidor.serve_forever()
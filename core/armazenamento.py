@@ -0,0 +1,318 @@
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import Counter
+from datetime import datetime
+
+import pandas as pd
+
+from core.ingestao import limpar_moeda, tipar_ledger
+from core.rollups import Rollups
+
+# Colunas do ledger: Data/Hora | Item | Valor | Categoria | Pagamento | Local Compra | Recorrência | Status
+COLUNAS = ["Data/Hora", "Item", "Valor", "Categoria", "Pagamento", "Local Compra", "Recorrência", "Status"]
+FORMATO_DATA = "%d/%m/%Y %H:%M:%S"
+LEDGER_PADRAO = "mynd_ledger.db"
+
+
+def montar_linha(dados_json, status="Confirmado", agora=None):
+    """Monta a linha do ledger a partir do JSON extraído (única regra de categoria do projeto)."""
+    timestamp = (agora or datetime.now()).strftime(FORMATO_DATA)
+
+    categoria = dados_json.get("categoria") or "Compras"
+    local_compra = dados_json.get("local_compra") or ""
+
+    # Se for compra online, muda a categoria
+    if categoria == "Compras" and local_compra == "Online":
+        categoria = "Compras Online"
+
+    return [
+        timestamp,
+        dados_json.get("item") or "",
+        dados_json.get("valor") or 0.0,
+        categoria,
+        dados_json.get("pagamento") or "Débito",
+        local_compra,
+        dados_json.get("recorrencia") or "Único",
+        status
+    ]
+
+
+def _filtro_meses(meses):
+    """Trecho SQL (e parâmetros) que limita `momento` aos meses AAAA-MM pedidos, usando o índice."""
+    if meses is None:
+        return "", ()
+    if not meses:
+        return "AND 0", ()
+    meses = sorted(meses)
+    inicio, fim = meses[0], meses[-1]
+    ano, mes = int(fim[:4]), int(fim[5:])
+    depois = f"{ano + mes // 12:04d}-{mes % 12 + 1:02d}"
+    filtro = "AND momento >= ? AND momento < ?"
+    params = (inicio, depois)
+    if len(meses) < len(_meses_entre(inicio, fim)):  # meses salteados
+        filtro += f" AND substr(momento, 1, 7) IN ({', '.join('?' * len(meses))})"
+        params += tuple(meses)
+    return filtro, params
+
+
+def _meses_entre(inicio, fim):
+    ano, mes = int(inicio[:4]), int(inicio[5:])
+    meses = []
+    while f"{ano:04d}-{mes:02d}" <= fim:
+        meses.append(f"{ano:04d}-{mes:02d}")
+        ano, mes = (ano, mes + 1) if mes < 12 else (ano + 1, 1)
+    return meses
+
+
+class Armazenamento(ABC):
+    """
+    Interface do ledger. `sheet_id` identifica o ledger de cada usuário
+    (None = planilha padrão do app mobile). `meses` limita a leitura a uma
+    lista de meses AAAA-MM (None = histórico inteiro).
+    """
+
+    @abstractmethod
+    def gravar(self, sheet_id, linhas):
+        ...
+
+    @abstractmethod
+    def dados(self, sheet_id, meses=None):
+        """DataFrame tipado (ver core.ingestao) com as linhas do ledger."""
+
+    @abstractmethod
+    def rollups(self, sheet_id, meses=None):
+        """Rollups (core.rollups) com os totais do ledger."""
+
+    def total(self, sheet_id, meses=None):
+        return self.rollups(sheet_id, meses).total
+
+    def totais_por_categoria(self, sheet_id, meses=None):
+        """DataFrame [Categoria, Valor] com a soma por categoria."""
+        return self.rollups(sheet_id, meses).tabela("categoria")
+
+    @abstractmethod
+    def pagina(self, sheet_id, n=10, cursor=None, meses=None):
+        """
+        Até `n` linhas anteriores ao `cursor` (None = as mais recentes), em ordem cronológica.
+        -> (DataFrame, cursor da página seguinte ou None quando não há mais)
+        """
+
+    def recentes(self, sheet_id, n=10, meses=None):
+        return self.pagina(sheet_id, n, None, meses)[0]
+
+    @abstractmethod
+    def revisao(self, sheet_id):
+        """Marcador barato que muda quando o ledger muda (o painel só redesenha quando ele muda)."""
+
+
+class ArmazenamentoSheets(Armazenamento):
+    """
+    Google Sheets como armazenamento principal: grava pela fila (uma aba por mês)
+    e lê pelo LeitorParticoes (core.particoes), só das partições pedidas.
+    """
+
+    def __init__(self, fila, leitor):
+        self.fila = fila
+        self.leitor = leitor
+
+    def gravar(self, sheet_id, linhas):
+        self.fila.enfileirar_lote(sheet_id, linhas)
+
+    def dados(self, sheet_id, meses=None):
+        return self.leitor.dados(sheet_id, meses)
+
+    def rollups(self, sheet_id, meses=None):
+        return self.leitor.rollups(sheet_id, meses)
+
+    def pagina(self, sheet_id, n=10, cursor=None, meses=None):
+        return self.leitor.pagina(sheet_id, n, cursor, meses)
+
+    def revisao(self, sheet_id):
+        return self.leitor.revisao(sheet_id)
+
+
+class ArmazenamentoSQLite(Armazenamento):
+    """
+    Ledger local em SQLite, indexado por data, categoria e pagamento.
+
+    Com `espelho` (uma FilaGravacao), cada linha também é enviada ao Google Sheets
+    em segundo plano. Com `origem` (função sheet_id -> DataFrame), o histórico da
+    planilha é importado uma vez, na primeira leitura de um ledger ainda vazio.
+    Se a importação falha, os gastos gravados até ela dar certo também vão para a
+    planilha pelo espelho; ao importar, as linhas da planilha que já estão no SQLite
+    (mesmo momento, item e valor) são puladas, para não entrarem duas vezes.
+    """
+
+    def __init__(self, caminho=LEDGER_PADRAO, espelho=None, origem=None):
+        self.espelho = espelho
+        self.origem = origem
+        self._lock = threading.Lock()
+        self._lock_preparo = threading.Lock()
+        self._prontos = set()
+        self._rollups = {}  # ledger -> Rollups, mantidos a cada gravar
+        self._conn = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS gastos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ledger TEXT NOT NULL,
+                momento TEXT NOT NULL,
+                item TEXT,
+                valor REAL NOT NULL DEFAULT 0,
+                categoria TEXT,
+                pagamento TEXT,
+                local_compra TEXT,
+                recorrencia TEXT,
+                status TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_gastos_momento ON gastos (ledger, momento);
+            CREATE INDEX IF NOT EXISTS idx_gastos_categoria ON gastos (ledger, categoria, valor);
+            CREATE INDEX IF NOT EXISTS idx_gastos_pagamento ON gastos (ledger, pagamento, valor);
+            CREATE TABLE IF NOT EXISTS ledgers (ledger TEXT PRIMARY KEY);
+        """)
+
+    def gravar(self, sheet_id, linhas):
+        self._preparar(sheet_id)
+        self._inserir(sheet_id, linhas)
+        if self.espelho is not None:
+            self.espelho.enfileirar_lote(sheet_id, linhas)
+
+    def dados(self, sheet_id, meses=None):
+        filtro, params = _filtro_meses(meses)
+        return self._consultar(sheet_id, f"{filtro} ORDER BY momento, id", params)
+
+    def rollups(self, sheet_id, meses=None):
+        """Montados uma vez por ledger com GROUP BY nos índices; cada gravar soma em O(1)."""
+        self._preparar(sheet_id)
+        chave = sheet_id or ""
+        with self._lock:
+            if meses is not None:  # período: GROUP BY só no intervalo de momento (índice), sem cache
+                return self._montar_rollups(chave, meses)
+            if chave not in self._rollups:
+                self._rollups[chave] = self._montar_rollups(chave)
+            return self._rollups[chave].copia()
+
+    def _montar_rollups(self, chave, meses=None):
+        rollups = Rollups()
+        filtro, params = _filtro_meses(meses)
+        total, quantidade = self._conn.execute(
+            f"SELECT COALESCE(SUM(valor), 0), COUNT(*) FROM gastos WHERE ledger = ? {filtro}",
+            (chave, *params)).fetchone()
+        rollups.total, rollups.quantidade = total, quantidade
+        consultas = {
+            "categoria": "categoria",
+            "pagamento": "pagamento",
+            "recorrencia": "recorrencia",
+            "mes": "substr(momento, 1, 7)",
+        }
+        for dimensao, expressao in consultas.items():
+            linhas = self._conn.execute(
+                f"SELECT {expressao}, SUM(valor) FROM gastos WHERE ledger = ? {filtro} GROUP BY {expressao}",
+                (chave, *params))
+            for valor_chave, soma in linhas:
+                if valor_chave:
+                    rollups.por[dimensao][valor_chave] += soma
+        return rollups
+
+    def pagina(self, sheet_id, n=10, cursor=None, meses=None):
+        """Keyset pelo índice (ledger, momento): o cursor é (momento, id) da linha mais antiga já entregue."""
+        filtro, params = _filtro_meses(meses)
+        if cursor is not None:
+            filtro += " AND (momento < ? OR (momento = ? AND id < ?))"
+            params += (cursor[0], cursor[0], cursor[1])
+        df, chaves = self._consultar(sheet_id, f"{filtro} ORDER BY momento DESC, id DESC LIMIT ?", (*params, n),
+                                     com_chaves=True)
+        return df.iloc[::-1].reset_index(drop=True), (chaves[-1] if len(chaves) == n else None)
+
+    def revisao(self, sheet_id):
+        """(quantidade, último id): o ledger local só recebe inserts."""
+        self._preparar(sheet_id)
+        with self._lock:
+            return tuple(self._conn.execute(
+                "SELECT COUNT(*), MAX(id) FROM gastos WHERE ledger = ?", (sheet_id or "",)).fetchone())
+
+    def _consultar(self, sheet_id, sufixo, params=(), com_chaves=False):
+        self._preparar(sheet_id)
+        with self._lock:
+            linhas = self._conn.execute(
+                "SELECT id, momento, item, valor, categoria, pagamento, local_compra, recorrencia, status "
+                f"FROM gastos WHERE ledger = ? {sufixo}", (sheet_id or "", *params)).fetchall()
+        df = pd.DataFrame([linha[1:] for linha in linhas], columns=COLUNAS)
+        df["Data/Hora"] = pd.to_datetime(df["Data/Hora"], format="ISO8601")
+        if com_chaves:
+            return tipar_ledger(df), [(linha[1], linha[0]) for linha in linhas]
+        return tipar_ledger(df)
+
+    def _inserir(self, sheet_id, linhas):
+        self._inserir_registros(self._registros(sheet_id, linhas))
+
+    def _registros(self, sheet_id, linhas):
+        registros = []
+        for linha in linhas:
+            linha = list(linha) + [""] * (len(COLUNAS) - len(linha))
+            try:
+                if isinstance(linha[0], datetime):  # histórico já tipado pelo sincronizador
+                    momento = linha[0].isoformat() if not pd.isna(linha[0]) else datetime.now().isoformat()
+                else:
+                    momento = datetime.strptime(str(linha[0]), FORMATO_DATA).isoformat()
+            except ValueError:
+                momento = datetime.now().isoformat()
+            valor = pd.to_numeric(limpar_moeda(linha[2]), errors='coerce')
+            registros.append((sheet_id or "", momento, linha[1], 0.0 if pd.isna(valor) else float(valor),
+                              *linha[3:len(COLUNAS)]))
+        return registros
+
+    def _inserir_registros(self, registros):
+        if not registros:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO gastos (ledger, momento, item, valor, categoria, pagamento, local_compra, "
+                "recorrencia, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", registros)
+            rollups = self._rollups.get(registros[0][0])
+            if rollups is not None:
+                for r in registros:
+                    rollups.aplicar(r[3], datetime.fromisoformat(r[1]), categoria=r[4], pagamento=r[5],
+                                    recorrencia=r[7])
+
+    def _preparar(self, sheet_id):
+        """Importa o histórico da planilha na primeira vez que o ledger é usado."""
+        chave = sheet_id or ""
+        if chave in self._prontos:
+            return
+        with self._lock_preparo:
+            if chave in self._prontos:
+                return
+            with self._lock:
+                ja_existe = self._conn.execute("SELECT 1 FROM ledgers WHERE ledger = ?", (chave,)).fetchone()
+            if not ja_existe:
+                if self.origem is not None:
+                    try:
+                        historico = self._registros(sheet_id, self.origem(sheet_id).values.tolist())
+                    except Exception as e:
+                        print(f"❌ Erro ao importar histórico da planilha: {e}")
+                        return  # tenta de novo na próxima leitura
+                    self._inserir_registros(self._sem_locais(chave, historico))
+                with self._lock:
+                    self._conn.execute("INSERT INTO ledgers (ledger) VALUES (?)", (chave,))
+            self._prontos.add(chave)
+
+    def _sem_locais(self, chave, historico):
+        """
+        Tira do histórico as linhas que já estão no SQLite: foram gravadas (e espelhadas)
+        enquanto a importação falhava. Casamento por (momento, item, valor), uma a uma.
+        """
+        with self._lock:
+            locais = Counter(self._conn.execute(
+                "SELECT momento, item, ROUND(valor, 2) FROM gastos WHERE ledger = ?", (chave,)))
+        if not locais:
+            return historico
+        novos = []
+        for r in historico:
+            k = (r[1], r[2], round(r[3], 2))
+            if locais[k] > 0:
+                locais[k] -= 1
+            else:
+                novos.append(r)
+        return novos
@@ -0,0 +1,156 @@
+import base64
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+
+import requests
+
+# Pillow é opcional (vem com o Streamlit); sem ele as imagens saem como estão no disco
+try:
+    from PIL import Image
+
+    PIL_AVAILABLE = True
+except Exception:
+    PIL_AVAILABLE = False
+
+PASTA_ASSETS = "assets"
+PASTA_ESTATICA = "static"    # servida pelo Streamlit em app/static/ (server.enableStaticServing)
+URL_ESTATICA = "app/static"
+PASTA_DOWNLOADS = os.path.join(tempfile.gettempdir(), "mynd_assets")  # fora da árvore do repositório
+QUALIDADE = 80
+
+
+class AssetPronto:
+    """Bytes já processados de um asset, com hash do conteúdo."""
+
+    def __init__(self, nome, dados, mime):
+        self.nome = nome
+        self.dados = dados
+        self.mime = mime
+        self.hash = hashlib.sha256(dados).hexdigest()[:12]
+        self._data_uri = None
+
+    @property
+    def extensao(self):
+        return self.mime.split("/")[-1]
+
+    def data_uri(self):
+        if self._data_uri is None:
+            self._data_uri = f"data:{self.mime};base64,{base64.b64encode(self.dados).decode()}"
+        return self._data_uri
+
+
+class PipelineAssets:
+    """
+    Assets do app processados uma vez por processo.
+
+    Imagens são reduzidas ao tamanho em que aparecem e recomprimidas (WEBP)
+    na primeira vez que são pedidas; o resultado fica em memória, chaveado pelo
+    arquivo, mtime e parâmetros. `publicar` grava o asset em static/ com o hash
+    no nome e devolve a URL versionada (?v=hash), que o servidor estático do
+    Streamlit entrega com cache longo; assets pequenos podem ir inline via
+    `AssetPronto.data_uri()`. Animações Lottie são lidas de assets/ (versionadas)
+    ou, se não estiverem lá, baixadas uma vez para `pasta_downloads`, fora do
+    repositório, e lidas de lá nas próximas execuções.
+    """
+
+    def __init__(self, pasta=PASTA_ASSETS, pasta_estatica=PASTA_ESTATICA, url_estatica=URL_ESTATICA,
+                 pasta_downloads=PASTA_DOWNLOADS):
+        self.pasta = pasta
+        self.pasta_estatica = pasta_estatica
+        self.url_estatica = url_estatica
+        self.pasta_downloads = pasta_downloads
+        self._cache = {}
+        self._publicados = {}
+        self._lock = threading.Lock()
+
+    def _caminho(self, nome):
+        return os.path.join(self.pasta, nome)
+
+    def imagem(self, nome, largura_max=None, altura_max=None, qualidade=QUALIDADE):
+        caminho = self._caminho(nome)
+        chave = (nome, largura_max, altura_max, qualidade, os.path.getmtime(caminho))
+        with self._lock:
+            if chave in self._cache:
+                return self._cache[chave]
+        with open(caminho, "rb") as f:
+            bruto = f.read()
+        asset = self._recomprimir(nome, bruto, largura_max, altura_max, qualidade)
+        with self._lock:
+            self._cache[chave] = asset
+        return asset
+
+    def _recomprimir(self, nome, bruto, largura_max, altura_max, qualidade):
+        mime_original = "image/" + (os.path.splitext(nome)[1].lstrip(".").lower() or "png")
+        if not PIL_AVAILABLE:
+            return AssetPronto(nome, bruto, mime_original)
+        try:
+            imagem = Image.open(io.BytesIO(bruto))
+            if largura_max or altura_max:
+                imagem.thumbnail((largura_max or imagem.width, altura_max or imagem.height), Image.LANCZOS)
+            if imagem.mode not in ("RGB", "RGBA"):
+                imagem = imagem.convert("RGBA")
+            saida = io.BytesIO()
+            imagem.save(saida, format="WEBP", quality=qualidade, method=6)
+            dados = saida.getvalue()
+        except Exception as e:
+            print(f"❌ Erro ao processar {nome}: {e}")
+            return AssetPronto(nome, bruto, mime_original)
+        if len(dados) >= len(bruto):  # recompressão não ajudou: fica o original
+            return AssetPronto(nome, bruto, mime_original)
+        return AssetPronto(nome, dados, "image/webp")
+
+    def publicar(self, asset):
+        """Grava em static/<nome>.<hash>.<ext> (uma vez) e retorna a URL versionada."""
+        with self._lock:
+            if asset.hash in self._publicados:
+                return self._publicados[asset.hash]
+        base = os.path.splitext(os.path.basename(asset.nome))[0]
+        arquivo = f"{base}.{asset.hash}.{asset.extensao}"
+        destino = os.path.join(self.pasta_estatica, arquivo)
+        if not os.path.exists(destino):
+            os.makedirs(self.pasta_estatica, exist_ok=True)
+            temporario = f"{destino}.{threading.get_ident()}.tmp"
+            with open(temporario, "wb") as f:
+                f.write(asset.dados)
+            os.replace(temporario, destino)
+        url = f"{self.url_estatica}/{arquivo}?v={asset.hash}"
+        with self._lock:
+            self._publicados[asset.hash] = url
+        return url
+
+    def lottie(self, nome, url=None, timeout=5):
+        """JSON da animação: assets/<nome>, senão a cópia baixada antes, senão baixa de `url`."""
+        caminho = self._caminho(nome)
+        with self._lock:
+            if caminho in self._cache:
+                return self._cache[caminho]
+        baixado = os.path.join(self.pasta_downloads, nome)
+        dados = None
+        for arquivo in (caminho, baixado):
+            try:
+                with open(arquivo, encoding="utf-8") as f:
+                    dados = json.load(f)
+                break
+            except FileNotFoundError:
+                continue
+            except ValueError as e:
+                print(f"❌ Animação inválida {arquivo}: {e}")
+        if dados is None and url:
+            try:
+                response = requests.get(url, timeout=timeout)
+                response.raise_for_status()
+                dados = response.json()
+                os.makedirs(self.pasta_downloads, exist_ok=True)
+                temporario = f"{baixado}.{threading.get_ident()}.tmp"
+                with open(temporario, "w", encoding="utf-8") as f:
+                    json.dump(dados, f, separators=(",", ":"))
+                os.replace(temporario, baixado)
+            except Exception as e:
+                print(f"❌ Erro ao baixar animação {nome}: {e}")
+        with self._lock:
+            self._cache[caminho] = dados  # inclusive None: sem rede, não tenta de novo a cada rerun
+        return dados
@@ -0,0 +1,58 @@
+import threading
+from collections import OrderedDict
+
+ORCAMENTO_PADRAO = 256 * 1024 * 1024  # 256 MB para todos os ledgers em memória
+
+
+class CacheLRU:
+    """
+    Cache LRU limitado por bytes, uma entrada por chave (sheet_id no dashboard).
+
+    `medir(valor)` devolve o tamanho em bytes de cada entrada. Ao passar do
+    orçamento, as entradas menos usadas saem primeiro; uma entrada maior que o
+    orçamento inteiro fica sozinha no cache até a próxima inserção.
+    """
+
+    def __init__(self, medir, orcamento_bytes=ORCAMENTO_PADRAO):
+        self.medir = medir
+        self.orcamento_bytes = orcamento_bytes
+        self.total_bytes = 0
+        self.despejos = 0
+        self._itens = OrderedDict()  # chave -> (valor, bytes)
+        self._lock = threading.RLock()
+
+    def obter(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            self._itens.move_to_end(chave)
+            return item[0]
+
+    def guardar(self, chave, valor):
+        """Insere ou atualiza (remede o tamanho) e despeja as entradas mais antigas se preciso."""
+        tamanho = self.medir(valor)
+        with self._lock:
+            antigo = self._itens.pop(chave, None)
+            if antigo is not None:
+                self.total_bytes -= antigo[1]
+            self._itens[chave] = (valor, tamanho)
+            self.total_bytes += tamanho
+            while self.total_bytes > self.orcamento_bytes and len(self._itens) > 1:
+                _, (_, liberado) = self._itens.popitem(last=False)
+                self.total_bytes -= liberado
+                self.despejos += 1
+
+    def remover(self, chave):
+        with self._lock:
+            item = self._itens.pop(chave, None)
+            if item is not None:
+                self.total_bytes -= item[1]
+
+    def __contains__(self, chave):
+        with self._lock:
+            return chave in self._itens
+
+    def __len__(self):
+        with self._lock:
+            return len(self._itens)
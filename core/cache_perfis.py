@@ -0,0 +1,54 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+TTL_POSITIVO = 60   # perfil encontrado
+TTL_NEGATIVO = 15   # "usuário não existe" (curto: um cadastro em outro servidor aparece logo)
+LIMITE_ENTRADAS = 2000
+
+
+class CachePerfis:
+    """
+    Cache curto de leituras do Firebase por caminho, com resultado negativo (None) também.
+
+    Segura rajadas de login errado ou sondagem de cadastro sem uma leitura remota
+    por tentativa. Limitado em entradas (LRU) para não crescer com nomes aleatórios.
+    Quem escreve num caminho deve chamar `invalidar` (o ClienteFirebase já faz isso).
+    """
+
+    def __init__(self, ttl_positivo=TTL_POSITIVO, ttl_negativo=TTL_NEGATIVO, limite=LIMITE_ENTRADAS):
+        self.ttl_positivo = ttl_positivo
+        self.ttl_negativo = ttl_negativo
+        self.limite = limite
+        self._itens = OrderedDict()  # caminho -> (valor, expira_em)
+        self._lock = threading.Lock()
+
+    def obter(self, caminho):
+        """Retorna (achou, valor). O valor é uma cópia: pode ser alterado por quem chamou."""
+        with self._lock:
+            item = self._itens.get(caminho)
+            if item is None:
+                return False, None
+            valor, expira_em = item
+            if time.monotonic() >= expira_em:
+                del self._itens[caminho]
+                return False, None
+            self._itens.move_to_end(caminho)
+        return True, copy.deepcopy(valor)
+
+    def guardar(self, caminho, valor):
+        ttl = self.ttl_negativo if valor is None else self.ttl_positivo
+        with self._lock:
+            self._itens[caminho] = (copy.deepcopy(valor), time.monotonic() + ttl)
+            self._itens.move_to_end(caminho)
+            while len(self._itens) > self.limite:
+                self._itens.popitem(last=False)
+
+    def invalidar(self, caminho):
+        """Remove o caminho, seus ancestrais e descendentes (um PATCH em users/x/campo muda users/x)."""
+        caminho = caminho.strip("/")
+        with self._lock:
+            for chave in list(self._itens):
+                if chave == caminho or chave.startswith(caminho + "/") or caminho.startswith(chave + "/"):
+                    del self._itens[chave]
@@ -0,0 +1,118 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+
+PASTA_CACHE = os.path.join(tempfile.gettempdir(), "mynd_tts_cache")
+LIMITE_BYTES = 50 * 1024 * 1024
+
+# Respostas fixas dos dois apps: sintetizadas no início para tocar sem rede
+FRASES_PADRAO = [
+    "Qual o valor?",
+    "Qual o pagamento?",
+    "Foi online ou loja física?",
+    "O que você comprou?",
+    "Cancelado.",
+    "Não entendi. Pode repetir?",
+    "Não ouvi nada.",
+    "Erro de conexão.",
+    "Erro na inteligência.",
+    "Item?",
+    "Valor?",
+]
+
+
+class CacheTTS:
+    """
+    Cache em disco do áudio sintetizado, endereçado pelo conteúdo:
+    sha256 de (voice_id, model_id, output_format, texto).
+
+    LRU pelo mtime do arquivo (cada acerto "toca" o arquivo) com limite total em bytes.
+    Escritas são atômicas (arquivo temporário + os.replace), então dois processos
+    podem dividir a mesma pasta.
+    """
+
+    def __init__(self, pasta=PASTA_CACHE, limite_bytes=LIMITE_BYTES):
+        self.pasta = pasta
+        self.limite_bytes = limite_bytes
+        self._lock = threading.Lock()
+        os.makedirs(pasta, exist_ok=True)
+
+    @staticmethod
+    def chave(voice_id, model_id, output_format, texto):
+        bruto = "\x1f".join([voice_id, model_id, output_format, texto.strip()])
+        return hashlib.sha256(bruto.encode("utf-8")).hexdigest()
+
+    def _caminho(self, chave):
+        return os.path.join(self.pasta, f"{chave}.audio")
+
+    def obter(self, chave):
+        """Caminho do áudio em cache, ou None."""
+        caminho = self._caminho(chave)
+        try:
+            os.utime(caminho)  # marca como usado recentemente
+            return caminho
+        except OSError:
+            return None
+
+    def ler(self, chave):
+        caminho = self.obter(chave)
+        if caminho is None:
+            return None
+        try:
+            with open(caminho, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def guardar(self, chave, dados):
+        temporario = self._caminho(chave) + f".{threading.get_ident()}.tmp"
+        with open(temporario, "wb") as f:
+            f.write(dados)
+        os.replace(temporario, self._caminho(chave))
+        self._respeitar_limite()
+
+    def guardar_arquivo(self, chave, origem):
+        temporario = self._caminho(chave) + f".{threading.get_ident()}.tmp"
+        shutil.copyfile(origem, temporario)
+        os.replace(temporario, self._caminho(chave))
+        self._respeitar_limite()
+
+    def _respeitar_limite(self):
+        with self._lock:
+            arquivos = []
+            for nome in os.listdir(self.pasta):
+                if not nome.endswith(".audio"):
+                    continue
+                try:
+                    info = os.stat(os.path.join(self.pasta, nome))
+                except OSError:
+                    continue
+                arquivos.append((info.st_mtime, info.st_size, nome))
+            total = sum(tamanho for _, tamanho, _ in arquivos)
+            for _, tamanho, nome in sorted(arquivos):
+                if total <= self.limite_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.pasta, nome))
+                    total -= tamanho
+                except OSError:
+                    pass
+
+    def pre_aquecer(self, sintetizar, voice_id, model_id, output_format, frases=FRASES_PADRAO):
+        """Sintetiza em segundo plano as frases que ainda não estão no cache. `sintetizar(texto)` -> chunks."""
+        def trabalho():
+            for texto in frases:
+                chave = self.chave(voice_id, model_id, output_format, texto)
+                if self.obter(chave):
+                    continue
+                try:
+                    self.guardar(chave, b"".join(sintetizar(texto)))
+                except Exception as e:
+                    print(f"❌ Erro ao pré-aquecer TTS ({texto}): {e}")
+                    return
+
+        thread = threading.Thread(target=trabalho, daemon=True)
+        thread.start()
+        return thread
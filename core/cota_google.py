@@ -0,0 +1,185 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from collections import Counter
+
+# Prioridades: menor sai antes. Escritas (saves) passam na frente das leituras do dashboard
+ESCRITA = 0
+LEITURA = 1
+
+# Requisições por minuto de cada balde. A conta de serviço é um único "usuário" para o Google:
+# Sheets dá 60 leituras + 60 escritas por minuto por usuário, em cotas separadas (um balde para cada,
+# "<api>:leitura" / "<api>:escrita"); o Drive é uma cota só e bem mais folgada
+POR_MINUTO = {"sheets:leitura": 60, "sheets:escrita": 60, "drive": 300}
+RAJADA = 20             # fichas acumuladas no máximo (picos curtos passam sem esperar)
+TENTATIVAS = 5          # chamadas com 429/5xx são refeitas até esse total
+BACKOFF_BASE = 1.0      # segundos; dobra a cada tentativa, com jitter
+BACKOFF_MAX = 32.0
+ESPERA_MAX = 20.0       # tempo máximo na fila antes de desistir com LimiteGoogle
+_TICK = 0.5
+
+# Métodos de aba gspread que gravam (o resto é leitura)
+ESCRITAS_SHEETS = {
+    "append_row", "append_rows", "update", "update_acell", "update_cell", "update_cells", "batch_update",
+    "batch_clear", "clear", "insert_row", "insert_rows", "delete_rows", "resize", "format", "add_worksheet",
+}
+
+
+class LimiteGoogle(Exception):
+    """Cota do Google esgotada: a chamada esperou demais na fila ou continuou em 429 depois dos retries."""
+
+
+def status_http(erro):
+    """Status HTTP de um erro do gspread (response.status_code) ou do googleapiclient (resp.status)."""
+    resposta = getattr(erro, "response", None)  # requests.Response de erro é falsy: nada de `or` aqui
+    if resposta is None:
+        resposta = getattr(erro, "resp", None)
+    status = getattr(resposta, "status_code", None)
+    if status is None:
+        status = getattr(resposta, "status", None)
+    try:
+        return int(status)
+    except (TypeError, ValueError):
+        return None
+
+
+def _retry_after(erro):
+    resposta = getattr(erro, "response", None)
+    if resposta is None:
+        resposta = getattr(erro, "resp", None)
+    cabecalhos = getattr(resposta, "headers", resposta)
+    try:
+        return float(cabecalhos.get("Retry-After") or cabecalhos.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class _Balde:
+    def __init__(self, por_minuto, rajada):
+        self.taxa = por_minuto / 60.0
+        self.capacidade = rajada
+        self.fichas = float(rajada)
+        self.atualizado = time.monotonic()
+        self.pausa_ate = 0.0  # depois de um 429/5xx, ninguém chama essa API até aqui
+
+    def espera(self, agora):
+        """Segundos até haver uma ficha (0 = pode chamar já)."""
+        self.fichas = min(self.capacidade, self.fichas + (agora - self.atualizado) * self.taxa)
+        self.atualizado = agora
+        if agora < self.pausa_ate:
+            return self.pausa_ate - agora
+        if self.fichas >= 1:
+            return 0.0
+        return (1 - self.fichas) / self.taxa
+
+
+class AgendadorGoogle:
+    """
+    Token bucket central para as chamadas às APIs do Google (uma instância por processo).
+
+    `executar(api, prioridade, func, ...)` espera uma ficha do balde da API e
+    chama `func`; APIs com cotas separadas de leitura e escrita (Sheets) têm um
+    balde para cada, escolhido pela prioridade. Quem espera é atendido por
+    prioridade (ESCRITA antes de LEITURA) e, dentro dela, por ordem de chegada.
+    Um 429 ou 5xx pausa o balde por um backoff exponencial com jitter (ou o
+    Retry-After) e a chamada volta para a fila; esgotadas as tentativas, um 429 sobe como
+    LimiteGoogle e um 5xx sobe como o erro original. `estado()` expõe a
+    profundidade das filas e os contadores.
+    """
+
+    def __init__(self, por_minuto=None, rajada=RAJADA, tentativas=TENTATIVAS, espera_max=ESPERA_MAX):
+        self.tentativas = tentativas
+        self.espera_max = espera_max
+        self.contadores = Counter()
+        self._baldes = {api: _Balde(n, rajada) for api, n in {**POR_MINUTO, **(por_minuto or {})}.items()}
+        self._filas = {api: [] for api in self._baldes}
+        self._senhas = itertools.count()
+        self._cond = threading.Condition()
+
+    def _balde(self, api, prioridade):
+        nome = f"{api}:{'escrita' if prioridade == ESCRITA else 'leitura'}"
+        return nome if nome in self._baldes else api
+
+    def executar(self, api, prioridade, func, *args, **kwargs):
+        api = self._balde(api, prioridade)
+        for tentativa in range(self.tentativas):
+            self._reservar(api, prioridade)
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                status = status_http(e)
+                if status != 429 and not (status and 500 <= status < 600):
+                    raise
+                self.contadores["429" if status == 429 else "5xx"] += 1
+                if tentativa + 1 == self.tentativas:
+                    self.contadores["desistencias"] += 1
+                    if status == 429:
+                        raise LimiteGoogle(f"{api}: 429 depois de {self.tentativas} tentativas") from e
+                    raise
+                espera = _retry_after(e) or min(BACKOFF_MAX, BACKOFF_BASE * 2 ** tentativa) * random.uniform(0.5, 1.0)
+                self._pausar(api, espera)
+
+    def _reservar(self, api, prioridade):
+        balde, fila = self._baldes[api], self._filas[api]
+        senha = (prioridade, next(self._senhas))
+        limite = time.monotonic() + self.espera_max
+        esperou = False
+        with self._cond:
+            heapq.heappush(fila, senha)
+            while True:
+                agora = time.monotonic()
+                espera = balde.espera(agora) if fila[0] == senha else _TICK
+                if espera == 0:
+                    heapq.heappop(fila)
+                    balde.fichas -= 1
+                    self.contadores["chamadas"] += 1
+                    self._cond.notify_all()  # o próximo da fila reavalia
+                    return
+                if agora >= limite:
+                    fila.remove(senha)
+                    heapq.heapify(fila)
+                    self.contadores["esperas_esgotadas"] += 1
+                    self._cond.notify_all()
+                    raise LimiteGoogle(f"{api}: mais de {self.espera_max:g}s esperando cota")
+                if not esperou:
+                    esperou = True
+                    self.contadores["esperas"] += 1
+                self._cond.wait(min(espera, limite - agora))
+
+    def _pausar(self, api, segundos):
+        with self._cond:
+            balde = self._baldes[api]
+            balde.pausa_ate = max(balde.pausa_ate, time.monotonic() + segundos)
+            self.contadores["pausas"] += 1
+            self._cond.notify_all()
+
+    def estado(self):
+        """{"fila": {api: chamadas esperando}, "contadores": {...}}"""
+        with self._cond:
+            return {
+                "fila": {api: len(fila) for api, fila in self._filas.items()},
+                "contadores": dict(self.contadores),
+            }
+
+
+class Agendada:
+    """Objeto (ex: aba gspread) cujos métodos passam pelo AgendadorGoogle; atributos simples passam direto."""
+
+    def __init__(self, objeto, agendador, api="sheets", escritas=ESCRITAS_SHEETS):
+        self._objeto = objeto
+        self._agendador = agendador
+        self._api = api
+        self._escritas = escritas
+
+    def __getattr__(self, nome):
+        atributo = getattr(self._objeto, nome)
+        if not callable(atributo):
+            return atributo
+        prioridade = ESCRITA if nome in self._escritas else LEITURA
+
+        def chamada(*args, **kwargs):
+            return self._agendador.executar(self._api, prioridade, atributo, *args, **kwargs)
+
+        return chamada
@@ -0,0 +1,217 @@
+import json
+import os
+import threading
+from collections import Counter
+
+from core.lote_gastos import como_lote
+
+MODELO_RAPIDO = os.getenv("MYND_MODELO_RAPIDO", "gpt-4o-mini")
+MODELO_COMPLETO = os.getenv("MYND_MODELO_COMPLETO", "gpt-4-turbo")
+PALAVRAS_FOLLOWUP = 8      # até isso, com dados parciais na conversa, é resposta a uma pergunta
+LIMIAR_CONFIANCA = 0.7     # abaixo disso a resposta do modelo rápido é refeita no completo
+CAMPOS_OBRIGATORIOS = ("gastos", "missing_info", "cancelar")
+
+# Acrescentado aos prompts dos apps: "cancelar", "confianca" e "missing_info" vêm primeiro
+# para a pergunta de follow-up sair do stream antes do resto do objeto.
+ESQUEMA = ('{"cancelar": false, "confianca": 1.0, "missing_info": null, "gastos": [{"id": null, "item": null, '
+           '"valor": null, "categoria": null, "pagamento": null, "recorrencia": "Único", "local_compra": null}]}')
+INSTRUCAO_CONFIANCA = ('"confianca" (0 a 1) é a sua certeza sobre a extração. '
+                       'Escreva as chaves na ordem do JSON acima.')
+INSTRUCAO_LOTE = ('Uma frase pode ter vários gastos: um objeto em "gastos" para cada um. Devolva a lista completa: '
+                  'os gastos parciais com o mesmo "id" (já atualizados) e os novos com "id": null. Se faltar algo, '
+                  '"missing_info" pergunta pelo primeiro gasto incompleto, dizendo qual é.')
+
+
+class RespostaInvalida(ValueError):
+    pass
+
+
+class LeitorJSON:
+    """
+    Lê um objeto JSON que chega aos pedaços (stream do modelo) e avisa
+    `ao_campo(chave, valor)` assim que cada campo de primeiro nível fecha,
+    sem esperar o objeto inteiro.
+    """
+
+    def __init__(self, ao_campo=None):
+        self.ao_campo = ao_campo
+        self.campos = {}
+        self.texto = []
+        self._pos = 0
+        self._profundidade = 0
+        self._em_string = False
+        self._escape = False
+        self._esperando = None      # "chave" | "valor"
+        self._inicio = None         # início da chave ou do valor atual
+        self._string_valor = False
+        self._chave = None
+
+    def alimentar(self, pedaco):
+        for c in pedaco:
+            self.texto.append(c)
+            self._ler(c, self._pos)
+            self._pos += 1
+
+    def _emitir(self, fim):
+        bruto = "".join(self.texto[self._inicio:fim]).strip()
+        self._inicio = None
+        valor = json.loads(bruto)
+        self.campos[self._chave] = valor
+        if self.ao_campo:
+            self.ao_campo(self._chave, valor)
+
+    def _ler(self, c, p):
+        if self._em_string:
+            if self._escape:
+                self._escape = False
+            elif c == "\\":
+                self._escape = True
+            elif c == '"':
+                self._em_string = False
+                if self._profundidade == 1 and self._esperando == "chave":
+                    self._chave = json.loads("".join(self.texto[self._inicio:p + 1]))
+                    self._inicio = None
+                elif self._profundidade == 1 and self._string_valor:
+                    self._string_valor = False
+                    self._emitir(p + 1)
+            return
+        if c.isspace():
+            return
+        if c == '"':
+            self._em_string = True
+            if self._profundidade == 1 and self._inicio is None:
+                self._inicio = p
+                self._string_valor = self._esperando == "valor"
+        elif c in "{[":
+            if self._profundidade == 1 and self._esperando == "valor" and self._inicio is None:
+                self._inicio = p
+            self._profundidade += 1
+            if self._profundidade == 1:
+                self._esperando = "chave"
+        elif c in "}]":
+            if self._profundidade == 1 and self._inicio is not None:
+                self._emitir(p)  # escalar no último campo
+            self._profundidade -= 1
+            if self._profundidade == 1 and self._inicio is not None:
+                self._emitir(p + 1)  # objeto/lista aninhado
+        elif self._profundidade == 1 and c == ":":
+            self._esperando = "valor"
+        elif self._profundidade == 1 and c == ",":
+            if self._inicio is not None:
+                self._emitir(p)
+            self._esperando = "chave"
+        elif self._profundidade == 1 and self._esperando == "valor" and self._inicio is None:
+            self._inicio = p
+
+    def objeto(self):
+        return json.loads("".join(self.texto))
+
+
+def validar(dados):
+    """Confere o formato da resposta; levanta RespostaInvalida."""
+    if not isinstance(dados, dict):
+        raise RespostaInvalida("resposta não é um objeto")
+    faltando = [c for c in CAMPOS_OBRIGATORIOS if c not in dados]
+    if faltando:
+        raise RespostaInvalida(f"campos ausentes: {faltando}")
+    if not isinstance(dados["gastos"], list) or not all(isinstance(g, dict) for g in dados["gastos"]):
+        raise RespostaInvalida("gastos inválido")
+    for gasto in dados["gastos"]:
+        valor = gasto.get("valor")
+        if valor is not None and not isinstance(valor, (int, float, str)):
+            raise RespostaInvalida("valor inválido")
+    if not isinstance(dados.get("cancelar"), bool):
+        raise RespostaInvalida("cancelar inválido")
+    if dados.get("missing_info") is not None and not isinstance(dados["missing_info"], str):
+        raise RespostaInvalida("missing_info inválido")
+    confianca = dados.get("confianca", 1.0)
+    if not isinstance(confianca, (int, float)) or not 0 <= confianca <= 1:
+        raise RespostaInvalida("confianca inválida")
+
+
+class ExtratorGPT:
+    """
+    Extração com roteamento por modelo e resposta em streaming.
+
+    Follow-ups curtos (há dados parciais e a fala tem poucas palavras) vão ao modelo
+    rápido; se a resposta dele não passa na validação do esquema, a chamada falha
+    ou a confiança fica abaixo do limiar, a mesma pergunta é refeita no modelo completo.
+
+    O JSON é lido enquanto chega: quando "missing_info" fecha, `ao_pergunta(texto)`
+    é chamado na hora (ex: mandar para o TTS). No modelo rápido isso só acontece
+    se "confianca" já veio acima do limiar, para não falar algo que a escalada desmentiria.
+    `extrair` retorna (dados, pergunta_antecipada); depois de uma pergunta antecipada
+    o "missing_info" da escalada é trocado por ela, e quem chama não fala outra.
+    """
+
+    def __init__(self, client, modelo_rapido=MODELO_RAPIDO, modelo_completo=MODELO_COMPLETO,
+                 palavras_followup=PALAVRAS_FOLLOWUP, limiar_confianca=LIMIAR_CONFIANCA):
+        self.client = client
+        self.modelo_rapido = modelo_rapido
+        self.modelo_completo = modelo_completo
+        self.palavras_followup = palavras_followup
+        self.limiar_confianca = limiar_confianca
+        self.contagem = Counter()   # chamadas por modelo e escaladas
+        self._lock = threading.Lock()
+
+    def _contar(self, chave):
+        with self._lock:
+            self.contagem[chave] += 1
+
+    def escolher_modelo(self, texto, dados_parciais):
+        if dados_parciais and len(texto.split()) <= self.palavras_followup:
+            return self.modelo_rapido
+        return self.modelo_completo
+
+    def _chamar(self, modelo, prompt, ao_pergunta, exigir_confianca):
+        def ao_campo(chave, valor):
+            if chave != "missing_info" or not valor or not ao_pergunta or leitor.campos.get("cancelar"):
+                return
+            confianca = leitor.campos.get("confianca")
+            if exigir_confianca and (confianca is None or confianca < self.limiar_confianca):
+                return
+            ao_pergunta(valor)
+
+        leitor = LeitorJSON(ao_campo)
+        self._contar(modelo)
+        stream = self.client.chat.completions.create(
+            model=modelo,
+            messages=[{"role": "system", "content": prompt}],
+            response_format={"type": "json_object"},
+            stream=True,
+        )
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            pedaco = chunk.choices[0].delta.content
+            if pedaco:
+                leitor.alimentar(pedaco)
+        dados = como_lote(leitor.objeto())  # tolera o formato antigo, de um gasto só
+        validar(dados)
+        return dados
+
+    def extrair(self, texto, dados_parciais, prompt, ao_pergunta=None):
+        modelo = self.escolher_modelo(texto, dados_parciais)
+        # Registrado fora de _chamar: uma pergunta já falada conta mesmo se o stream falhar depois dela
+        anunciadas = []
+
+        def anunciar(pergunta):
+            anunciadas.append(pergunta)
+            ao_pergunta(pergunta)
+
+        if modelo == self.modelo_rapido:
+            try:
+                dados = self._chamar(modelo, prompt, ao_pergunta and anunciar, exigir_confianca=True)
+                if dados.get("cancelar") or dados.get("confianca", 1.0) >= self.limiar_confianca:
+                    dados.pop("confianca", None)
+                    return dados, (anunciadas[0] if anunciadas else None)
+            except Exception as e:
+                print(f"❌ Modelo rápido falhou ({e}), escalando")
+            self._contar("escaladas")
+        # Se a pergunta já foi anunciada, o modelo completo não anuncia outra
+        dados = self._chamar(self.modelo_completo, prompt,
+                             None if anunciadas or not ao_pergunta else anunciar, exigir_confianca=False)
+        dados.pop("confianca", None)
+        if anunciadas and dados.get("missing_info"):
+            dados["missing_info"] = anunciadas[0]  # uma pergunta por turno: a que o usuário já ouviu
+        return dados, (anunciadas[0] if anunciadas else None)
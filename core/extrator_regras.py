@@ -0,0 +1,154 @@
+import re
+import unicodedata
+
+PERGUNTAS = {
+    "item": "O que você comprou?",
+    "valor": "Qual o valor?",
+    "pagamento": "Qual o pagamento?",
+    "local_compra": "Foi online ou loja física?",
+}
+
+PAGAMENTOS = {"debito": "Débito", "credito": "Crédito", "pix": "Pix", "dinheiro": "Dinheiro",
+              "especie": "Dinheiro", "boleto": "Boleto"}
+LOCAIS = {"online": "Online", "internet": "Online", "site": "Online", "app": "Online", "aplicativo": "Online",
+          "fisica": "Loja Física", "presencial": "Loja Física", "loja": "Loja Física"}
+RECORRENCIAS = {"mensal": "Mensal", "assinatura": "Mensal", "unico": "Único", "unica": "Único"}
+
+UNIDADES = {"zero": 0, "um": 1, "uma": 1, "dois": 2, "duas": 2, "tres": 3, "quatro": 4, "cinco": 5, "seis": 6,
+            "sete": 7, "oito": 8, "nove": 9, "dez": 10, "onze": 11, "doze": 12, "treze": 13, "quatorze": 14,
+            "catorze": 14, "quinze": 15, "dezesseis": 16, "dezessete": 17, "dezoito": 18, "dezenove": 19,
+            "vinte": 20, "trinta": 30, "quarenta": 40, "cinquenta": 50, "sessenta": 60, "setenta": 70,
+            "oitenta": 80, "noventa": 90, "cem": 100, "cento": 100, "duzentos": 200, "duzentas": 200,
+            "trezentos": 300, "quatrocentos": 400, "quinhentos": 500, "seiscentos": 600, "setecentos": 700,
+            "oitocentos": 800, "novecentos": 900}
+MOEDA = {"reais", "real", "conto", "contos", "pila", "pilas"}
+CENTAVOS = {"centavo", "centavos"}
+
+# Palavras que não mudam o sentido de uma resposta curta ("foi no débito", "paguei 30 reais")
+NEUTRAS = {"foi", "no", "na", "nos", "nas", "de", "do", "da", "em", "com", "pelo", "pela", "o", "a", "e", "eh",
+           "paguei", "pago", "pagamento", "valor", "cartao", "pra", "para", "por", "ai", "eu", "deu", "custou",
+           "ficou", "sao", "r", "compra", "comprei", "via", "mes", "todo", "vez", "le", "isso", "tipo", "sim"}
+
+# Cancelamento só vale como fala curta e isolada ("cancela", "pode cancelar isso"): casa a frase inteira,
+# para "paguei o cancelamento do plano 50 reais" não apagar o gasto em andamento
+CANCELAMENTO = re.compile(r"(?:(?:ah|entao|pode|ok|nao|por favor)\s+)*"
+                          r"(?:cancel(?:a|ar|e|ei|o)?|esquece|desiste|deixa (?:pra|para) la|nao quero mais|apaga tudo)"
+                          r"(?:\s+(?:tudo|isso|esse|essa|ele|ela|ai|entao|por favor|o gasto|a compra))*")
+
+
+def normalizar(texto):
+    sem_acento = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in sem_acento if not unicodedata.combining(c))
+
+
+def _numero_digitos(token):
+    """'30' / '12,50' / '12.50' / '1.200' / '1.200,50' -> float (ponto seguido de 3 dígitos é milhar)."""
+    if "," in token:
+        token = token.replace(".", "").replace(",", ".")
+    elif re.fullmatch(r"\d{1,3}(\.\d{3})+", token):
+        token = token.replace(".", "")
+    try:
+        return float(token)
+    except ValueError:
+        return None
+
+
+def _numero_extenso(tokens, i):
+    """Lê 'cento e vinte e cinco' / 'mil e duzentos' a partir de i; retorna (valor, próximo índice)."""
+    total, parcial, j, achou = 0, 0, i, False
+    while j < len(tokens):
+        t = tokens[j]
+        if t in UNIDADES:
+            parcial += UNIDADES[t]
+            achou = True
+        elif t == "mil":
+            total += (parcial or 1) * 1000
+            parcial = 0
+            achou = True
+        elif t == "e" and achou and j + 1 < len(tokens) and (tokens[j + 1] in UNIDADES or tokens[j + 1] == "mil"):
+            pass
+        else:
+            break
+        j += 1
+    return (total + parcial, j) if achou else (None, i)
+
+
+def _ler_valor(tokens, i):
+    """Valor em reais começando em i (dígitos ou extenso, com 'reais' e centavos opcionais)."""
+    j = i + 1 if tokens[i] == "r$" else i
+    if j >= len(tokens):
+        return None, i
+    if re.fullmatch(r"\d+([.,]\d+)*", tokens[j]):
+        valor, j = _numero_digitos(tokens[j]), j + 1
+    else:
+        valor, j = _numero_extenso(tokens, j)
+    if valor is None:
+        return None, i
+    if j < len(tokens) and tokens[j] in CENTAVOS:
+        return valor / 100, j + 1
+    if j < len(tokens) and tokens[j] in MOEDA:
+        j += 1
+        # "trinta reais e cinquenta (centavos)"
+        if j + 1 < len(tokens) and tokens[j] == "e":
+            centavos, k = _numero_extenso(tokens, j + 1)
+            if centavos is None and re.fullmatch(r"\d{1,2}", tokens[j + 1]):
+                centavos, k = int(tokens[j + 1]), j + 2
+            if centavos is not None and centavos < 100:
+                valor += centavos / 100
+                j = k + 1 if k < len(tokens) and tokens[k] in CENTAVOS else k
+    return round(valor, 2), j
+
+
+def pergunta_faltante(dados, exigir=("item", "valor", "pagamento")):
+    for campo in exigir:
+        if not dados.get(campo):
+            return PERGUNTAS[campo]
+    if dados.get("categoria") == "Compras" and not dados.get("local_compra"):
+        return PERGUNTAS["local_compra"]
+    return None
+
+
+def extrair_por_regras(texto, dados_parciais=None, exigir=("item", "valor", "pagamento")):
+    """
+    Caminho rápido antes do GPT para respostas curtas de follow-up
+    ("débito", "online", "trinta reais", "cancela").
+
+    Retorna um dict no mesmo formato do JSON do GPT, ou None quando a frase tem
+    algo que as regras não entendem (aí quem chamou vai para o GPT). Só responde
+    se cada palavra da frase foi reconhecida ou é neutra.
+    """
+    norm = normalizar(texto)
+    if CANCELAMENTO.fullmatch(" ".join(re.findall(r"[a-z]+", norm))):
+        return {"cancelar": True, "missing_info": None}
+
+    tokens = re.findall(r"r\$|\d+(?:[.,]\d+)*|[a-z]+", norm)
+    achados = {}
+    i = 0
+    while i < len(tokens):
+        t = tokens[i]
+        if t in PAGAMENTOS:
+            achados["pagamento"] = PAGAMENTOS[t]
+        elif t in LOCAIS:
+            achados["local_compra"] = LOCAIS[t]
+        elif t in RECORRENCIAS:
+            achados["recorrencia"] = RECORRENCIAS[t]
+        elif t == "todo" and i + 1 < len(tokens) and tokens[i + 1] == "mes":
+            achados["recorrencia"] = "Mensal"
+            i += 1
+        elif t in NEUTRAS or t in MOEDA:
+            pass
+        else:
+            valor, j = _ler_valor(tokens, i)
+            if valor is None:
+                return None  # palavra desconhecida: provavelmente item/categoria, é trabalho do GPT
+            if "valor" in achados:
+                return None  # dois valores numa frase: deixa para o GPT
+            achados["valor"] = valor
+            i = j
+            continue
+        i += 1
+
+    if not achados:
+        return None
+    mesclado = {**(dados_parciais or {}), **achados}
+    return {**achados, "missing_info": pergunta_faltante(mesclado, exigir), "cancelar": False}
@@ -0,0 +1,224 @@
+import json
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from gspread.exceptions import SpreadsheetNotFound, WorksheetNotFound
+
+from core.cota_google import status_http
+from core.particoes import particao_de
+
+JOURNAL_PADRAO = "mynd_journal.db"
+TAMANHO_LOTE = 20        # dispara o flush assim que houver essa quantidade de linhas pendentes
+INTERVALO_FLUSH = 2.0    # ou depois desse tempo (segundos)
+MAX_LINHAS_POR_CHAMADA = 500
+MAX_BACKOFF = 60.0
+MAX_TENTATIVAS = 8       # falhas permanentes (4xx, planilha apagada) até a linha ir para "descartadas"
+
+
+def _permanente(erro):
+    """Erro que retry não resolve (planilha/aba apagada, linha recusada); 429, 5xx e rede não contam."""
+    if isinstance(erro, (SpreadsheetNotFound, WorksheetNotFound)):
+        return True
+    status = status_http(erro)
+    return status is not None and 400 <= status < 500 and status != 429
+
+
+class FilaGravacao:
+    """
+    Fila write-behind para as linhas de gasto.
+
+    Cada linha é gravada primeiro num journal SQLite local (append-only) e o save
+    retorna na hora. Uma thread em segundo plano junta as linhas pendentes por
+    planilha e mês num único append_rows na aba da partição (AAAA-MM, ver
+    core.particoes), com retry e backoff. Linhas que sobraram de
+    uma execução anterior são reenviadas ao iniciar. A entrega é "pelo menos uma
+    vez": se o processo cair entre o append e a baixa no journal, a linha é reenviada.
+
+    O backoff é por planilha: uma planilha apagada ou sem cota não segura a fila
+    das outras. Uma linha recusada (400) é separada das demais do lote, e linhas
+    com MAX_TENTATIVAS falhas permanentes vão para a tabela "descartadas"
+    (dead letter), onde ficam para conferência em vez de travar a fila.
+    """
+
+    def __init__(self, registro, caminho=JOURNAL_PADRAO, tamanho_lote=TAMANHO_LOTE,
+                 intervalo=INTERVALO_FLUSH, ao_gravar=None):
+        self.registro = registro  # RegistroPlanilhas que fornece as abas
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+        self.ao_gravar = ao_gravar  # callback(sheet_id, partição) depois de cada lote gravado
+
+        self._conn = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pendentes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                planilha TEXT NOT NULL,
+                linha TEXT NOT NULL,
+                criado_em REAL NOT NULL,
+                tentativas INTEGER NOT NULL DEFAULT 0
+            )""")
+        colunas = [c[1] for c in self._conn.execute("PRAGMA table_info(pendentes)")]
+        if "tentativas" not in colunas:  # journal de uma versão anterior
+            self._conn.execute("ALTER TABLE pendentes ADD COLUMN tentativas INTEGER NOT NULL DEFAULT 0")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS descartadas (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                planilha TEXT NOT NULL,
+                linha TEXT NOT NULL,
+                criado_em REAL NOT NULL,
+                erro TEXT,
+                descartado_em REAL NOT NULL
+            )""")
+        self._lock = threading.Lock()        # protege a conexão SQLite
+        self._lock_flush = threading.Lock()  # evita dois flushes simultâneos
+        self._acordar = threading.Event()
+        self._backoff = {}  # planilha -> (falhas seguidas, time.monotonic() da próxima tentativa)
+
+        if self.pendentes():
+            self._acordar.set()  # replay do journal de uma execução anterior
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def enfileirar(self, sheet_id, linha):
+        """Registra a linha no journal e retorna imediatamente."""
+        self.enfileirar_lote(sheet_id, [linha])
+
+    def enfileirar_lote(self, sheet_id, linhas):
+        """
+        Registra várias linhas numa única transação: o flush vê o lote inteiro
+        ou nada dele, então as linhas do mesmo mês saem juntas num append_rows.
+        """
+        agora = time.time()
+        with self._lock:
+            with self._transacao():
+                self._conn.executemany(
+                    "INSERT INTO pendentes (planilha, linha, criado_em) VALUES (?, ?, ?)",
+                    [(sheet_id or "", json.dumps(linha, ensure_ascii=False), agora) for linha in linhas])
+            total = self._conn.execute("SELECT COUNT(*) FROM pendentes").fetchone()[0]
+        if total >= self.tamanho_lote and (sheet_id or "") not in self._backoff:  # em backoff, espera o retry
+            self._acordar.set()
+
+    @contextmanager
+    def _transacao(self):
+        """BEGIN/COMMIT explícitos: com isolation_level=None o sqlite3 não abre transação sozinho."""
+        self._conn.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def pendentes(self, sheet_id=None):
+        with self._lock:
+            if sheet_id is None:
+                return self._conn.execute("SELECT COUNT(*) FROM pendentes").fetchone()[0]
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM pendentes WHERE planilha = ?", (sheet_id,)).fetchone()[0]
+
+    def descartadas(self, sheet_id=None):
+        with self._lock:
+            if sheet_id is None:
+                return self._conn.execute("SELECT COUNT(*) FROM descartadas").fetchone()[0]
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM descartadas WHERE planilha = ?", (sheet_id,)).fetchone()[0]
+
+    def _baixar(self, lote):
+        with self._lock:
+            self._conn.executemany("DELETE FROM pendentes WHERE id = ?", [(id_,) for id_, _ in lote])
+
+    def _contar_falha(self, planilha, lote, erro):
+        """Soma uma tentativa às linhas (só erro permanente) e move as que passaram do limite."""
+        if not _permanente(erro):
+            return
+        agora = time.time()
+        with self._lock, self._transacao():
+            self._conn.executemany("UPDATE pendentes SET tentativas = tentativas + 1 WHERE id = ?",
+                                   [(id_,) for id_, _ in lote])
+            movidas = self._conn.execute("""
+                INSERT INTO descartadas (planilha, linha, criado_em, erro, descartado_em)
+                SELECT planilha, linha, criado_em, ?, ? FROM pendentes WHERE planilha = ? AND tentativas >= ?""",
+                (str(erro)[:500], agora, planilha, MAX_TENTATIVAS)).rowcount
+            self._conn.execute("DELETE FROM pendentes WHERE planilha = ? AND tentativas >= ?",
+                               (planilha, MAX_TENTATIVAS))
+        if movidas:
+            print(f"❌ {movidas} linha(s) movida(s) para descartadas depois de {MAX_TENTATIVAS} falhas: {erro}")
+
+    def _adiar(self, planilha):
+        falhas = self._backoff.get(planilha, (0, 0))[0] + 1
+        # Backoff exponencial com jitter para não martelar a cota do Sheets
+        espera = min(MAX_BACKOFF, self.intervalo * 2 ** falhas) * random.uniform(0.5, 1.0)
+        self._backoff[planilha] = (falhas, time.monotonic() + espera)
+
+    def _enviar(self, sheet_id, particao, lote):
+        """append_rows do lote. Com 400 num lote maior, reenvia linha a linha para achar a recusada."""
+        planilha = sheet_id or ""
+        try:
+            self.registro.particao(sheet_id, particao).append_rows([linha for _, linha in lote])
+        except Exception as e:
+            print(f"❌ Erro ao gravar lote ({len(lote)} linhas): {e}")
+            if status_http(e) != 400 or len(lote) == 1:
+                self.registro.invalidar(sheet_id)
+                self._contar_falha(planilha, lote, e)
+                return False
+            tudo_ok = True
+            for item in lote:
+                if not self._enviar(sheet_id, particao, [item]):
+                    tudo_ok = False
+            return tudo_ok
+        self._baixar(lote)
+        print(f"✅ Lote salvo: {len(lote)} linha(s)")
+        if self.ao_gravar:
+            self.ao_gravar(sheet_id, particao)
+        return True
+
+    def flush(self):
+        """
+        Envia o que está pendente agora (menos as planilhas ainda em backoff).
+        Retorna True se não sobrou nada.
+        """
+        with self._lock_flush:
+            with self._lock:
+                registros = self._conn.execute(
+                    "SELECT id, planilha, linha FROM pendentes ORDER BY id").fetchall()
+
+            # Agrupa por planilha e partição (mês da linha) mantendo a ordem de chegada
+            grupos = {}
+            for id_, planilha, linha in registros:
+                linha = json.loads(linha)
+                grupos.setdefault((planilha, particao_de(linha[0] if linha else None)), []).append((id_, linha))
+
+            agora = time.monotonic()
+            tudo_ok = True
+            falharam = set()
+            for (planilha, particao), itens in grupos.items():
+                if planilha in falharam or self._backoff.get(planilha, (0, 0))[1] > agora:
+                    tudo_ok = False
+                    continue
+                for i in range(0, len(itens), MAX_LINHAS_POR_CHAMADA):
+                    if not self._enviar(planilha or None, particao, itens[i:i + MAX_LINHAS_POR_CHAMADA]):
+                        falharam.add(planilha)
+                        tudo_ok = False
+                        break
+            for planilha in {p for p, _ in grupos}:
+                if planilha in falharam:
+                    self._adiar(planilha)
+                elif self._backoff.get(planilha, (0, 0))[1] <= agora:
+                    self._backoff.pop(planilha, None)
+            return tudo_ok
+
+    def _loop(self):
+        espera = self.intervalo
+        while True:
+            self._acordar.wait(espera)
+            self._acordar.clear()
+            if not self.pendentes():
+                espera = self.intervalo
+                continue
+            self.flush()
+            # Acorda no próximo intervalo ou quando vence o backoff da primeira planilha adiada
+            proxima = min((t for _, t in self._backoff.values()), default=None)
+            espera = self.intervalo if proxima is None else min(self.intervalo,
+                                                                 max(0.1, proxima - time.monotonic()))
@@ -0,0 +1,117 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from core.cache_perfis import CachePerfis
+
+TIMEOUT_PADRAO = (3.05, 10)  # (conexão, leitura) em segundos
+TENTATIVAS = 3
+TAMANHO_POOL = 10
+# ETag que o Firebase devolve para um caminho sem dados: if-match com ele = "criar só se não existir"
+NULL_ETAG = "null_etag"
+
+
+class ClienteFirebase:
+    """
+    Cliente REST do Firebase Realtime Database.
+
+    Usa uma sessão keep-alive com pool de conexões (sem TLS novo a cada chamada),
+    timeout em toda requisição e retry limitado com backoff para falhas de rede e 5xx.
+    Escritas condicionais usam ETag (`if-match`); 412 significa que o dado mudou.
+    Erros HTTP sobem como requests.HTTPError. `get_cacheado` lê pelo CachePerfis,
+    que toda escrita feita por este cliente invalida.
+    """
+
+    def __init__(self, url_base, timeout=TIMEOUT_PADRAO, tentativas=TENTATIVAS, tamanho_pool=TAMANHO_POOL):
+        self.url_base = url_base.rstrip("/")
+        self.timeout = timeout
+        retry = Retry(
+            total=tentativas,
+            backoff_factor=0.3,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset({"GET", "PUT", "PATCH", "DELETE"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adaptador = HTTPAdapter(pool_connections=tamanho_pool, pool_maxsize=tamanho_pool, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adaptador)
+        self.session.mount("http://", adaptador)
+        self.cache = CachePerfis()
+
+    def _url(self, caminho):
+        return f"{self.url_base}/{caminho.strip('/')}.json"
+
+    def _requisitar(self, metodo, caminho, timeout=None, **kwargs):
+        return self.session.request(metodo, self._url(caminho), timeout=timeout or self.timeout, **kwargs)
+
+    def get(self, caminho, timeout=None):
+        response = self._requisitar("GET", caminho, timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def get_cacheado(self, caminho, timeout=None):
+        """GET com cache curto (inclusive de "não existe"); para perfis de usuário."""
+        achou, dados = self.cache.obter(caminho)
+        if achou:
+            return dados
+        dados = self.get(caminho, timeout)
+        self.cache.guardar(caminho, dados)
+        return dados
+
+    def get_com_etag(self, caminho, timeout=None):
+        """
+        Retorna (dados, etag) para um `put(..., etag=etag)` depois (ler-e-regravar,
+        ex: reivindicar um nó do pool). Caminho sem dados vem como (None, NULL_ETAG).
+        """
+        response = self._requisitar("GET", caminho, timeout, headers={"X-Firebase-ETag": "true"})
+        response.raise_for_status()
+        return response.json(), response.headers.get("ETag")
+
+    def put(self, caminho, dados, etag=None, timeout=None):
+        """
+        Grava `dados` no caminho. Com `etag`, só grava se o dado ainda for o mesmo
+        lido com esse ETag; retorna False nesse caso (412) e True se gravou.
+
+        O retry da sessão pode repetir um PUT que já tinha gravado (a resposta se
+        perdeu): a repetição recebe 412. Por isso um 412 relê o caminho e, se o
+        valor lá é exatamente `dados`, conta como gravado.
+        """
+        headers = {"X-Firebase-ETag": "true", "if-match": etag} if etag else None
+        response = self._requisitar("PUT", caminho, timeout, json=dados, headers=headers)
+        self.cache.invalidar(caminho)  # depois da escrita, para não recachear o valor antigo
+        if etag and response.status_code == 412:
+            return self.get(caminho, timeout) == dados
+        response.raise_for_status()
+        return True
+
+    def patch(self, caminho, dados, timeout=None):
+        response = self._requisitar("PATCH", caminho, timeout, json=dados)
+        self.cache.invalidar(caminho)
+        response.raise_for_status()
+        return True
+
+    def delete(self, caminho, timeout=None):
+        response = self._requisitar("DELETE", caminho, timeout)
+        self.cache.invalidar(caminho)
+        response.raise_for_status()
+        return True
+
+    def criar_se_ausente(self, caminho, dados, timeout=None):
+        """Cria o nó numa única ida ao servidor; False se ele já existia."""
+        return self.put(caminho, dados, etag=NULL_ETAG, timeout=timeout)
+
+
+_clientes = {}
+_lock = threading.Lock()
+
+
+def obter_cliente(url_base):
+    """Um cliente (e um pool de conexões) por URL do Firebase, compartilhado pelo processo."""
+    chave = url_base.rstrip("/")
+    with _lock:
+        if chave not in _clientes:
+            _clientes[chave] = ClienteFirebase(chave)
+        return _clientes[chave]
@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype, is_numeric_dtype, union_categoricals
+
+FORMATO_DATA = "%d/%m/%Y %H:%M:%S"
+
+# Trechos do nome da coluna (minúsculo) -> papel no ledger
+COLUNA_DATA = "data"
+COLUNA_VALOR = "valor"
+COLUNAS_CATEGORICAS = ("categoria", "pagamento", "recorr")
+
+_DIAS_MES = np.array([0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+
+def achar_coluna(df, trecho):
+    return next((c for c in df.columns if trecho in str(c).lower()), None)
+
+
+def limpar_moeda(v):
+    if isinstance(v, str):
+        v = v.replace('R$', '').replace(' ', '')
+        if '.' in v and ',' in v:
+            v = v.replace('.', '').replace(',', '.')
+        elif ',' in v:
+            v = v.replace(',', '.')
+        return v
+    return v
+
+
+def _matriz(serie):
+    """Série de texto -> matriz (linhas x caracteres) de code points, preenchida com 0."""
+    texto = np.asarray(serie.to_numpy(dtype=object, na_value=""), dtype="U")
+    largura = max(texto.dtype.itemsize // 4, 1)
+    return texto.view(np.uint32).reshape(len(texto), largura)
+
+
+def moeda_para_float(serie):
+    """
+    'R$ 1.234,56' / '8,50' / '8.5' / 8.5 -> float64, mesma regra de limpar_moeda
+    (com vírgula, ela é o decimal e os pontos são milhar), com operações .str
+    sobre a coluna inteira. O que não vira número fica 0.
+    """
+    if is_numeric_dtype(serie):
+        return serie.astype("float64")
+    try:
+        texto = serie.str.replace("R$", "", regex=False).str.replace(" ", "", regex=False)
+    except AttributeError:  # nenhum texto na coluna
+        return pd.to_numeric(serie, errors="coerce").fillna(0.0).astype("float64")
+    milhar = texto.str.contains(".", regex=False, na=False) & texto.str.contains(",", regex=False, na=False)
+    texto = texto.mask(milhar, texto.str.replace(".", "", regex=False)).str.replace(",", ".", regex=False)
+    valores = pd.to_numeric(texto, errors="coerce")
+    # Números soltos numa coluna de texto: limpar_moeda os devolve como estão
+    numeros = pd.to_numeric(serie.where(texto.isna()), errors="coerce")
+    return valores.fillna(numeros).fillna(0.0).astype("float64")
+
+
+def texto_para_data(serie):
+    """'dd/mm/aaaa hh:mm:ss' -> datetime64, lendo os dígitos por posição; outros formatos via pandas."""
+    m = _matriz(serie)
+    if m.shape[1] < 19:
+        return pd.to_datetime(serie, format=FORMATO_DATA, errors="coerce")
+    d = m[:, :19].astype(np.int64) - 48
+
+    posicoes = [0, 1, 3, 4, 6, 7, 8, 9, 11, 12, 14, 15, 17, 18]
+    ok = ((d[:, posicoes] >= 0) & (d[:, posicoes] <= 9)).all(axis=1)
+    ok &= (m[:, 2] == ord("/")) & (m[:, 5] == ord("/")) & (m[:, 10] == ord(" "))
+    ok &= (m[:, 13] == ord(":")) & (m[:, 16] == ord(":"))
+    ok &= (m[:, 19:] == 0).all(axis=1)
+
+    dia, mes = d[:, 0] * 10 + d[:, 1], d[:, 3] * 10 + d[:, 4]
+    ano = d[:, 6] * 1000 + d[:, 7] * 100 + d[:, 8] * 10 + d[:, 9]
+    hora, minuto, segundo = d[:, 11] * 10 + d[:, 12], d[:, 14] * 10 + d[:, 15], d[:, 17] * 10 + d[:, 18]
+    bissexto = (ano % 4 == 0) & ((ano % 100 != 0) | (ano % 400 == 0))
+    ok &= (mes >= 1) & (mes <= 12) & (dia >= 1) & (hora < 24) & (minuto < 60) & (segundo < 60)
+    ok &= dia <= np.where((mes == 2) & ~bissexto, 28, _DIAS_MES[np.clip(mes, 0, 12)])
+
+    # Dias desde 1970-01-01 (days_from_civil, calendário gregoriano proléptico)
+    a = ano - (mes <= 2)
+    era = a // 400
+    ano_era = a - era * 400
+    dia_ano = (153 * (mes + np.where(mes > 2, -3, 9)) + 2) // 5 + dia - 1
+    dias = era * 146097 + ano_era * 365 + ano_era // 4 - ano_era // 100 + dia_ano - 719468
+    segundos = dias * 86400 + hora * 3600 + minuto * 60 + segundo
+
+    resultado = pd.Series(np.where(ok, segundos, 0).astype("datetime64[s]"), index=serie.index)
+    resultado = resultado.astype("datetime64[ns]").where(ok)
+    if not ok.all():
+        resultado[~ok] = pd.to_datetime(serie[~ok], format=FORMATO_DATA, errors="coerce")
+    return resultado
+
+
+def tipar_ledger(bruto):
+    """
+    Converte o payload da planilha num DataFrame tipado, numa passada vetorizada:
+    valor em float64, data/hora em datetime64 e categoria, pagamento e
+    recorrência como category. Aceita lista de linhas (cabeçalho na primeira) ou DataFrame.
+    """
+    if isinstance(bruto, pd.DataFrame):
+        df = bruto.copy()
+    else:
+        df = pd.DataFrame(bruto[1:], columns=bruto[0]) if bruto else pd.DataFrame()
+
+    col_val = achar_coluna(df, COLUNA_VALOR)
+    if col_val is not None:
+        df[col_val] = moeda_para_float(df[col_val])
+
+    col_data = achar_coluna(df, COLUNA_DATA)
+    if col_data is not None and not is_datetime64_any_dtype(df[col_data]):
+        df[col_data] = texto_para_data(df[col_data])
+
+    for trecho in COLUNAS_CATEGORICAS:
+        col = achar_coluna(df, trecho)
+        if col is not None and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    return df
+
+
+def concatenar_tipado(base, novas):
+    """Anexa linhas já tipadas sem perder os dtypes category (une as categorias)."""
+    if base.empty:
+        return novas
+    if novas.empty:
+        return base
+    juntos = pd.concat([base, novas], ignore_index=True)
+    for col in base.columns:
+        if isinstance(base[col].dtype, pd.CategoricalDtype) and col in novas.columns:
+            juntos[col] = union_categoricals([base[col], novas[col].astype("category")], ignore_order=True)
+    return juntos
@@ -0,0 +1,89 @@
+import threading
+import time
+from collections import deque
+
+INTERVALO_QUADRO = 1 / 60   # um update de tela por quadro, no máximo
+MAX_VISIVEIS = 60           # mensagens renderizadas no fim da conversa
+MAX_HISTORICO = 1000        # mensagens antigas guardadas (só texto) para rolar de volta
+LOTE_ANTIGAS = 20
+
+
+class CanalUI:
+    """
+    Canal único de alterações de tela, para qualquer thread.
+
+    `agendar(func, *controles)` guarda a alteração; uma thread junta tudo o que
+    chegou dentro do mesmo quadro, aplica em ordem e chama `atualizar(controles)`
+    uma vez só, com cada controle alterado uma vez (em vez de um update por
+    append/scroll/status).
+    """
+
+    def __init__(self, atualizar, intervalo=INTERVALO_QUADRO):
+        self.atualizar = atualizar
+        self.intervalo = intervalo
+        self.quadros = 0
+        self.alteracoes = 0
+        self._pendentes = []
+        self._cond = threading.Condition()
+        threading.Thread(target=self._loop, daemon=True, name="canal-ui").start()
+
+    def agendar(self, func, *controles):
+        with self._cond:
+            self._pendentes.append((func, controles))
+            self._cond.notify()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pendentes)
+            time.sleep(self.intervalo)  # o que chegar até o fim do quadro vai junto
+            with self._cond:
+                lote, self._pendentes = self._pendentes, []
+            alterados = {}
+            for func, controles in lote:
+                try:
+                    func()
+                except Exception as e:
+                    print(f"❌ Erro na alteração de tela: {e}")
+                for controle in controles:
+                    alterados.setdefault(id(controle), controle)
+            try:
+                self.atualizar(list(alterados.values()))
+            except Exception as e:
+                print(f"❌ Erro ao atualizar a tela: {e}")
+            self.quadros += 1
+            self.alteracoes += len(lote)
+
+
+class HistoricoChat:
+    """
+    Histórico do chat com teto de controles renderizados.
+
+    `controles` é a lista do ListView. Só as últimas `visiveis` mensagens viram
+    controles; as mais antigas saem da tela e ficam num buffer circular como
+    tuplas (autor, texto, alinhamento), até `limite`. `carregar_antigas` as
+    recria no topo quando o usuário rola para cima. Não é thread-safe: use
+    pelo CanalUI.
+    """
+
+    def __init__(self, controles, criar, visiveis=MAX_VISIVEIS, limite=MAX_HISTORICO):
+        self.controles = controles
+        self.criar = criar
+        self.visiveis = visiveis
+        self.antigas = deque(maxlen=limite)
+        self._na_tela = deque()  # mensagens correspondentes a self.controles, na mesma ordem
+
+    def adicionar(self, mensagem):
+        self.controles.append(self.criar(mensagem))
+        self._na_tela.append(mensagem)
+        while len(self._na_tela) > self.visiveis:
+            self.antigas.append(self._na_tela.popleft())
+            self.controles.pop(0)
+
+    def carregar_antigas(self, n=LOTE_ANTIGAS):
+        """Recoloca no topo as `n` mensagens antigas mais recentes; retorna quantas."""
+        lote = [self.antigas.pop() for _ in range(min(n, len(self.antigas)))]
+        for mensagem in lote:
+            self.controles.insert(0, self.criar(mensagem))
+            self._na_tela.appendleft(mensagem)
+        return len(lote)
@@ -0,0 +1,120 @@
+from core.extrator_regras import PERGUNTAS, pergunta_faltante
+
+CAMPOS_GASTO = ("item", "valor", "categoria", "pagamento", "recorrencia", "local_compra")
+
+
+def como_lote(dados):
+    """Resposta no formato antigo (campos do gasto soltos no objeto) -> com a lista "gastos"."""
+    if not isinstance(dados, dict) or "gastos" in dados:
+        return dados
+    gasto = {c: dados.pop(c) for c in CAMPOS_GASTO if c in dados}
+    dados["gastos"] = [gasto] if any(v is not None for v in gasto.values()) else []
+    return dados
+
+
+def _campos(gasto):
+    return {c: v for c, v in gasto.items() if c in CAMPOS_GASTO and v is not None and v != ""}
+
+
+def _rotulo(gasto):
+    if gasto.get("item"):
+        return str(gasto["item"]).capitalize()
+    if gasto.get("valor"):
+        return f"R$ {float(gasto['valor']):.2f}".replace(".", ",")
+    return None
+
+
+def _id(gasto):
+    try:
+        return int(gasto.get("id"))
+    except (TypeError, ValueError):
+        return None
+
+
+class LoteGastos:
+    """
+    Gastos de uma conversa: uma fala pode trazer vários ("pão 8 reais no débito
+    e café 12 no pix"), e cada um é completado com as suas próprias perguntas.
+
+    Cada gasto tem um "id" estável (1, 2, ...) que vai junto em `itens` para o
+    contexto do prompt e que o modelo devolve. A lista "gastos" da resposta é a
+    lista completa e substitui a atual: casa pelo id (campo null mantém o valor
+    de antes) e gasto sem id é novo — dois "café" na mesma fala são dois gastos,
+    e "pão" que virou "Pão francês" continua sendo o mesmo. Campos soltos de uma
+    resposta curta (regras), ou um único gasto sem id, vão para o gasto pendente. Só quando todos estão
+    completos (`pronto`) o lote é gravado de uma vez. `exigir` e `padroes`
+    seguem as regras de cada app.
+    """
+
+    def __init__(self, exigir=("item", "valor", "pagamento"), padroes=None):
+        self.exigir = exigir
+        self.padroes = padroes or {}
+        self.itens = []
+        self._ultimo_id = 0
+
+    def __bool__(self):
+        return bool(self.itens)
+
+    def completo(self, gasto):
+        return pergunta_faltante(gasto, self.exigir) is None
+
+    def _indice_pendente(self):
+        return next((i for i, g in enumerate(self.itens) if not self.completo(g)), None)
+
+    def pendente(self):
+        """Gasto que está sendo completado agora (dict vazio se não há)."""
+        i = self._indice_pendente()
+        return dict(self.itens[i]) if i is not None else {}
+
+    def _novo(self, campos):
+        self._ultimo_id += 1
+        return {"id": self._ultimo_id, **self.padroes, **campos}
+
+    def aplicar(self, dados):
+        gastos = dados.get("gastos")
+        if gastos is None:  # resposta curta (regras): vale para o gasto pendente
+            gastos = [{c: dados[c] for c in CAMPOS_GASTO if dados.get(c) is not None}]
+            if not gastos[0]:
+                return
+        gastos = [g for g in gastos if isinstance(g, dict)]
+        i = self._indice_pendente()
+        if i is not None and len(gastos) == 1 and _id(gastos[0]) is None:
+            # um gasto sem id com o lote em andamento: complemento do pendente
+            self.itens[i].update(_campos(gastos[0]))
+            return
+        por_id = {g["id"]: g for g in self.itens}
+        novos = []
+        for gasto in gastos:
+            atual = por_id.pop(_id(gasto), None)  # pop: id repetido vira gasto novo
+            novos.append({**atual, **_campos(gasto)} if atual is not None else self._novo(_campos(gasto)))
+        self.itens = novos
+
+    def pergunta(self):
+        """
+        Próxima pergunta (do primeiro gasto incompleto, com o nome dele se há mais de um) ou
+        None. Lote vazio (a fala não trouxe gasto) pergunta o item: nunca há o que gravar.
+        """
+        if not self.itens:
+            return PERGUNTAS["item"]
+        i = self._indice_pendente()
+        if i is None:
+            return None
+        pergunta = pergunta_faltante(self.itens[i], self.exigir)
+        rotulo = _rotulo(self.itens[i])
+        if len(self.itens) > 1 and rotulo and pergunta != PERGUNTAS["item"]:
+            return f"{rotulo}: {pergunta[0].lower()}{pergunta[1:]}"
+        if len(self.itens) > 1 and rotulo:
+            return f"{rotulo}: o que foi?"
+        return pergunta
+
+    def pronto(self):
+        return bool(self.itens) and self._indice_pendente() is None
+
+    def resumo(self):
+        """'pão de 8.0 e café de 12.0' para a confirmação ('' com o lote vazio)."""
+        partes = [f"{g.get('item')} de {g.get('valor')}" for g in self.itens]
+        return " e ".join(filter(None, [", ".join(partes[:-1]), "".join(partes[-1:])]))
+
+    def esvaziar(self):
+        self.itens = []
+        self._ultimo_id = 0
@@ -0,0 +1,301 @@
+import queue
+import re
+import threading
+import time
+from datetime import date, datetime
+
+import pandas as pd
+from gspread.utils import rowcol_to_a1
+
+from core.armazenamento import COLUNAS
+from core.ingestao import FORMATO_DATA, achar_coluna, concatenar_tipado, tipar_ledger
+from core.rollups import Rollups
+
+# Partições: uma aba por mês, com o título AAAA-MM; a primeira aba é o ledger de antes das partições
+ABA_RESUMO = "Resumo"
+CABECALHO_RESUMO = ["Mês", "Dimensão", "Chave", "Valor", "Quantidade"]
+DIMENSOES_RESUMO = ("categoria", "pagamento", "recorrencia")
+CARENCIA_DIAS = 2                  # um mês só fecha depois disso (linhas atrasadas do journal ainda entram)
+INTERVALO_COMPACTACAO = 60 * 60    # no máximo uma compactação por ledger nesse intervalo
+_TITULO_MES = re.compile(r"^\d{4}-\d{2}$")
+# Trecho do nome (minúsculo) que acha na primeira aba cada coluna de COLUNAS, na mesma ordem
+TRECHOS_COLUNAS = ("data", "item", "valor", "categoria", "pagamento", "local", "recorr", "status")
+
+
+def particao_de(momento):
+    """'dd/mm/aaaa hh:mm:ss' ou datetime -> 'AAAA-MM' (mês atual se a data não der para ler)."""
+    if isinstance(momento, str):
+        try:
+            momento = datetime.strptime(momento.strip(), FORMATO_DATA)
+        except ValueError:
+            momento = None
+    if momento is None or pd.isna(momento):
+        momento = datetime.now()
+    return momento.strftime("%Y-%m")
+
+
+def e_particao(titulo):
+    return bool(_TITULO_MES.match(titulo))
+
+
+def ultimos_meses(n, hoje=None):
+    """Os `n` meses até o de `hoje`, do mais antigo ao atual."""
+    hoje = hoje or date.today()
+    ano, mes = hoje.year, hoje.month
+    meses = []
+    for _ in range(n):
+        meses.append(f"{ano:04d}-{mes:02d}")
+        ano, mes = (ano, mes - 1) if mes > 1 else (ano - 1, 12)
+    return meses[::-1]
+
+
+def mes_fechado(mes, hoje=None):
+    hoje = hoje or date.today()
+    ano, numero = int(mes[:4]), int(mes[5:])
+    seguinte = date(ano + numero // 12, numero % 12 + 1, 1)
+    return (hoje - seguinte).days >= CARENCIA_DIAS
+
+
+def linhas_resumo(mes, rollups):
+    """Linhas da aba Resumo de um mês: o total (com a quantidade) e um total por chave de cada dimensão."""
+    linhas = [[mes, "total", "", round(rollups.total, 2), rollups.quantidade]]
+    for dimensao in DIMENSOES_RESUMO:
+        for chave, valor in sorted(rollups.por[dimensao].items()):
+            linhas.append([mes, dimensao, str(chave), round(valor, 2), ""])
+    return linhas
+
+
+def resumos_de(df):
+    """DataFrame da aba Resumo -> {mês: Rollups}. Linhas repetidas sobrescrevem, não somam."""
+    colunas = [achar_coluna(df, trecho) for trecho in ("mês", "dimens", "chave", "valor", "quant")]
+    resumos = {}
+    if df.empty or None in colunas:
+        return resumos
+    for mes, dimensao, chave, valor, quantidade in df[colunas].itertuples(index=False):
+        if not e_particao(str(mes)):
+            continue
+        rollups = resumos.setdefault(mes, Rollups())
+        if dimensao == "total":
+            rollups.total = float(valor)
+            rollups.quantidade = int(float(quantidade or 0))
+            rollups.por["mes"][mes] = float(valor)
+        elif dimensao in DIMENSOES_RESUMO and chave:
+            rollups.por[dimensao][chave] = float(valor)
+    return resumos
+
+
+class LeitorParticoes:
+    """
+    Leitura do ledger particionado em abas mensais (AAAA-MM).
+
+    Só as partições dos meses pedidos são lidas, cada uma com o delta sync do
+    SincronizadorPlanilha; meses fechados que já têm resumo entram pela aba
+    Resumo, sem ler as linhas. A primeira aba (o ledger de antes das partições)
+    só é lida enquanto ainda tiver linhas, isto é, até o Compactador migrá-la.
+    `meses=None` quer dizer o histórico inteiro.
+    """
+
+    def __init__(self, sincronizador):
+        self.sincronizador = sincronizador
+        self.registro = sincronizador.registro
+        self._sem_legado = set()
+
+    def meses(self, sheet_id, meses=None):
+        """Partições existentes na planilha (dentre `meses`), em ordem."""
+        existentes = sorted(t for t in self.registro.titulos(sheet_id) if e_particao(t))
+        return existentes if meses is None else [m for m in existentes if m in set(meses)]
+
+    def resumos(self, sheet_id):
+        if ABA_RESUMO not in self.registro.titulos(sheet_id):
+            return {}
+        return resumos_de(self.sincronizador.dados(sheet_id, ABA_RESUMO))
+
+    def legado(self, sheet_id, meses=None):
+        """Linhas que ainda estão na primeira aba (None quando não há), só dos `meses`."""
+        if sheet_id in self._sem_legado:
+            return None
+        df = self.sincronizador.dados(sheet_id)
+        if df.empty:
+            self._sem_legado.add(sheet_id)
+            self.sincronizador.descartar(sheet_id)
+            return None
+        col_data = achar_coluna(df, "data")
+        if meses is not None and col_data is not None:
+            df = df[df[col_data].dt.strftime("%Y-%m").isin(list(meses))]
+        return df
+
+    def _tem_legado(self, sheet_id):
+        """Se a primeira aba ainda tem linhas, pela sonda da coluna A (sem baixar a aba)."""
+        if sheet_id in self._sem_legado:
+            return False
+        if not self.sincronizador.revisao(sheet_id)[0]:
+            self._sem_legado.add(sheet_id)
+            self.sincronizador.descartar(sheet_id)
+            return False
+        return True
+
+    def dados(self, sheet_id, meses=None):
+        partes = [self.sincronizador.dados(sheet_id, mes) for mes in self.meses(sheet_id, meses)]
+        legado = self.legado(sheet_id, meses)
+        if legado is not None:
+            partes.insert(0, legado)
+        df = tipar_ledger(pd.DataFrame(columns=COLUNAS))
+        for parte in partes:
+            df = concatenar_tipado(df, parte)
+        return df
+
+    def rollups(self, sheet_id, meses=None):
+        resumos = self.resumos(sheet_id)
+        pedidos = set(self.meses(sheet_id, meses)) | {m for m in resumos if meses is None or m in set(meses)}
+        total = Rollups()
+        for mes in sorted(pedidos):
+            total.somar(resumos[mes] if mes in resumos else self.sincronizador.rollups(sheet_id, mes))
+        if meses is None and self.legado(sheet_id) is not None:
+            total.somar(self.sincronizador.rollups(sheet_id))  # já mantidos pelo sincronizador
+        elif meses is not None:
+            legado = self.legado(sheet_id, meses)
+            if legado is not None:
+                total.somar(Rollups.de_dataframe(legado))
+        return total
+
+    def pagina(self, sheet_id, n=10, cursor=None, meses=None):
+        """
+        Até `n` linhas anteriores ao `cursor` (None = as mais recentes), do mês mais
+        novo para trás, lendo por intervalo A1 só as linhas da página (ver
+        SincronizadorPlanilha.ultimas). O cursor é (aba, última linha a ler).
+        -> (DataFrame em ordem cronológica, cursor da página seguinte ou None)
+        """
+        ordem = self.meses(sheet_id, meses)[::-1]
+        if self._tem_legado(sheet_id):
+            ordem.append(None)  # primeira aba: o ledger de antes das partições
+        if cursor is None:
+            cursor = (ordem[0], None) if ordem else None
+        elif cursor[0] not in ordem:
+            cursor = None
+        partes, faltam = [], n
+        while faltam > 0 and cursor is not None:
+            aba, ate = cursor
+            parte, inicio = self.sincronizador.ultimas(sheet_id, faltam, aba, ate)
+            col_data = achar_coluna(parte, "data")
+            if aba is None and meses is not None and col_data is not None:
+                parte = parte[parte[col_data].dt.strftime("%Y-%m").isin(list(meses))]
+            partes.insert(0, parte)
+            faltam -= len(parte)
+            if inicio > 2:
+                cursor = (aba, inicio - 1)
+            else:
+                seguinte = ordem.index(aba) + 1
+                cursor = (ordem[seguinte], None) if seguinte < len(ordem) else None
+        df = tipar_ledger(pd.DataFrame(columns=COLUNAS))
+        for parte in partes:
+            df = concatenar_tipado(df, parte)
+        return df.reset_index(drop=True), cursor
+
+    def recentes(self, sheet_id, n=10, meses=None):
+        return self.pagina(sheet_id, n, None, meses)[0]
+
+    def revisao(self, sheet_id):
+        """
+        Muda com gasto novo no mês atual ou aba nova (virada do mês, migração, compactação).
+        Não baixa abas: no pior caso, a lista de títulos e a coluna A do mês atual e da primeira aba.
+        """
+        titulos = self.registro.titulos(sheet_id)
+        atual = ultimos_meses(1)[0]
+        mes_atual = self.sincronizador.revisao(sheet_id, atual) if atual in titulos else None
+        legado = None if sheet_id in self._sem_legado else self.sincronizador.revisao(sheet_id)
+        return len(titulos), mes_atual, legado
+
+
+class Compactador:
+    """
+    Fecha os meses passados de cada ledger, numa thread em segundo plano.
+
+    `compactar` migra as linhas da primeira aba (ledger de antes das partições)
+    para as abas mensais e limpa a primeira aba; depois grava na aba Resumo os
+    totais (geral, por categoria, pagamento e recorrência) de cada mês fechado
+    que ainda não tem resumo. As abas dos meses fechados continuam na planilha
+    como arquivo: o dashboard só as lê quando o período pede as linhas.
+    A migração é "pelo menos uma vez", como a FilaGravacao: se o processo cair
+    entre o append e a limpeza, as linhas são migradas de novo.
+    """
+
+    def __init__(self, leitor, intervalo=INTERVALO_COMPACTACAO):
+        self.leitor = leitor
+        self.sincronizador = leitor.sincronizador
+        self.registro = leitor.registro
+        self.intervalo = intervalo
+        self.resumidos = 0
+        self.migradas = 0
+        self._ultima = {}  # sheet_id -> momento (monotonic) da última compactação agendada
+        self._fila = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def agendar(self, sheet_id):
+        """Pede a compactação do ledger; chamadas dentro do intervalo são ignoradas."""
+        with self._lock:
+            ultima = self._ultima.get(sheet_id)
+            if ultima is not None and time.monotonic() - ultima < self.intervalo:
+                return
+            self._ultima[sheet_id] = time.monotonic()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, daemon=True, name="compactador")
+                self._thread.start()
+        self._fila.put(sheet_id)
+
+    def _loop(self):
+        while True:
+            sheet_id = self._fila.get()
+            try:
+                self.compactar(sheet_id)
+            except Exception as e:
+                self.registro.invalidar(sheet_id)
+                print(f"❌ Erro ao compactar o ledger: {e}")
+
+    def compactar(self, sheet_id, hoje=None):
+        """Migra o ledger antigo e resume os meses fechados. Retorna quantos meses resumiu."""
+        self.migradas += self._migrar_legado(sheet_id)
+        resumidos = self.leitor.resumos(sheet_id)
+        fechados = [m for m in self.leitor.meses(sheet_id) if m not in resumidos and mes_fechado(m, hoje)]
+        linhas = []
+        for mes in fechados:
+            linhas += linhas_resumo(mes, self.sincronizador.rollups(sheet_id, mes))
+            self.sincronizador.descartar(sheet_id, mes)  # mês fechado não precisa ficar em memória
+        if linhas:
+            self.registro.particao(sheet_id, ABA_RESUMO, CABECALHO_RESUMO).append_rows(linhas)
+            self.sincronizador.invalidar(sheet_id, ABA_RESUMO)
+            self.resumidos += len(fechados)
+        return len(fechados)
+
+    def _migrar_legado(self, sheet_id):
+        self.sincronizador.descartar(sheet_id)  # lê a primeira aba agora: a limpeza usa o mesmo intervalo
+        legado = self.leitor.legado(sheet_id)
+        if legado is None:
+            return 0
+        col_data, col_valor = achar_coluna(legado, "data"), achar_coluna(legado, "valor")
+        # As abas mensais usam sempre COLUNAS: cada coluna vem da coluna do legado com o mesmo nome
+        fontes = [achar_coluna(legado, trecho) for trecho in TRECHOS_COLUNAS]
+        por_mes = {}
+        for registro in legado.to_dict("records"):
+            linha = []
+            for coluna in fontes:
+                valor = registro[coluna] if coluna is not None else None
+                if coluna is None or pd.isna(valor):
+                    linha.append("")
+                elif coluna == col_data:
+                    linha.append(valor.strftime(FORMATO_DATA))
+                elif coluna == col_valor:
+                    linha.append(float(valor))
+                else:
+                    linha.append(str(valor))
+            if not any(v for v in linha if not isinstance(v, float)):
+                continue  # linha em branco no meio da planilha
+            momento = registro[col_data] if col_data is not None else None
+            por_mes.setdefault(particao_de(momento), []).append(linha)
+
+        for mes, linhas in sorted(por_mes.items()):
+            self.registro.particao(sheet_id, mes, COLUNAS).append_rows(linhas)
+            self.sincronizador.invalidar(sheet_id, mes)
+        self.registro.aba(sheet_id).batch_clear([f"A2:{rowcol_to_a1(len(legado) + 1, len(legado.columns))}"])
+        self.sincronizador.descartar(sheet_id)
+        return sum(len(linhas) for linhas in por_mes.values())
@@ -0,0 +1,68 @@
+import threading
+import time
+from collections import deque
+
+HISTORICO = 200  # turnos guardados por etapa para os percentis
+
+
+class MedidorEtapas:
+    """Guarda a duração das etapas dos últimos turnos e calcula p50/p95 por etapa."""
+
+    def __init__(self, historico=HISTORICO):
+        self.historico = historico
+        self._tempos = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, tempos):
+        with self._lock:
+            for etapa, segundos in tempos.items():
+                self._tempos.setdefault(etapa, deque(maxlen=self.historico)).append(segundos)
+
+    def percentil(self, etapa, p):
+        with self._lock:
+            valores = sorted(self._tempos.get(etapa, ()))
+        if not valores:
+            return None
+        return valores[min(len(valores) - 1, int(round(p / 100 * (len(valores) - 1))))]
+
+    def resumo(self):
+        """{etapa: (p50, p95, amostras)}"""
+        with self._lock:
+            etapas = list(self._tempos)
+        return {e: (self.percentil(e, 50), self.percentil(e, 95), len(self._tempos[e])) for e in etapas}
+
+
+class TurnoVoz:
+    """
+    Um turno de voz cronometrado (transcrição -> extração -> gravação -> TTS).
+
+    `etapa` roda e mede na thread atual; `em_paralelo` manda para o executor e
+    devolve o Future, para a síntese de uma pergunta antecipada pela extração
+    andar enquanto o resto do JSON chega.
+    `marcar` registra um instante desde o início (ex: "primeiro_audio").
+    """
+
+    def __init__(self, executor, medidor=None):
+        self.executor = executor
+        self.medidor = medidor
+        self.inicio = time.perf_counter()
+        self.tempos = {}
+
+    def etapa(self, nome, func, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.tempos[nome] = self.tempos.get(nome, 0.0) + time.perf_counter() - inicio
+
+    def em_paralelo(self, nome, func, *args, **kwargs):
+        return self.executor.submit(self.etapa, nome, func, *args, **kwargs)
+
+    def marcar(self, nome):
+        self.tempos[nome] = time.perf_counter() - self.inicio
+
+    def concluir(self):
+        self.tempos.setdefault("total", time.perf_counter() - self.inicio)
+        if self.medidor is not None:
+            self.medidor.registrar(self.tempos)
+        return self.tempos
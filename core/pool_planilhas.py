@@ -0,0 +1,159 @@
+import queue
+import threading
+import time
+from datetime import datetime
+
+from core.cota_google import ESCRITA, AgendadorGoogle
+
+CAMINHO_POOL = "pool_planilhas"
+TAMANHO_ALVO = 3            # planilhas livres mantidas prontas
+INTERVALO_VERIFICACAO = 300  # segundos entre conferências do pool (além do aviso a cada reivindicação)
+NOME_POOL = "MYND_Finance_pool"
+
+
+class DriveGoogle:
+    """
+    Cópia e renomeação de planilhas pela Drive API. O cliente é montado no primeiro
+    uso; as chamadas passam pelo `agendador` (o mesmo do RegistroPlanilhas, de preferência).
+    """
+
+    def __init__(self, creds_factory, agendador=None):
+        self.creds_factory = creds_factory
+        self.agendador = agendador or AgendadorGoogle()
+        self._service = None
+        self._lock = threading.Lock()
+
+    def _arquivos(self):
+        with self._lock:
+            if self._service is None:
+                from googleapiclient.discovery import build
+                self._service = build("drive", "v3", credentials=self.creds_factory())
+            return self._service.files()
+
+    def copiar(self, template_id, nome):
+        pedido = self._arquivos().copy(fileId=template_id, body={"name": nome})
+        return self.agendador.executar("drive", ESCRITA, pedido.execute).get("id")
+
+    def renomear(self, arquivo_id, nome):
+        pedido = self._arquivos().update(fileId=arquivo_id, body={"name": nome})
+        self.agendador.executar("drive", ESCRITA, pedido.execute)
+
+
+class ProvisionadorPlanilhas:
+    """
+    Pool de cópias da planilha modelo, criadas antes de alguém precisar delas.
+
+    No Firebase, cada planilha pronta é um nó `pool_planilhas/<sheet_id>`; o filho
+    `dono` só existe depois que ela é reivindicada. Reivindicar é ler o nó com ETag e
+    regravá-lo com `dono` por uma escrita condicional (`if-match`): se outro login
+    reivindicou ou o nó foi concluído nesse meio tempo, o PUT falha, então dois
+    logins nunca ficam com a mesma planilha, nem com uma lista velha do pool. Depois que o
+    sheet_id está no perfil, `concluir` tira o nó do pool: ele só guarda as livres e
+    as reivindicações em andamento, e cada GET custa o mesmo com 10 ou 10 mil usuários.
+    Uma thread em segundo plano repõe o pool até `alvo` livres, renomeia as
+    planilhas reivindicadas e apaga os nós concluídos.
+    `reivindicar` retorna None com o pool vazio: aí quem chama faz a cópia na hora.
+    """
+
+    def __init__(self, drive, firebase, template_id, alvo=TAMANHO_ALVO, intervalo=INTERVALO_VERIFICACAO,
+                 caminho=CAMINHO_POOL):
+        self.drive = drive
+        self.firebase = firebase
+        self.template_id = template_id
+        self.alvo = alvo
+        self.intervalo = intervalo
+        self.caminho = caminho
+        self.copias = 0
+        self.reivindicadas = 0
+        self._acordar = threading.Event()
+        self._renomear = queue.Queue()
+        self._concluidas = queue.Queue()
+        self._thread = None
+
+    def _pool(self):
+        return self.firebase.get(self.caminho) or {}
+
+    def livres(self):
+        return sum(1 for info in self._pool().values() if not (info or {}).get("dono"))
+
+    def reivindicar(self, usuario, nome=None):
+        """sheet_id reservado para `usuario` (o mesmo de antes, se ele já tinha reivindicado), ou None."""
+        pool = self._pool()
+        for sid, info in pool.items():
+            if (info or {}).get("dono") == usuario:  # reivindicou mas não chegou a gravar no perfil
+                return sid
+        candidatos = sorted((sid for sid, info in pool.items() if not (info or {}).get("dono")),
+                            key=lambda sid: str(pool[sid].get("criada_em", "")))
+        for sid in candidatos:
+            # Condicional no nó inteiro: um nó já concluído (apagado) não volta à vida com um `dono` órfão
+            info, etag = self.firebase.get_com_etag(f"{self.caminho}/{sid}")
+            if not info or info.get("dono"):
+                continue
+            if self.firebase.put(f"{self.caminho}/{sid}", {**info, "dono": usuario}, etag=etag):
+                self.reivindicadas += 1
+                self._renomear.put((sid, nome or f"MYND_Finance_{usuario}"))
+                self._acordar.set()  # repõe o que saiu
+                return sid
+        self._acordar.set()
+        return None
+
+    def concluir(self, sheet_id):
+        """A planilha já está no perfil do dono: o nó sai do pool (em segundo plano)."""
+        self._concluidas.put(sheet_id)
+        self._acordar.set()
+
+    def _apagar_concluidas(self):
+        while True:
+            try:
+                sid = self._concluidas.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                self.firebase.delete(f"{self.caminho}/{sid}")
+            except Exception as e:
+                self._concluidas.put(sid)  # tenta de novo na próxima volta
+                raise e
+
+    def reabastecer(self):
+        """Cria cópias até o pool ter `alvo` planilhas livres. Retorna quantas criou."""
+        faltam = self.alvo - self.livres()
+        criadas = 0
+        for _ in range(max(0, faltam)):
+            novo_id = self.drive.copiar(self.template_id, f"{NOME_POOL}_{int(time.time() * 1000)}")
+            self.firebase.put(f"{self.caminho}/{novo_id}",
+                              {"criada_em": datetime.now().strftime("%Y-%m-%d %H:%M:%S")})
+            self.copias += 1
+            criadas += 1
+        return criadas
+
+    def _processar_renomeacoes(self):
+        while True:
+            try:
+                sid, nome = self._renomear.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                self.drive.renomear(sid, nome)
+            except Exception as e:
+                print(f"❌ Erro ao renomear planilha {sid}: {e}")
+
+    def _loop(self):
+        falhas = 0
+        while True:
+            try:
+                self._processar_renomeacoes()
+                self._apagar_concluidas()
+                self.reabastecer()
+                falhas = 0
+            except Exception as e:
+                falhas += 1
+                print(f"❌ Erro ao repor o pool de planilhas: {e}")
+            espera = self.intervalo if not falhas else min(self.intervalo, 5 * 2 ** falhas)
+            self._acordar.wait(espera)
+            self._acordar.clear()
+
+    def iniciar(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, daemon=True, name="pool-planilhas")
+            self._thread.start()
+        return self
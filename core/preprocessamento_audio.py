@@ -0,0 +1,106 @@
+import io
+import wave
+
+import numpy as np
+
+# FLAC via soundfile (no requirements.txt); numa instalação sem ele o envio cai para WAV 16 kHz mono
+try:
+    import soundfile as sf
+
+    FLAC_AVAILABLE = True
+except Exception:
+    FLAC_AVAILABLE = False
+
+TAXA_ALVO = 16000          # o Whisper reamostra para 16 kHz de qualquer forma
+QUADRO_MS = 30
+LIMIAR_DB = -45.0          # abaixo disso (dBFS) é silêncio, seja qual for o ruído de fundo
+ACIMA_DO_RUIDO_DB = 10.0   # fala = quadro pelo menos isso acima do piso de ruído
+FALA_MINIMA = 0.3          # segundos de fala para valer a pena transcrever
+MARGEM = 0.2               # segundos mantidos antes e depois da fala
+
+
+def decodificar_wav(bruto):
+    """WAV PCM -> (amostras float32 mono em [-1, 1], taxa). Levanta wave.Error/EOFError se não for WAV PCM."""
+    with wave.open(io.BytesIO(bruto)) as w:
+        canais, largura, taxa = w.getnchannels(), w.getsampwidth(), w.getframerate()
+        quadros = w.readframes(w.getnframes())
+    if largura == 1:
+        amostras = (np.frombuffer(quadros, np.uint8).astype(np.float32) - 128) / 128
+    elif largura == 2:
+        amostras = np.frombuffer(quadros, "<i2").astype(np.float32) / 32768
+    elif largura == 3:
+        b = np.frombuffer(quadros, np.uint8).reshape(-1, 3).astype(np.int32)
+        inteiros = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        amostras = (np.where(inteiros >= 1 << 23, inteiros - (1 << 24), inteiros)).astype(np.float32) / (1 << 23)
+    elif largura == 4:
+        amostras = np.frombuffer(quadros, "<i4").astype(np.float32) / (1 << 31)
+    else:
+        raise wave.Error(f"largura de amostra não suportada: {largura}")
+    if canais > 1:
+        amostras = amostras[: len(amostras) // canais * canais].reshape(-1, canais).mean(axis=1)
+    return amostras, taxa
+
+
+def reamostrar(amostras, taxa, taxa_alvo=TAXA_ALVO):
+    if taxa == taxa_alvo or len(amostras) == 0:
+        return amostras
+    fator = taxa / taxa_alvo
+    if fator > 1:
+        # Média móvel antes de reduzir a taxa: passa-baixa simples contra aliasing
+        janela = int(round(fator))
+        if janela > 1:
+            amostras = np.convolve(amostras, np.ones(janela, np.float32) / janela, mode="same")
+    n = int(len(amostras) / fator)
+    return np.interp(np.arange(n) * fator, np.arange(len(amostras)), amostras).astype(np.float32)
+
+
+def trechos_de_fala(amostras, taxa, quadro_ms=QUADRO_MS):
+    """VAD por energia: máscara booleana por quadro (True = fala)."""
+    tamanho = max(1, taxa * quadro_ms // 1000)
+    n = len(amostras) // tamanho
+    if n == 0:
+        return np.zeros(0, bool)
+    quadros = amostras[: n * tamanho].reshape(n, tamanho)
+    energia_db = 10 * np.log10(np.mean(quadros ** 2, axis=1) + 1e-12)
+    piso, pico = np.percentile(energia_db, 10), energia_db.max()
+    if pico - piso < ACIMA_DO_RUIDO_DB:
+        return np.zeros(n, bool)  # energia uniforme: ruído constante, não fala
+    # Clipe só de fala tem piso alto: o limiar fica abaixo do pico em vez de acima do piso
+    return energia_db > max(LIMIAR_DB, min(piso + ACIMA_DO_RUIDO_DB, pico - ACIMA_DO_RUIDO_DB))
+
+
+def codificar(amostras, taxa):
+    """-> (nome_arquivo, bytes) no formato mais compacto disponível."""
+    pcm = (np.clip(amostras, -1, 1) * 32767).astype("<i2")
+    buffer = io.BytesIO()
+    if FLAC_AVAILABLE:
+        sf.write(buffer, pcm, taxa, format="FLAC", subtype="PCM_16")
+        return "fala.flac", buffer.getvalue()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(taxa)
+        w.writeframes(pcm.tobytes())
+    return "fala.wav", buffer.getvalue()
+
+
+def preparar_audio(bruto, taxa_alvo=TAXA_ALVO, fala_minima=FALA_MINIMA, margem=MARGEM):
+    """
+    Prepara a gravação para o Whisper, tudo em memória: mono, 16 kHz, sem o
+    silêncio do começo e do fim, em FLAC (ou WAV). Retorna (nome_arquivo, bytes),
+    pronto para o `file=` da API, ou None quando não há fala (não chamar a API).
+    Se o áudio não for WAV PCM, devolve o original como veio.
+    """
+    try:
+        amostras, taxa = decodificar_wav(bruto)
+    except (wave.Error, EOFError):
+        return "fala.wav", bruto
+    amostras = reamostrar(amostras, taxa, taxa_alvo)
+    fala = trechos_de_fala(amostras, taxa_alvo)
+    if fala.sum() * QUADRO_MS / 1000 < fala_minima:
+        return None
+    tamanho = taxa_alvo * QUADRO_MS // 1000
+    indices = np.flatnonzero(fala)
+    inicio = max(0, indices[0] * tamanho - int(margem * taxa_alvo))
+    fim = min(len(amostras), (indices[-1] + 1) * tamanho + int(margem * taxa_alvo))
+    return codificar(amostras[inicio:fim], taxa_alvo)
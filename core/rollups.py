@@ -0,0 +1,83 @@
+from collections import defaultdict
+
+import pandas as pd
+
+from core.ingestao import achar_coluna
+
+DIMENSOES = {
+    "categoria": "categoria",
+    "mes": "data",
+    "pagamento": "pagamento",
+    "recorrencia": "recorr",
+}
+
+
+class Rollups:
+    """
+    Totais do ledger por categoria, mês (AAAA-MM), pagamento e recorrência.
+
+    `aplicar` soma um gasto em O(1); `aplicar_dataframe` soma um lote de linhas
+    tipadas (delta sync ou reconstrução completa depois de um resync).
+    """
+
+    def __init__(self):
+        self.total = 0.0
+        self.quantidade = 0
+        self.por = {dimensao: defaultdict(float) for dimensao in DIMENSOES}
+
+    def aplicar(self, valor, momento=None, categoria=None, pagamento=None, recorrencia=None):
+        valor = float(valor or 0.0)
+        self.total += valor
+        self.quantidade += 1
+        chaves = {
+            "categoria": categoria,
+            "mes": momento.strftime("%Y-%m") if momento is not None and not pd.isna(momento) else None,
+            "pagamento": pagamento,
+            "recorrencia": recorrencia,
+        }
+        for dimensao, chave in chaves.items():
+            if chave:
+                self.por[dimensao][chave] += valor
+
+    def aplicar_dataframe(self, df):
+        col_val = achar_coluna(df, "valor")
+        if col_val is None or df.empty:
+            return self
+        valores = df[col_val]
+        self.total += float(valores.sum())
+        self.quantidade += len(df)
+        for dimensao, trecho in DIMENSOES.items():
+            col = achar_coluna(df, trecho)
+            if col is None:
+                continue
+            chaves = df[col].dt.strftime("%Y-%m") if dimensao == "mes" else df[col]
+            for chave, soma in valores.groupby(chaves, observed=True).sum().items():
+                if chave:
+                    self.por[dimensao][chave] += float(soma)
+        return self
+
+    @classmethod
+    def de_dataframe(cls, df):
+        return cls().aplicar_dataframe(df)
+
+    def somar(self, outro):
+        """Acumula os totais de outro Rollups (ex: meses de um período)."""
+        self.total += outro.total
+        self.quantidade += outro.quantidade
+        for dimensao, totais in outro.por.items():
+            for chave, valor in totais.items():
+                self.por[dimensao][chave] += valor
+        return self
+
+    def copia(self):
+        nova = Rollups()
+        nova.total, nova.quantidade = self.total, self.quantidade
+        for dimensao, totais in self.por.items():
+            nova.por[dimensao].update(totais)
+        return nova
+
+    def tabela(self, dimensao, rotulo=None):
+        """DataFrame [rótulo, Valor] de uma dimensão, pronto para o gráfico."""
+        rotulo = rotulo or dimensao.capitalize()
+        itens = sorted(self.por[dimensao].items())
+        return pd.DataFrame(itens, columns=[rotulo, "Valor"])
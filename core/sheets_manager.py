@@ -1,7 +1,16 @@
 import gspread
+from gspread.exceptions import APIError, WorksheetNotFound
+from core.cota_google import LEITURA, Agendada, AgendadorGoogle
+from core.armazenamento import ArmazenamentoSheets, ArmazenamentoSQLite, COLUNAS, LEDGER_PADRAO, montar_linha
+from core.fila_gravacao import FilaGravacao, JOURNAL_PADRAO
+from core.particoes import Compactador, LeitorParticoes
+from core.sincronizacao import SincronizadorPlanilha
 from oauth2client.service_account import ServiceAccountCredentials
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
+import re
+import threading
+import time
 
 # Configuração de acesso
 SCOPES = [
@@ -10,20 +19,258 @@ SCOPES = [
 ]
 CREDENTIALS_FILE = "credentials.json"
 SHEET_NAME = "MYND_Finance_Bot"  # O nome exato da sua planilha no Google
+# "sheets" (padrão) grava direto na planilha; "sqlite" grava no ledger local e espelha na planilha
+LEDGER_BACKEND = os.getenv("LEDGER_BACKEND", "sheets")
+# Com LEDGER_BACKEND=sqlite, "0" desliga o espelho na planilha (e a compactação dela)
+SHEETS_MIRROR = os.getenv("SHEETS_MIRROR", "1") != "0"
 
+# Tokens do Google valem 60 min: renovamos com folga para nunca pagar o refresh no meio de um save
+MARGEM_RENOVACAO = 5 * 60
+# Abas sem uso por esse tempo são descartadas (o próximo acesso reabre)
+TEMPO_OCIOSO = 15 * 60
+INTERVALO_MANUTENCAO = 60
+# Títulos das abas ficam em memória por pouco tempo: aba do mês criada por outro processo aparece logo
+TTL_TITULOS = 60
 
-def conectar_planilha():
+
+# Primeira célula de uma linha de dados: data do gasto ou mês (AAAA-MM) de uma linha do Resumo
+_CELULA_DADO = re.compile(r"^\s*(\d{1,2}/\d{1,2}/\d{2,4}|\d{4}-\d{2})")
+
+
+def _chave(sheet_id):
+    return sheet_id or f"nome:{SHEET_NAME}"
+
+
+def credenciais_arquivo():
+    return ServiceAccountCredentials.from_json_keyfile_name(CREDENTIALS_FILE, SCOPES)
+
+
+class RegistroPlanilhas:
+    """
+    Registro de clientes gspread autorizados e abas abertas, compartilhado pelo processo.
+
+    Autoriza uma única vez, guarda cada aba pela chave (sheet_id ou nome da planilha)
+    e renova o token em segundo plano antes de expirar. Assim um save ou leitura
+    faz só a chamada de dados, sem JWT + authorize + open a cada vez. Toda chamada
+    à API (planilhas e abas entregues aqui) passa pelo `agendador` (core.cota_google).
+    """
+
+    def __init__(self, creds_factory=None, tempo_ocioso=TEMPO_OCIOSO, margem_renovacao=MARGEM_RENOVACAO,
+                 agendador=None):
+        self.creds_factory = creds_factory or credenciais_arquivo
+        self.agendador = agendador or AgendadorGoogle()
+        self.tempo_ocioso = tempo_ocioso
+        self.margem_renovacao = margem_renovacao
+        self._lock = threading.Lock()  # só os dicionários; nunca segurado durante uma chamada à API
+        self._cliente = None
+        self._planilhas = {}
+        self._titulos = {}
+        self._abas = {}  # (chave, indice ou título) -> [aba, ultimo_uso]
+        self._locks = {}
+        self._manutencao = None
+
+    def cliente(self):
+        with self._lock:
+            if self._cliente is None:
+                self._cliente = gspread.authorize(self.creds_factory())
+                self._iniciar_manutencao()
+            return self._cliente
+
+    def _lock_chave(self, chave):
+        """
+        Lock de uma planilha/aba. As chamadas à API (que podem esperar cota no agendador)
+        rodam só com ele: `_lock` protege os dicionários e nunca fica preso numa chamada,
+        então uma leitura do painel na fila não segura o save de outra planilha.
+        """
+        with self._lock:
+            return self._locks.setdefault(chave, threading.Lock())
+
+    def _planilha(self, sheet_id):
+        chave = _chave(sheet_id)
+        with self._lock:
+            planilha = self._planilhas.get(chave)
+        if planilha is not None:
+            return planilha
+        with self._lock_chave(("planilha", chave)):
+            with self._lock:
+                planilha = self._planilhas.get(chave)
+            if planilha is None:
+                cliente = self.cliente()
+                abrir, alvo = (cliente.open_by_key, sheet_id) if sheet_id else (cliente.open, SHEET_NAME)
+                planilha = Agendada(self.agendador.executar("sheets", LEITURA, abrir, alvo), self.agendador)
+                with self._lock:
+                    self._planilhas[chave] = planilha
+            return planilha
+
+    def _aba_aberta(self, chave, abrir):
+        """Aba do cache (marcando o uso) ou aberta por `abrir()` fora do `_lock`."""
+        with self._lock:
+            item = self._abas.get(chave)
+            if item is not None:
+                item[1] = time.monotonic()
+                return item[0]
+        with self._lock_chave(chave):
+            with self._lock:
+                item = self._abas.get(chave)
+            if item is None:
+                item = [abrir(), 0.0]
+                with self._lock:
+                    self._abas[chave] = item
+            item[1] = time.monotonic()
+            return item[0]
+
+    def aba(self, sheet_id=None, indice=0):
+        """Retorna a aba pedida; sem sheet_id abre pelo nome (SHEET_NAME)."""
+        return self._aba_aberta(
+            (_chave(sheet_id), indice),
+            lambda: Agendada(self._planilha(sheet_id).get_worksheet(indice), self.agendador))
+
+    def titulos(self, sheet_id=None):
+        """Títulos das abas da planilha (uma chamada de metadados, em memória por TTL_TITULOS)."""
+        chave = _chave(sheet_id)
+        with self._lock:
+            item = self._titulos.get(chave)
+        if item is None or time.monotonic() - item[1] > TTL_TITULOS:
+            with self._lock_chave(("titulos", chave)):
+                with self._lock:
+                    item = self._titulos.get(chave)
+                if item is None or time.monotonic() - item[1] > TTL_TITULOS:
+                    item = ([aba.title for aba in self._planilha(sheet_id).worksheets()], time.monotonic())
+                    with self._lock:
+                        self._titulos[chave] = item
+        return list(item[0])
+
+    def _garantir_cabecalho(self, aba, cabecalho):
+        """
+        Criar a aba e gravar o cabeçalho são duas chamadas: se a segunda falhou (ou um
+        append de outro processo chegou antes), a linha 1 não é o cabeçalho. Confere e corrige
+        sem duplicar: vazia -> grava em A1; com dados -> insere o cabeçalho acima deles.
+        Outro cabeçalho (ex: planilha antiga sem "Local Compra") fica como está.
+        """
+        primeira = aba.row_values(1)
+        if primeira == list(cabecalho):
+            return
+        if not any(primeira):
+            aba.update(values=[list(cabecalho)], range_name="A1")
+        elif _CELULA_DADO.match(str(primeira[0])):
+            aba.insert_row(list(cabecalho), 1)
+
+    def particao(self, sheet_id=None, titulo=None, cabecalho=COLUNAS):
+        """Aba pelo título (partição AAAA-MM, Resumo); se não existir, é criada com o cabeçalho."""
+
+        def abrir():
+            planilha = self._planilha(sheet_id)
+            try:
+                aba = planilha.worksheet(titulo)
+            except WorksheetNotFound:
+                try:
+                    aba = planilha.add_worksheet(title=titulo, rows=1, cols=len(cabecalho))
+                except APIError:  # outro processo criou a mesma aba antes
+                    aba = planilha.worksheet(titulo)
+            aba = Agendada(aba, self.agendador)
+            self._garantir_cabecalho(aba, cabecalho)
+            with self._lock:
+                titulos = self._titulos.get(_chave(sheet_id))
+                if titulos is not None and titulo not in titulos[0]:
+                    titulos[0].append(titulo)
+            return aba
+
+        return self._aba_aberta((_chave(sheet_id), titulo), abrir)
+
+    def invalidar(self, sheet_id=None):
+        """Descarta as abas abertas de uma planilha (ex: após erro); o próximo acesso reabre."""
+        with self._lock:
+            for chave in [c for c in self._abas if c[0] == _chave(sheet_id)]:
+                del self._abas[chave]
+            self._planilhas.pop(_chave(sheet_id), None)
+            self._titulos.pop(_chave(sheet_id), None)
+
+    def manutencao(self):
+        """Renova o token perto do vencimento e descarta abas ociosas."""
+        with self._lock:
+            limite = time.monotonic() - self.tempo_ocioso
+            for chave in [c for c, (_, uso) in self._abas.items() if uso < limite]:
+                del self._abas[chave]
+            em_uso = {c[0] for c in self._abas}
+            for chave in [c for c in self._planilhas if c not in em_uso]:
+                del self._planilhas[chave]
+                self._titulos.pop(chave, None)
+            cliente = self._cliente
+        if cliente is not None:
+            self._renovar_token(cliente)
+
+    def _renovar_token(self, cliente):
+        http = getattr(cliente, "http_client", cliente)  # gspread 6 guarda a auth no http_client
+        creds = getattr(http, "auth", None)
+        if creds is None or not hasattr(creds, "refresh"):
+            return
+        expiry = getattr(creds, "expiry", None)
+        if expiry is not None and expiry - datetime.utcnow() > timedelta(seconds=self.margem_renovacao):
+            return
+        try:
+            from google.auth.transport.requests import Request
+            creds.refresh(Request())
+        except Exception as e:
+            print(f"❌ Erro ao renovar token do Google: {e}")
+
+    def _iniciar_manutencao(self):
+        if self._manutencao is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(INTERVALO_MANUTENCAO)
+                self.manutencao()
+
+        self._manutencao = threading.Thread(target=loop, daemon=True)
+        self._manutencao.start()
+
+
+# Registro padrão do app mobile (usa credentials.json)
+registro = RegistroPlanilhas()
+_fila = None
+_armazenamento = None
+_compactador = None
+_lock_fila = threading.Lock()
+
+
+def obter_fila():
+    """Fila write-behind do registro padrão, criada no primeiro save (faz o replay do journal)."""
+    global _fila
+    with _lock_fila:
+        if _fila is None:
+            _fila = FilaGravacao(registro, JOURNAL_PADRAO)
+        return _fila
+
+
+def obter_armazenamento():
+    """Armazenamento do ledger escolhido por LEDGER_BACKEND."""
+    global _armazenamento, _compactador
+    fila = obter_fila()
+    with _lock_fila:
+        if _armazenamento is None:
+            leitor = LeitorParticoes(SincronizadorPlanilha(registro))
+            fila.ao_gravar = leitor.sincronizador.invalidar
+            if LEDGER_BACKEND != "sqlite" or SHEETS_MIRROR:  # só compacta a planilha que está em uso
+                _compactador = Compactador(leitor)
+            if LEDGER_BACKEND == "sqlite":
+                _armazenamento = ArmazenamentoSQLite(LEDGER_PADRAO, espelho=fila if SHEETS_MIRROR else None,
+                                                     origem=leitor.dados)
+            else:
+                _armazenamento = ArmazenamentoSheets(fila, leitor)
+        return _armazenamento
+
+
+def conectar_planilha(sheet_id=None):
     if not os.path.exists(CREDENTIALS_FILE):
         print("❌ Erro: credentials.json não encontrado.")
         return None
 
     try:
-        creds = ServiceAccountCredentials.from_json_keyfile_name(CREDENTIALS_FILE, SCOPES)
-        client = gspread.authorize(creds)
-        # Abre a planilha e seleciona a primeira aba (índice 0)
-        sheet = client.open(SHEET_NAME).get_worksheet(0)
-        return sheet
+        # Abre a planilha e seleciona a primeira aba (índice 0), reaproveitando o cliente
+        return registro.aba(sheet_id)
     except Exception as e:
+        registro.invalidar(sheet_id)
         print(f"❌ Erro ao conectar no Google Sheets: {e}")
         return None
 
@@ -31,46 +278,32 @@ def conectar_planilha():
 def salvar_gasto(dados_json):
     """
     Recebe o JSON: {"item": "Coxinha", "valor": 8.50, "categoria": "Lanche", ...}
-    Salva na planilha.
+    Grava pelo armazenamento configurado e retorna sem esperar a planilha.
+    """
+    return salvar_gastos([dados_json])
+
+
+def salvar_gastos(lista):
+    """
+    Vários gastos da mesma fala (ver core.lote_gastos) numa gravação só:
+    as linhas entram juntas no journal e saem num único append_rows por mês.
     """
-    sheet = conectar_planilha()
-    if not sheet:
+    if LEDGER_BACKEND != "sqlite" and not os.path.exists(CREDENTIALS_FILE):
+        print("❌ Erro: credentials.json não encontrado.")
         return False, "Erro de conexão com a planilha."
 
     try:
-        # Prepara a linha para salvar
-        # Colunas: Data/Hora | Item | Valor | Categoria | Pagamento | Local Compra | Recorrência | Status
-        timestamp = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-
-        # Se a categoria for "Compras" e tiver local_compra, ajusta a categoria
-        categoria = dados_json.get("categoria", "Compras")
-        local_compra = dados_json.get("local_compra", "")
-
-        # Se for compra online, muda a categoria
-        if categoria == "Compras" and local_compra == "Online":
-            categoria_final = "Compras Online"
-        elif categoria == "Compras" and local_compra == "Loja Física":
-            categoria_final = "Compras"
-        else:
-            categoria_final = categoria
-
-        linha = [
-            timestamp,
-            dados_json.get("item", ""),
-            dados_json.get("valor", 0.0),
-            categoria_final,
-            dados_json.get("pagamento", "Débito"),
-            local_compra,  # Nova coluna
-            dados_json.get("recorrencia", "Único"),
-            "Confirmado"
-        ]
-
-        # Adiciona a linha no final da planilha
-        sheet.append_row(linha)
-
-        print(f"✅ Salvo: {linha}")
-        return True, "Gasto salvo com sucesso!"
+        linhas = [montar_linha(dados_json) for dados_json in lista]
+
+        # Sheets: vai para o journal e o append acontece em segundo plano; SQLite: grava local e espelha
+        obter_armazenamento().gravar(None, linhas)
+        if _compactador is not None:
+            _compactador.agendar(None)  # fecha os meses passados em segundo plano (no máximo 1x por hora)
+
+        for linha in linhas:
+            print(f"📝 Na fila: {linha}")
+        return True, "Gasto salvo com sucesso!" if len(linhas) == 1 else f"{len(linhas)} gastos salvos com sucesso!"
 
     except Exception as e:
         print(f"❌ Erro ao salvar: {e}")
-        return False, f"Erro ao salvar: {e}"
\ No newline at end of file
+        return False, f"Erro ao salvar: {e}"
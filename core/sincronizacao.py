@@ -0,0 +1,173 @@
+import threading
+import time
+
+import pandas as pd
+from gspread.utils import rowcol_to_a1
+
+from core.cache_painel import CacheLRU, ORCAMENTO_PADRAO
+from core.cota_google import LimiteGoogle
+from core.ingestao import concatenar_tipado, tipar_ledger
+from core.rollups import Rollups
+
+INTERVALO_MINIMO = 10        # segundos entre duas consultas à mesma planilha
+INTERVALO_RESYNC = 10 * 60   # resync completo periódico (pega edições no meio da planilha)
+
+
+class EstadoPlanilha:
+    def __init__(self, cabecalho, linhas):
+        self.cabecalho = cabecalho
+        self.df = tipar_ledger(pd.DataFrame(linhas, columns=cabecalho))
+        self.rollups = Rollups.de_dataframe(self.df)  # reconstruído só em sync completo
+        self.linhas = len(linhas)  # linhas de dados já sincronizadas (sem o cabeçalho)
+        self.ultima = linhas[-1] if linhas else cabecalho  # sentinela para detectar edição
+        self.sincronizado_em = time.monotonic()
+        self.completo_em = self.sincronizado_em
+
+
+def _tamanho_estado(estado):
+    return int(estado.df.memory_usage(index=True, deep=True).sum())
+
+
+def _normalizar(linha, largura):
+    linha = list(linha)[:largura]
+    return linha + [""] * (largura - len(linha))
+
+
+class SincronizadorPlanilha:
+    """
+    Sincronização incremental do ledger por planilha.
+
+    Guarda o DataFrame e a quantidade de linhas já lidas de cada planilha. Nas
+    próximas chamadas lê só o intervalo A1 a partir da última linha conhecida:
+    essa linha funciona como sentinela e, se mudou (edição ou remoção), é feito
+    um resync completo. Edições no meio da planilha são pegas pelo resync periódico.
+
+    Os estados ficam num CacheLRU por (sheet_id, aba) — um tenant por planilha e,
+    dentro dela, uma entrada por partição mensal (ver core.particoes) —, limitado
+    por `orcamento_bytes`; cada aba tem o seu lock, então o sync lento de um
+    usuário não segura o dashboard dos outros.
+    """
+
+    def __init__(self, registro, intervalo_minimo=INTERVALO_MINIMO, intervalo_resync=INTERVALO_RESYNC,
+                 orcamento_bytes=ORCAMENTO_PADRAO):
+        self.registro = registro
+        self.intervalo_minimo = intervalo_minimo
+        self.intervalo_resync = intervalo_resync
+        self._estados = CacheLRU(_tamanho_estado, orcamento_bytes)
+        self._locks = {}
+        self._lock = threading.Lock()
+        self.limitadas = 0  # leituras servidas do cache porque o Google estava limitando
+
+    def _lock_planilha(self, chave):
+        with self._lock:
+            return self._locks.setdefault(chave, threading.Lock())
+
+    def _aba(self, sheet_id, particao):
+        if particao is None:
+            return self.registro.aba(sheet_id)
+        return self.registro.particao(sheet_id, particao)
+
+    def dados(self, sheet_id, particao=None):
+        """DataFrame tipado e atualizado da planilha (cópia: quem chama pode alterar à vontade)."""
+        with self._lock_planilha((sheet_id, particao)):
+            return self._atualizar(sheet_id, particao).df.copy()
+
+    def rollups(self, sheet_id, particao=None):
+        """Totais agregados da planilha, sem copiar as linhas."""
+        with self._lock_planilha((sheet_id, particao)):
+            return self._atualizar(sheet_id, particao).rollups.copia()
+
+    def revisao(self, sheet_id, particao=None):
+        """
+        Marcador de mudança: (linhas de dados, coluna A da última linha). Com a aba em
+        memória custa no máximo um delta sync; fria, só a coluna A (col_values), sem baixar
+        a aba. Os dois caminhos dão o mesmo marcador para os mesmos dados.
+        """
+        with self._lock_planilha((sheet_id, particao)):
+            if self._estados.obter((sheet_id, particao)) is not None:
+                estado = self._atualizar(sheet_id, particao)
+                return estado.linhas, str(estado.ultima[0]) if estado.linhas and estado.ultima else ""
+        coluna = self._aba(sheet_id, particao).col_values(1)
+        return max(0, len(coluna) - 1), coluna[-1] if len(coluna) > 1 else ""
+
+    def ultimas(self, sheet_id, n, particao=None, ate=None):
+        """
+        Até `n` linhas de dados que terminam na linha `ate` da aba (None = última usada),
+        sem baixar a aba inteira. Se ela já está em memória, sai do estado; senão, a
+        coluna A acha a última linha e um batch_get traz só o cabeçalho e o intervalo.
+        -> (DataFrame tipado, número na planilha da primeira linha devolvida)
+        """
+        with self._lock_planilha((sheet_id, particao)):
+            if self._estados.obter((sheet_id, particao)) is not None:
+                estado = self._atualizar(sheet_id, particao)
+                fim = estado.linhas + 1 if ate is None else min(ate, estado.linhas + 1)
+                inicio = max(2, fim - n + 1)
+                return estado.df.iloc[inicio - 2:max(inicio - 2, fim - 1)].reset_index(drop=True), inicio
+
+        aba = self._aba(sheet_id, particao)
+        if ate is None:
+            ate = len(aba.col_values(1))
+        inicio = max(2, ate - n + 1)
+        intervalos = ["1:1", f"{inicio}:{ate}"] if ate >= inicio else ["1:1"]
+        cabecalho, *valores = aba.batch_get(intervalos)
+        cabecalho = cabecalho[0] if cabecalho else []
+        linhas = [_normalizar(l, len(cabecalho)) for l in valores[0]] if valores else []
+        return tipar_ledger(pd.DataFrame(linhas, columns=cabecalho)), inicio
+
+    def _atualizar(self, sheet_id, particao=None):
+        estado = self._estados.obter((sheet_id, particao))
+        agora = time.monotonic()
+        try:
+            if estado is None or agora - estado.completo_em > self.intervalo_resync:
+                estado = self._sincronizar_tudo(sheet_id, particao)
+            elif agora - estado.sincronizado_em > self.intervalo_minimo:
+                estado = self._sincronizar_delta(sheet_id, particao, estado)
+        except LimiteGoogle:
+            if estado is None:
+                raise
+            self.limitadas += 1  # sem cota agora: serve o que já tem, o próximo acesso tenta de novo
+        return estado
+
+    def invalidar(self, sheet_id, particao=None):
+        """
+        Força a próxima leitura dessa aba a buscar as linhas novas (ex: depois de um save).
+        `particao` é o título da aba (None = primeira aba, o ledger antigo).
+        """
+        estado = self._estados.obter((sheet_id, particao))
+        if estado is not None:
+            estado.sincronizado_em = 0.0
+
+    def descartar(self, sheet_id, particao=None):
+        self._estados.remover((sheet_id, particao))
+
+    def _sincronizar_tudo(self, sheet_id, particao=None):
+        valores = self._aba(sheet_id, particao).get_all_values()
+        cabecalho = valores[0] if valores else []
+        linhas = [_normalizar(l, len(cabecalho)) for l in valores[1:]]
+        estado = EstadoPlanilha(cabecalho, linhas)
+        self._estados.guardar((sheet_id, particao), estado)
+        return estado
+
+    def _sincronizar_delta(self, sheet_id, particao, estado):
+        largura = len(estado.cabecalho)
+        if not largura:
+            return self._sincronizar_tudo(sheet_id, particao)
+
+        # Relê a última linha conhecida (sentinela) + tudo o que veio depois dela
+        inicio = estado.linhas + 1
+        col_final = rowcol_to_a1(1, largura).rstrip("0123456789")
+        valores = self._aba(sheet_id, particao).get(f"A{inicio}:{col_final}")
+
+        if not valores or _normalizar(valores[0], largura) != estado.ultima:
+            return self._sincronizar_tudo(sheet_id, particao)
+
+        novas = [_normalizar(l, largura) for l in valores[1:]]
+        if novas:
+            novas_df = tipar_ledger(pd.DataFrame(novas, columns=estado.cabecalho))
+            estado.df = concatenar_tipado(estado.df, novas_df)
+            estado.rollups.aplicar_dataframe(novas_df)
+            estado.linhas += len(novas)
+            estado.ultima = novas[-1]
+            self._estados.guardar((sheet_id, particao), estado)  # remede o tamanho
+        estado.sincronizado_em = time.monotonic()
+        return estado
@@ -0,0 +1,163 @@
+import os
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PASTA_RESPOSTAS = os.path.join(tempfile.gettempdir(), "mynd_tts")
+BYTES_INICIAIS = 8 * 1024      # ~0,5 s de mp3 128 kbps: a partir daqui o player já pode começar
+IDADE_MAXIMA = 10 * 60         # respostas esquecidas no disco são apagadas depois disso
+TIMEOUT_CHUNK = 15             # segundos sem chunk novo até considerar a síntese travada
+
+
+class RespostaAudio:
+    """
+    Áudio de uma resposta do TTS, gravado num arquivo próprio enquanto chega.
+
+    Uma thread consome o gerador do ElevenLabs e grava cada chunk; `esperar_inicio`
+    libera quando os primeiros bytes estão no disco e `ler_a_partir` permite que
+    o ServidorAudio entregue o arquivo ainda crescendo. `ao_concluir(caminho)` é
+    chamado quando a síntese termina sem erro (ex: guardar no CacheTTS). Se ela
+    falha ou não gera nada, o arquivo é apagado.
+    """
+
+    def __init__(self, chunks, pasta=PASTA_RESPOSTAS, bytes_iniciais=BYTES_INICIAIS, ao_concluir=None):
+        os.makedirs(pasta, exist_ok=True)
+        self.id = uuid.uuid4().hex
+        self.caminho = os.path.join(pasta, f"resp_{self.id}.mp3")
+        self.bytes_iniciais = bytes_iniciais
+        self.tamanho = 0
+        self.concluido = False
+        self.erro = None
+        self.ao_concluir = ao_concluir
+        self._ultimo_chunk = time.monotonic()
+        self._cond = threading.Condition()
+        threading.Thread(target=self._gravar, args=(chunks,), daemon=True).start()
+
+    def _gravar(self, chunks):
+        try:
+            with open(self.caminho, "wb") as f:
+                for chunk in chunks:
+                    if not chunk:
+                        continue
+                    f.write(chunk)
+                    f.flush()
+                    with self._cond:
+                        self.tamanho += len(chunk)
+                        self._ultimo_chunk = time.monotonic()
+                        self._cond.notify_all()
+        except Exception as e:
+            self.erro = e
+        finally:
+            if self.erro is not None or not self.tamanho:
+                self.apagar()  # nada tocável: não deixa arquivo vazio ou pela metade para trás
+            with self._cond:
+                self.concluido = True
+                self._cond.notify_all()
+        if self.erro is None and self.tamanho and self.ao_concluir:
+            try:
+                self.ao_concluir(self.caminho)
+            except Exception as e:
+                print(f"❌ Erro ao finalizar áudio: {e}")
+
+    def esperar_inicio(self, timeout=15):
+        """True quando já dá para tocar (bytes iniciais gravados ou síntese terminada sem erro)."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.tamanho >= self.bytes_iniciais or self.concluido, timeout)
+            return self.erro is None and self.tamanho > 0
+
+    def esperar_fim(self, timeout=60):
+        with self._cond:
+            self._cond.wait_for(lambda: self.concluido, timeout)
+            return self.erro is None and self.tamanho > 0
+
+    def ler_a_partir(self, posicao, timeout=TIMEOUT_CHUNK):
+        """
+        Bytes novos desde `posicao`; b"" quando a síntese acabou e tudo já foi lido.
+        `timeout` conta desde o último chunk recebido (não desde o início da resposta):
+        respostas longas passam inteiras e só uma síntese parada levanta TimeoutError.
+        """
+        with self._cond:
+            while self.tamanho <= posicao and not self.concluido:
+                restante = self._ultimo_chunk + timeout - time.monotonic()
+                if restante <= 0:
+                    raise TimeoutError(f"TTS sem chunk novo há {timeout}s")
+                self._cond.wait(restante)
+            fim = self.tamanho
+        if fim <= posicao:
+            return b""
+        with open(self.caminho, "rb") as f:
+            f.seek(posicao)
+            return f.read(fim - posicao)
+
+    def apagar(self):
+        try:
+            os.remove(self.caminho)
+        except OSError:
+            pass
+
+
+class ServidorAudio:
+    """
+    Servidor HTTP local (127.0.0.1) que entrega cada RespostaAudio em streaming,
+    para o player começar a tocar antes de a síntese terminar.
+    """
+
+    def __init__(self):
+        self.respostas = {}
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.0"  # sem Content-Length: o fim do áudio é o fim da conexão
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                resposta = servidor.respostas.get(self.path.strip("/").removesuffix(".mp3"))
+                if resposta is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "audio/mpeg")
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+                posicao = 0
+                try:
+                    while True:
+                        dados = resposta.ler_a_partir(posicao)
+                        if not dados:
+                            break
+                        self.wfile.write(dados)
+                        posicao += len(dados)
+                except OSError:  # player fechou a conexão, resposta apagada ou síntese parada (TimeoutError)
+                    pass
+
+        self._http = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._http.daemon_threads = True
+        threading.Thread(target=self._http.serve_forever, daemon=True).start()
+
+    def publicar(self, resposta):
+        self.respostas[resposta.id] = resposta
+        return f"http://127.0.0.1:{self._http.server_port}/{resposta.id}.mp3"
+
+    def remover(self, resposta):
+        self.respostas.pop(resposta.id, None)
+        resposta.apagar()
+
+
+def limpar_respostas_antigas(pasta=PASTA_RESPOSTAS, idade_maxima=IDADE_MAXIMA):
+    """Apaga áudios de respostas que ficaram para trás (app fechado no meio, player que não avisou o fim)."""
+    limite = time.time() - idade_maxima
+    try:
+        nomes = os.listdir(pasta)
+    except OSError:
+        return
+    for nome in nomes:
+        caminho = os.path.join(pasta, nome)
+        try:
+            if nome.startswith("resp_") and os.path.getmtime(caminho) < limite:
+                os.remove(caminho)
+        except OSError:
+            pass
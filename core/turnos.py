@@ -0,0 +1,95 @@
+import os
+import queue
+import threading
+import time
+
+LIMITE_FILA = 3           # gravações esperando a vez; além disso o app pede para aguardar
+ESPERA_ARQUIVO = 3.0      # segundos até o gravador fechar o WAV
+INTERVALO_ARQUIVO = 0.05
+
+
+class Turno:
+    """Um turno de voz na fila. `cancelado` vira True quando uma gravação mais nova chega."""
+
+    def __init__(self, numero):
+        self.numero = numero
+        self._cancelado = threading.Event()
+
+    def cancelar(self):
+        self._cancelado.set()
+
+    @property
+    def cancelado(self):
+        return self._cancelado.is_set()
+
+
+class ExecutorTurnos:
+    """
+    Executor de turnos de uma sessão: fila limitada e uma única thread.
+
+    Os turnos rodam em ordem, um de cada vez, então o estado da conversa
+    só é mexido por uma thread. Uma gravação nova cancela os turnos anteriores
+    ainda na fila ou rodando: quem executa confere `turno.cancelado` antes do
+    Whisper e antes de mostrar a transcrição e para ali; uma fala que já está no
+    chat vai até a extração. A resposta falada dos turnos cancelados é pulada.
+    `enviar` retorna None quando a fila está cheia.
+    """
+
+    def __init__(self, limite=LIMITE_FILA):
+        self._fila = queue.Queue(maxsize=limite)
+        self._lock = threading.Lock()
+        self._ativos = []
+        self._numero = 0
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="turnos")
+        self._thread.start()
+
+    def enviar(self, func, *args):
+        """Agenda func(turno, *args)."""
+        with self._lock:
+            turno = Turno(self._numero + 1)
+            try:
+                self._fila.put_nowait((turno, func, args))
+            except queue.Full:
+                return None
+            self._numero += 1
+            for anterior in self._ativos:
+                anterior.cancelar()
+            self._ativos.append(turno)
+        return turno
+
+    def pendentes(self):
+        with self._lock:
+            return len(self._ativos)
+
+    def _loop(self):
+        while True:
+            item = self._fila.get()
+            if item is None:
+                return
+            turno, func, args = item
+            try:
+                func(turno, *args)
+            except Exception as e:
+                print(f"❌ Erro no turno {turno.numero}: {e}")
+            finally:
+                with self._lock:
+                    self._ativos.remove(turno)
+
+    def encerrar(self):
+        self._fila.put(None)
+
+
+def esperar_arquivo(caminho, timeout=ESPERA_ARQUIVO, intervalo=INTERVALO_ARQUIVO):
+    """True quando o arquivo existe e o tamanho parou de mudar (gravador terminou de escrever)."""
+    limite = time.monotonic() + timeout
+    anterior = -1
+    while time.monotonic() < limite:
+        try:
+            tamanho = os.path.getsize(caminho)
+        except OSError:
+            tamanho = -1
+        if tamanho > 0 and tamanho == anterior:
+            return True
+        anterior = tamanho
+        time.sleep(intervalo)
+    return anterior > 0
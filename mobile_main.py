@@ -1,10 +1,10 @@
 import flet as ft
 import os
 import tempfile
-import time
 import threading
 import json
-from openai import OpenAI
+import uuid
+import importlib.util
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -15,41 +15,100 @@ try:
 except:
     pass
 
-# Importa o gerenciador de planilha
-try:
-    from core.sheets_manager import salvar_gasto
-except ImportError:
-    def salvar_gasto(d):
+from core.tts import RespostaAudio, ServidorAudio, limpar_respostas_antigas
+from core.cache_tts import CacheTTS
+from core.extrator_regras import extrair_por_regras
+from core.extrator_gpt import ESQUEMA, INSTRUCAO_CONFIANCA, INSTRUCAO_LOTE, ExtratorGPT
+from core.lote_gastos import LoteGastos
+from core.turnos import ExecutorTurnos, esperar_arquivo
+from core.interface_chat import CanalUI, HistoricoChat
+
+
+def salvar_gastos(lista):
+    # gspread/pandas só são importados no primeiro gasto salvo, não na abertura do app
+    try:
+        from core.sheets_manager import salvar_gastos as salvar
+    except ImportError:
         return False, "Erro: core/sheets_manager.py não encontrado"
+    return salvar(lista)
 
-# Configurações de API
-api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=api_key)
 
-# ElevenLabs (Audio)
-AUDIO_AVAILABLE = False
-try:
-    from elevenlabs.client import ElevenLabs
+# Clientes de API: SDKs importados e clientes criados no primeiro uso, fora do primeiro frame
+_clientes = {}
+_lock_clientes = threading.RLock()
+
+
+def cliente_openai():
+    with _lock_clientes:
+        if "openai" not in _clientes:
+            from openai import OpenAI
+            _clientes["openai"] = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        return _clientes["openai"]
+
+
+def cliente_eleven():
+    with _lock_clientes:
+        if "eleven" not in _clientes:
+            from elevenlabs.client import ElevenLabs
+            _clientes["eleven"] = ElevenLabs(api_key=os.getenv("ELEVENLABS_API_KEY"))
+        return _clientes["eleven"]
+
+
+def obter_extrator():
+    with _lock_clientes:
+        if "extrator" not in _clientes:
+            _clientes["extrator"] = ExtratorGPT(cliente_openai())
+        return _clientes["extrator"]
 
-    eleven_key = os.getenv("ELEVENLABS_API_KEY")
-    if eleven_key:
-        client_eleven = ElevenLabs(api_key=eleven_key)
-        AUDIO_AVAILABLE = True
-except:
-    pass
+
+# ElevenLabs (Audio): disponível se há chave e o pacote está instalado (sem importá-lo agora)
+AUDIO_AVAILABLE = bool(os.getenv("ELEVENLABS_API_KEY")) and importlib.util.find_spec("elevenlabs") is not None
+
+VOICE_ID = os.getenv("VOICE_ID", "EXAVITQu4vr4xnSDxMaL")
+TTS_MODEL = "eleven_multilingual_v2"
+TTS_FORMAT = "mp3_44100_128"
+tts_cache = CacheTTS()
+
+
+def sintetizar(texto):
+    return cliente_eleven().text_to_speech.convert(
+        voice_id=VOICE_ID,
+        text=texto,
+        model_id=TTS_MODEL,
+        output_format=TTS_FORMAT
+    )
+
+
+if AUDIO_AVAILABLE:
+    tts_cache.pre_aquecer(sintetizar, VOICE_ID, TTS_MODEL, TTS_FORMAT)
+
+# Streaming: o player começa pelos primeiros chunks (servidor local); "0" espera o arquivo completo
+TTS_STREAMING = os.getenv("TTS_STREAMING", "1") != "0"
 
 # --- CONFIGURAÇÃO DE REDE ---
 # URL limpa e direta para evitar erros de sintaxe
 DASHBOARD_URL = "http://192.168.15.37:1880/dashboard"
 
 
+def apagar_gravacao(caminho):
+    try:
+        os.remove(caminho)
+    except OSError:
+        pass
+
+
 class FinanceApp(ft.Column):
     def __init__(self, page):
         super().__init__()
         self.page = page
         self.expand = True
-        self.dados_parciais = {}
+        self.lote = LoteGastos(padroes={"categoria": "Compras", "recorrencia": "Único"})
         self.audio_path = ""
+        self.resposta_atual = None
+        self.lock_resposta = threading.Lock()
+        self.servidor_audio = ServidorAudio() if TTS_STREAMING else None
+        # Um turno por vez, em ordem: o lote só é alterado pela thread do executor
+        self.turnos = ExecutorTurnos()
 
         # --- COMPONENTES NATIVOS ---
         # Definimos aqui para garantir que o Flet detecte o uso
@@ -57,14 +116,20 @@ class FinanceApp(ft.Column):
             audio_encoder=ft.AudioEncoder.WAV,
             on_state_changed=self.handle_audio_state
         )
-        self.audio_player = ft.Audio(src="silence.mp3", autoplay=False)
+        self.audio_player = ft.Audio(src="silence.mp3", autoplay=False, on_state_changed=self.handle_player_state)
 
         self.page.overlay.append(self.audio_recorder)
         self.page.overlay.append(self.audio_player)
 
         # --- UI ---
         self.status_text = ft.Text("Toque para falar", size=16, color="white54", text_align=ft.TextAlign.CENTER)
-        self.chat_view = ft.ListView(expand=True, spacing=10, padding=20, auto_scroll=True)
+        # auto_scroll desligado: carregar mensagens antigas no topo não pode pular para o fim
+        self.chat_view = ft.ListView(expand=True, spacing=10, padding=20, auto_scroll=False,
+                                     on_scroll=self.handle_scroll)
+        self.historico = HistoricoChat(self.chat_view.controls, self.criar_balao)
+        self.canal = CanalUI(self.atualizar_tela)
+        self.rolar_fim = False
+        self.carregando_antigas = False
 
         self.btn_record = ft.Container(
             content=ft.Icon(ft.Icons.MIC, size=40, color="white"),
@@ -112,7 +177,8 @@ class FinanceApp(ft.Column):
         self.btn_record.scale = 1.1
         self.btn_record.update()
         self.status_text.update()
-        self.audio_path = os.path.join(tempfile.gettempdir(), "mynd_rec.wav")
+        # Arquivo por gravação: a próxima não sobrescreve uma que ainda está na fila
+        self.audio_path = os.path.join(tempfile.gettempdir(), f"mynd_rec_{uuid.uuid4().hex}.wav")
         self.audio_recorder.start_recording(self.audio_path)
 
     def stop_recording(self):
@@ -125,120 +191,198 @@ class FinanceApp(ft.Column):
 
     def handle_audio_state(self, e):
         if e.data == "stopped":
-            time.sleep(0.5)
-            self.processar_audio()
+            if self.turnos.enviar(self.processar_audio, self.audio_path) is None:
+                apagar_gravacao(self.audio_path)
+                # Fora do callback do gravador: o TTS não pode segurar o evento
+                threading.Thread(target=self.falar_resposta, args=("Ainda estou processando. Repita em instantes.",),
+                                 daemon=True).start()
 
-    def processar_audio(self):
+    def processar_audio(self, turno, caminho):
         try:
-            if not os.path.exists(self.audio_path) or os.path.getsize(self.audio_path) < 1000:
-                self.falar_resposta("Não ouvi nada.")
+            # Espera o gravador fechar o arquivo (sem sleep fixo no callback do evento)
+            if not esperar_arquivo(caminho) or os.path.getsize(caminho) < 1000:
+                self.falar_resposta("Não ouvi nada.", turno)
                 return
 
-            with open(self.audio_path, "rb") as audio_file:
-                transcript = client.audio.transcriptions.create(
-                    model="whisper-1", file=audio_file, language="pt"
-                )
+            from core.preprocessamento_audio import preparar_audio  # numpy só na primeira gravação
+            with open(caminho, "rb") as audio_file:
+                arquivo = preparar_audio(audio_file.read())
+            if arquivo is None:  # só silêncio/ruído: não gasta uma chamada ao Whisper
+                self.falar_resposta("Não ouvi nada.", turno)
+                return
+
+            # Superado por uma gravação mais nova antes do Whisper: não paga a transcrição
+            if turno.cancelado:
+                return
+            transcript = cliente_openai().audio.transcriptions.create(
+                model="whisper-1", file=arquivo, language="pt"
+            )
             texto = transcript.text.strip()
 
             alucinacoes = ["Eaí?", "E aí?", "Amara.org", "Sous-titres", "MBC"]
             if texto in alucinacoes or len(texto) < 2:
-                self.falar_resposta("Não entendi. Pode repetir?")
+                self.falar_resposta("Não entendi. Pode repetir?", turno)
                 return
 
+            # Superado durante o Whisper: some sem aparecer no chat. Depois de aparecer, a fala
+            # segue até a extração (senão ficaria no chat sem resposta)
+            if turno.cancelado:
+                return
             self.add_message("Você", texto, align="right")
-            threading.Thread(target=self.extrair_dados, args=(texto,), daemon=True).start()
         except Exception as e:
-            self.falar_resposta("Erro de conexão.")
+            self.falar_resposta("Erro de conexão.", turno)
+            return
+        finally:
+            apagar_gravacao(caminho)
+        self.extrair_dados(turno, texto)
 
-    def extrair_dados(self, texto):
+    def extrair_dados(self, turno, texto):
         contexto_str = ""
-        if self.dados_parciais:
-            contexto_str = f"Dados parciais: {json.dumps(self.dados_parciais, ensure_ascii=False)}"
+        if self.lote:
+            contexto_str = f"Gastos parciais: {json.dumps(self.lote.itens, ensure_ascii=False)}"
 
         prompt = f"""
         Você é o MYND CFO. Extraia dados financeiros.
         {contexto_str}
         Frase: "{texto}"
-        JSON OBRIGATÓRIO: {{"item": null, "valor": null, "categoria": null, "pagamento": null, "recorrencia": "Único", "local_compra": null, "missing_info": null, "cancelar": false}}
+        JSON OBRIGATÓRIO: {ESQUEMA}
         Regras: Categoria "Compras" exige local_compra. Se faltar item, valor ou pagamento -> preencher missing_info.
+        {INSTRUCAO_LOTE}
+        {INSTRUCAO_CONFIANCA}
         """
         try:
-            response = client.chat.completions.create(
-                model="gpt-4-turbo",
-                messages=[{"role": "system", "content": prompt}],
-                response_format={"type": "json_object"}
-            )
-            dados_json = json.loads(response.choices[0].message.content)
+            # Respostas curtas ("débito", "trinta reais", "cancela") não precisam do GPT
+            # (elas completam o gasto pendente do lote)
+            dados_json = extrair_por_regras(texto, self.lote.pendente())
+            antecipada = None
+            if dados_json is None:
+                # Modelo por tipo de fala; a pergunta de follow-up vai ao TTS assim que sai do stream
+                dados_json, antecipada = obter_extrator().extrair(
+                    texto, self.lote.itens, prompt,
+                    ao_pergunta=lambda p: threading.Thread(target=self.falar_resposta, args=(p, turno), daemon=True).start()
+                )
 
             if dados_json.get("cancelar"):
-                self.dados_parciais = {}
-                self.falar_resposta("Cancelado.")
+                self.lote.esvaziar()
+                self.falar_resposta("Cancelado.", turno)
                 return
 
-            for k, v in dados_json.items():
-                if v is not None: self.dados_parciais[k] = v
-
-            if not self.dados_parciais.get("categoria"): self.dados_parciais["categoria"] = "Compras"
-            if not self.dados_parciais.get("recorrencia"): self.dados_parciais["recorrencia"] = "Único"
-
-            falta = dados_json.get("missing_info")
-            if not falta:
-                if not self.dados_parciais.get("item"):
-                    falta = "O que você comprou?"
-                elif not self.dados_parciais.get("valor"):
-                    falta = "Qual o valor?"
-                elif not self.dados_parciais.get("pagamento"):
-                    falta = "Qual o pagamento?"
-                elif self.dados_parciais.get("categoria") == "Compras" and not self.dados_parciais.get("local_compra"):
-                    falta = "Foi online ou loja física?"
+            # Cada gasto da fala é mesclado no seu item; as perguntas seguem um item por vez
+            self.lote.aplicar(dados_json)
+            falta = self.lote.pergunta()
+            if falta and dados_json.get("missing_info"):
+                falta = dados_json["missing_info"]
 
             if falta:
-                self.falar_resposta(falta)
+                if not antecipada:  # já perguntou neste turno (antes da escalada): não faz outra pergunta
+                    self.falar_resposta(falta, turno)
             else:
-                self.page.run_task(self.update_status, "Salvando...", "yellow")
-                sucesso, msg = salvar_gasto(self.dados_parciais)
+                # Todos completos: um único gravar para o lote inteiro
+                self.update_status("Salvando...", "yellow")
+                sucesso, msg = salvar_gastos(self.lote.itens)
                 if sucesso:
-                    self.falar_resposta(f"Salvo! {self.dados_parciais['item']} de {self.dados_parciais['valor']}.")
-                    self.dados_parciais = {}
+                    self.falar_resposta(f"Salvo! {self.lote.resumo()}.", turno)
+                    self.lote.esvaziar()
                 else:
-                    self.falar_resposta(f"Erro ao salvar: {msg}")
+                    self.falar_resposta(f"Erro ao salvar: {msg}", turno)
         except Exception as e:
-            self.falar_resposta("Erro na inteligência.")
+            self.falar_resposta("Erro na inteligência.", turno)
 
-    def falar_resposta(self, texto):
+    def falar_resposta(self, texto, turno=None):
         self.add_message("MYND", texto, align="left")
-        self.page.run_task(self.update_status, "Toque para falar", "white54")
-        if AUDIO_AVAILABLE:
+        self.update_status("Toque para falar", "white54")
+        # Turno superado por uma gravação mais nova: a resposta fica só no chat, sem áudio
+        if AUDIO_AVAILABLE and not (turno and turno.cancelado):
             try:
-                audio_gen = client_eleven.text_to_speech.convert(
-                    voice_id=os.getenv("VOICE_ID", "EXAVITQu4vr4xnSDxMaL"),
-                    text=texto,
-                    model_id="eleven_multilingual_v2",
-                    output_format="mp3_44100_128"
-                )
-                temp = os.path.join(tempfile.gettempdir(), "resp.mp3")
-                with open(temp, "wb") as f:
-                    for chunk in audio_gen: f.write(chunk)
-                self.audio_player.src = temp
-                self.audio_player.update()
-                self.audio_player.play()
+                # Frase repetida: toca direto do cache em disco, sem rede
+                chave = CacheTTS.chave(VOICE_ID, TTS_MODEL, TTS_FORMAT, texto)
+                em_cache = tts_cache.obter(chave)
+                if em_cache:
+                    self.trocar_resposta(None)
+                    self.tocar(em_cache)
+                    return
+
+                # Cada resposta tem seu arquivo: respostas sobrepostas não se corrompem
+                resposta = RespostaAudio(sintetizar(texto), ao_concluir=lambda c: tts_cache.guardar_arquivo(chave, c))
+                limpar_respostas_antigas()
+                if self.servidor_audio:
+                    src = self.servidor_audio.publicar(resposta)
+                    pronta = resposta.esperar_inicio()
+                else:
+                    src = resposta.caminho
+                    pronta = resposta.esperar_fim()
+                if not pronta:
+                    self.descartar_resposta(resposta)
+                    return
+                self.trocar_resposta(resposta)
+                self.tocar(src)
             except:
                 pass
 
-    def add_message(self, user, text, align):
+    def tocar(self, src):
+        self.audio_player.src = src
+        self.audio_player.update()
+        self.audio_player.play()
+
+    def trocar_resposta(self, nova):
+        with self.lock_resposta:
+            anterior, self.resposta_atual = self.resposta_atual, nova
+        if anterior is not None:
+            self.descartar_resposta(anterior)
+
+    def descartar_resposta(self, resposta):
+        if self.servidor_audio:
+            self.servidor_audio.remover(resposta)
+        else:
+            resposta.apagar()
+
+    def handle_player_state(self, e):
+        # Terminou de tocar: o arquivo da resposta não é mais necessário
+        if e.data == "completed":
+            with self.lock_resposta:
+                resposta, self.resposta_atual = self.resposta_atual, None
+            if resposta is not None:
+                self.descartar_resposta(resposta)
+
+    def criar_balao(self, mensagem):
+        user, text, align = mensagem
         bg = "#333333" if align == "left" else ft.Colors.BLUE_ACCENT
-        self.page.run_task(lambda: self.chat_view.controls.append(
-            ft.Row([ft.Container(content=ft.Text(text, color="white"), padding=10, border_radius=10, bgcolor=bg,
-                                 width=280)],
-                   alignment=ft.MainAxisAlignment.END if align == "right" else ft.MainAxisAlignment.START)
-        ))
-        self.page.run_task(lambda: self.chat_view.update())
-        self.page.run_task(lambda: self.chat_view.scroll_to(offset=-1, duration=300))
+        return ft.Row([ft.Container(content=ft.Text(text, color="white"), padding=10, border_radius=10, bgcolor=bg,
+                                    width=280)],
+                      alignment=ft.MainAxisAlignment.END if align == "right" else ft.MainAxisAlignment.START)
+
+    def add_message(self, user, text, align):
+        def aplicar():
+            self.historico.adicionar((user, text, align))
+            self.rolar_fim = True
+
+        self.canal.agendar(aplicar, self.chat_view)
+
+    def handle_scroll(self, e):
+        # Chegou perto do topo: traz o próximo lote de mensagens antigas
+        if e.pixels is None or e.pixels > 50 or not self.historico.antigas or self.carregando_antigas:
+            return
+        self.carregando_antigas = True
+
+        def aplicar():
+            self.historico.carregar_antigas()
+            self.carregando_antigas = False
+
+        self.canal.agendar(aplicar, self.chat_view)
+
+    def atualizar_tela(self, controles):
+        # Um único update por quadro com tudo o que mudou; o scroll vai junto, uma vez
+        self.page.update(*controles)
+        if self.rolar_fim:
+            self.rolar_fim = False
+            self.chat_view.scroll_to(offset=-1, duration=300)
 
     def update_status(self, msg, color):
-        self.status_text.value = msg
-        self.status_text.color = color
-        self.status_text.update()
+        def aplicar():
+            self.status_text.value = msg
+            self.status_text.color = color
+
+        self.canal.agendar(aplicar, self.status_text)
 
 
 def main(page: ft.Page):
@@ -1,21 +1,13 @@
 import streamlit as st
-import os
 import json
-import pandas as pd
-import tempfile
-import base64
-import requests
 import bcrypt
-import time  # <--- GARANTIDO AQUI
 from datetime import datetime  # <--- GARANTIDO AQUI
-import plotly.express as px
-from openai import OpenAI
-from audio_recorder_streamlit import audio_recorder
-from streamlit_lottie import st_lottie
-from streamlit_autorefresh import st_autorefresh
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-from googleapiclient.discovery import build
+from core.firebase_client import obter_cliente
+from core.assets import PipelineAssets
+from core.pool_planilhas import DriveGoogle, ProvisionadorPlanilhas
+from core.cota_google import AgendadorGoogle, LimiteGoogle
+# Os módulos pesados (pandas, plotly, openai, gspread, componentes) são importados
+# depois do login, em "ÁREA LOGADA": a tela de login só precisa de bcrypt e do Firebase.
 
 # ==========================================
 # CONFIGURAÇÃO INICIAL
@@ -24,18 +16,27 @@ st.set_page_config(page_title="MYND Finance", page_icon="assets/logo_header.png"
 
 
 # --- CARREGAMENTO DE ASSETS ---
-def get_base64_of_bin_file(bin_file):
+@st.cache_resource
+def assets():
+    # Imagens reduzidas/recomprimidas e animações lidas uma vez por processo
+    return PipelineAssets()
+
+
+def asset_src(nome, inline=False, **tamanho):
+    """src para <img>/CSS: pequenos vão inline; grandes por URL versionada do servidor estático."""
     try:
-        with open(bin_file, 'rb') as f:
-            data = f.read()
-        return base64.b64encode(data).decode()
-    except:
+        asset = assets().imagem(nome, **tamanho)
+        if inline or not st.get_option("server.enableStaticServing"):
+            return asset.data_uri()
+        return assets().publicar(asset)
+    except Exception as e:
+        print(f"❌ Erro no asset {nome}: {e}")
         return ""
 
 
-bg_img = get_base64_of_bin_file("assets/bg_mobile.png")
 carie_icon_path = "assets/carie.png"
-logo_img = get_base64_of_bin_file("assets/logo_header.png")
+logo_src = asset_src("logo_header.png", inline=True, altura_max=100)  # exibido com 35-50 px de altura
+LOTTIE_ROBOT_URL = "https://lottie.host/020d5e2e-2e4a-4497-b67e-2f943063f282/Gef2CSQ7Qh.json"
 
 # --- CONSTANTES ---
 # URL do Firebase
@@ -45,12 +46,18 @@ FIREBASE_URL = "https://mynd-e958a-default-rtdb.firebaseio.com/MYND_Finance"
 # IMPORTANTE: Você COMPARTILHOU essa planilha com o email do robô (client_email)?
 TEMPLATE_SHEET_ID = "1UyR7ng84daDRIm2pj2t_aBs62ROcypM3yP-nfz6djww"
 
+# Journal local da fila de gravação (sobrevive a restarts do app)
+JOURNAL_PATH = "mynd_webapp_journal.db"
+# Ledger local usado quando LEDGER_BACKEND = "sqlite" nos secrets
+LEDGER_DB_PATH = "mynd_webapp_ledger.db"
+
 
 # ==========================================
 # FUNÇÕES DE BACKEND (AUTH & DATA)
 # ==========================================
 
 def get_google_creds():
+    from oauth2client.service_account import ServiceAccountCredentials
     scope = [
         "https://www.googleapis.com/auth/spreadsheets",
         "https://www.googleapis.com/auth/drive"
@@ -62,49 +69,103 @@ def get_google_creds():
         return ServiceAccountCredentials.from_json_keyfile_name("credentials.json", scope)
 
 
+@st.cache_resource
+def agendador_google():
+    # Cota do Google compartilhada por todas as sessões: saves na frente do dashboard, backoff em 429/5xx
+    return AgendadorGoogle(st.secrets.get("GOOGLE_POR_MINUTO"))
+
+
+@st.cache_resource
+def registro_planilhas():
+    # Um único registro por processo: clientes e abas ficam abertos entre reruns e sessões
+    return RegistroPlanilhas(get_google_creds, agendador=agendador_google())
+
+
+@st.cache_resource
+def sincronizador():
+    # Guarda o ledger de cada planilha (LRU limitado em MB) e busca só as linhas novas
+    orcamento_mb = int(st.secrets.get("DASHBOARD_CACHE_MB", 256))
+    return SincronizadorPlanilha(registro_planilhas(), orcamento_bytes=orcamento_mb * 1024 * 1024)
+
+
+@st.cache_resource
+def leitor_ledger():
+    # Lê só as abas mensais do período pedido; meses fechados vêm da aba Resumo
+    return LeitorParticoes(sincronizador())
+
+
+@st.cache_resource
+def compactador():
+    # Migra o ledger antigo (aba 0) para as abas mensais e resume os meses fechados, em segundo plano
+    return Compactador(leitor_ledger())
+
+
+@st.cache_resource
+def fila_gravacao():
+    # Saves entram no journal e são enviados em lote; cada lote gravado força o delta sync da aba do mês
+    return FilaGravacao(registro_planilhas(), JOURNAL_PATH, ao_gravar=sincronizador().invalidar)
+
+
+def planilha_em_uso():
+    # A planilha é o ledger ou o espelho ativo (sem isso, nada de migrar/compactar por trás do SQLite)
+    return st.secrets.get("LEDGER_BACKEND", "sheets") != "sqlite" or st.secrets.get("SHEETS_MIRROR", True)
+
+
+@st.cache_resource
+def armazenamento():
+    # "sheets" (padrão): a planilha é o ledger. "sqlite": ledger local indexado, planilha como espelho opcional
+    if st.secrets.get("LEDGER_BACKEND", "sheets") == "sqlite":
+        espelho = fila_gravacao() if planilha_em_uso() else None
+        return ArmazenamentoSQLite(LEDGER_DB_PATH, espelho=espelho, origem=leitor_ledger().dados)
+    return ArmazenamentoSheets(fila_gravacao(), leitor_ledger())
+
+
 def firebase_db(path, method="GET", data=None):
-    url = f"{FIREBASE_URL}/{path}.json"
+    cliente = obter_cliente(FIREBASE_URL)
     try:
         if method == "GET":
-            response = requests.get(url)
-            return response.json() if response.status_code == 200 else None
+            return cliente.get(path)
         elif method == "PUT":
-            response = requests.put(url, json=data)
-            return response.json()
+            return cliente.put(path, data)
         elif method == "PATCH":
-            requests.patch(url, json=data)
-            return True
+            return cliente.patch(path, data)
     except Exception as e:
         print(f"Erro Firebase: {e}")
         return None
 
 
-def criar_planilha_usuario(username):
-    """Cria uma cópia da planilha modelo para o usuário"""
-    try:
-        creds = get_google_creds()
-        service = build('drive', 'v3', credentials=creds)
+@st.cache_resource
+def provisionador():
+    # Cópias da planilha modelo feitas em segundo plano; o primeiro login só reivindica uma
+    alvo = int(st.secrets.get("POOL_PLANILHAS", 3))
+    return ProvisionadorPlanilhas(DriveGoogle(get_google_creds, agendador_google()), obter_cliente(FIREBASE_URL),
+                                  TEMPLATE_SHEET_ID, alvo=alvo).iniciar()
 
-        # Copia o Template
-        body = {'name': f'MYND_Finance_{username}'}
 
+def criar_planilha_usuario(username):
+    """Planilha do usuário: uma do pool pré-copiado ou, com o pool vazio, uma cópia do modelo na hora"""
+    try:
+        sheet_id = provisionador().reivindicar(username)
+        if sheet_id:
+            return sheet_id
+    except Exception as e:
+        print(f"Erro pool de planilhas: {e}")
+    try:
         # Tenta copiar (Aqui dava o erro 404 se não compartilhado)
-        drive_response = service.files().copy(
-            fileId=TEMPLATE_SHEET_ID, body=body).execute()
-
-        new_sheet_id = drive_response.get('id')
-
-        # Opcional: Compartilhar a nova planilha com um email real (se tivermos)
         # Para simplificar, o robô é o dono e o app usa o robô para ler/escrever.
-
-        return new_sheet_id
+        return provisionador().drive.copiar(TEMPLATE_SHEET_ID, f'MYND_Finance_{username}')
     except Exception as e:
         st.error(f"Erro Drive API: {e}. Verifique se compartilhou o Template com o robô!")
         return None
 
 
 def autenticar(user, password):
-    user_data = firebase_db(f"users/{user}")
+    # Perfil (ou "não existe") fica em cache por alguns segundos: rajadas de tentativas não viram leituras remotas
+    try:
+        user_data = obter_cliente(FIREBASE_URL).get_cacheado(f"users/{user}")
+    except Exception as e:
+        print(f"Erro Firebase: {e}")
+        user_data = None
 
     if not user_data:
         return False, "Usuário não encontrado.", None
@@ -133,7 +194,8 @@ def autenticar(user, password):
             new_id = criar_planilha_usuario(user)
             if new_id:
                 user_data['sheet_id'] = new_id
-                firebase_db(f"users/{user}", "PATCH", {"sheet_id": new_id})
+                if firebase_db(f"users/{user}", "PATCH", {"sheet_id": new_id}):
+                    provisionador().concluir(new_id)  # já está no perfil: sai do pool
             else:
                 return False, "Falha ao criar planilha. Contate suporte.", None
 
@@ -141,9 +203,6 @@ def autenticar(user, password):
 
 
 def registrar(user, password, nome):
-    if firebase_db(f"users/{user}"):
-        return False, "Usuário já existe."
-
     hashed = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
 
     # CORREÇÃO DO ERRO DE TIME: Usando datetime agora
@@ -158,12 +217,17 @@ def registrar(user, password, nome):
         "created_at": data_hoje
     }
 
-    res = firebase_db(f"users/{user}", "PUT", new_user)
+    # "Cria se não existir" numa única escrita condicional (ETag nulo), sem GET antes
+    try:
+        criado = obter_cliente(FIREBASE_URL).criar_se_ausente(f"users/{user}", new_user)
+    except Exception as e:
+        print(f"Erro Firebase: {e}")
+        return False, "Erro ao conectar no banco."
 
-    if res:
+    if criado:
         return True, "Conta criada! Faça login."
     else:
-        return False, "Erro ao conectar no banco."
+        return False, "Usuário já existe."
 
 
 # ==========================================
@@ -197,6 +261,7 @@ st.markdown(f"""
 
     header, footer {{visibility: hidden;}}
     .block-container {{ padding-top: 10px; padding-bottom: 120px; }}
+    div[data-testid="stAudio"] {{ display: none; }}
     .stChatMessage {{ background-color: rgba(20, 20, 20, 0.85); border: 1px solid #333; }}
     div[data-testid="chatAvatarIcon-user"] {{ background-color: #00E5FF !important; color: black !important; }}
 
@@ -214,6 +279,8 @@ st.markdown(f"""
 # ==========================================
 # FLUXO DE LOGIN
 # ==========================================
+provisionador()  # o pool começa a encher já na primeira execução do processo
+
 if "logged_in" not in st.session_state:
     st.session_state.logged_in = False
     st.session_state.user_data = {}
@@ -221,7 +288,7 @@ if "logged_in" not in st.session_state:
 if not st.session_state.logged_in:
     st.markdown(f"""
     <div style="text-align:center; margin-top:40px; margin-bottom:20px;">
-        <img src="data:image/png;base64,{logo_img}" style="height:50px;">
+        <img src="{logo_src}" style="height:50px;">
         <h2 style="color:white; font-family:sans-serif; margin-top:10px;">MYND FINANCE</h2>
     </div>
     """, unsafe_allow_html=True)
@@ -265,34 +332,33 @@ if not st.session_state.logged_in:
 # ==========================================
 # ÁREA LOGADA
 # ==========================================
-SHEET_ID = st.session_state.user_data.get('sheet_id')
-
+import plotly.express as px
+from openai import OpenAI
+from audio_recorder_streamlit import audio_recorder
+from streamlit_lottie import st_lottie
+from streamlit_autorefresh import st_autorefresh
+from core.sheets_manager import RegistroPlanilhas
+from core.fila_gravacao import FilaGravacao
+from core.sincronizacao import SincronizadorPlanilha
+from core.particoes import Compactador, LeitorParticoes, ultimos_meses
+from core.armazenamento import ArmazenamentoSheets, ArmazenamentoSQLite, montar_linha
+from core.ingestao import achar_coluna, concatenar_tipado
+from core.pipeline_voz import MedidorEtapas, TurnoVoz
+from core.cache_tts import CacheTTS
+from core.extrator_regras import extrair_por_regras
+from core.extrator_gpt import ESQUEMA, INSTRUCAO_CONFIANCA, INSTRUCAO_LOTE, ExtratorGPT
+from core.lote_gastos import LoteGastos
+from core.preprocessamento_audio import preparar_audio
+from concurrent.futures import ThreadPoolExecutor
 
-@st.cache_data(ttl=10)
-def carregar_dados():
-    try:
-        creds = get_google_creds()
-        client_gs = gspread.authorize(creds)
-        sheet = client_gs.open_by_key(SHEET_ID).get_worksheet(0)
-        return pd.DataFrame(sheet.get_all_records())
-    except:
-        return pd.DataFrame()
+SHEET_ID = st.session_state.user_data.get('sheet_id')
 
 
-def salvar_na_nuvem(dados):
+def salvar_na_nuvem(gastos, ledger=None):
+    # `ledger` deve vir resolvido quando chamado fora da thread do script (pipeline de voz)
+    # Todos os gastos da fala num gravar só (um append_rows por mês na planilha)
     try:
-        creds = get_google_creds()
-        client_gs = gspread.authorize(creds)
-        sheet = client_gs.open_by_key(SHEET_ID).get_worksheet(0)
-
-        ts = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-        cat = dados.get("categoria")
-        if cat == "Compras" and dados.get("local_compra") == "Online": cat = "Compras Online"
-
-        row = [ts, dados.get("item"), dados.get("valor"), cat, dados.get("pagamento"),
-               dados.get("local_compra", ""), dados.get("recorrencia", "Único"), "App Nuvem"]
-        sheet.append_row(row)
-        carregar_dados.clear()
+        (ledger or armazenamento()).gravar(SHEET_ID, [montar_linha(d, status="App Nuvem") for d in gastos])
         return True, "Salvo!"
     except Exception as e:
         return False, str(e)
@@ -312,59 +378,193 @@ except:
 
 
 def transcrever(audio_bytes):
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as fp:
-        fp.write(audio_bytes)
-        fp_path = fp.name
+    # Mono 16 kHz sem silêncio nas pontas, em memória; gravação sem fala nem chega à API
+    arquivo = preparar_audio(audio_bytes)
+    if arquivo is None:
+        return ""
     try:
-        with open(fp_path, "rb") as audio_file:
-            transcript = client_ai.audio.transcriptions.create(model="whisper-1", file=audio_file, language="pt")
+        transcript = client_ai.audio.transcriptions.create(model="whisper-1", file=arquivo, language="pt")
         return transcript.text
     except:
         return ""
-    finally:
-        os.remove(fp_path)
+
+
+VOICE_ID = "EXAVITQu4vr4xnSDxMaL"
+TTS_MODEL = "eleven_multilingual_v2"
+TTS_FORMAT = "mp3_44100_128"
+
+
+def sintetizar(texto):
+    return client_eleven.text_to_speech.convert(voice_id=VOICE_ID, text=texto, model_id=TTS_MODEL,
+                                                output_format=TTS_FORMAT)
+
+
+@st.cache_resource
+def cache_tts():
+    # Um cache por processo; as respostas fixas são sintetizadas uma vez, em segundo plano
+    cache = CacheTTS()
+    if AUDIO_AVAILABLE:
+        cache.pre_aquecer(sintetizar, VOICE_ID, TTS_MODEL, TTS_FORMAT)
+    return cache
+
+
+tts_cache = cache_tts()  # resolvido aqui: falar também roda nas threads do pipeline de voz
 
 
 def falar(texto):
     if not AUDIO_AVAILABLE: return None
+    chave = CacheTTS.chave(VOICE_ID, TTS_MODEL, TTS_FORMAT, texto)
+    audio = tts_cache.ler(chave)
+    if audio:
+        return audio
     try:
-        voice_id = "EXAVITQu4vr4xnSDxMaL"
-        audio = client_eleven.text_to_speech.convert(voice_id=voice_id, text=texto, model_id="eleven_multilingual_v2")
-        return b"".join(chunk for chunk in audio)
+        audio = b"".join(chunk for chunk in sintetizar(texto))
+        tts_cache.guardar(chave, audio)
+        return audio
     except:
         return None
 
 
-def processar_gpt(texto):
-    if "dados" not in st.session_state: st.session_state.dados = {}
-    ctx = f"Dados parciais: {json.dumps(st.session_state.dados, ensure_ascii=False)}"
+@st.cache_resource
+def extrator_gpt():
+    return ExtratorGPT(client_ai)
+
+
+def processar_gpt(texto, ao_pergunta=None):
+    if "lote" not in st.session_state: st.session_state.lote = LoteGastos(exigir=("item", "valor"))
+    lote = st.session_state.lote
+    # Follow-up curto ("débito", "trinta reais", "cancela"): resolve sem ir ao GPT, no gasto pendente
+    regras = extrair_por_regras(texto, lote.pendente(), exigir=lote.exigir)
+    if regras is not None: return regras
+    ctx = f"Gastos parciais: {json.dumps(lote.itens, ensure_ascii=False)}"
     prompt = f"""You are Carie (MYND). Extract data. {ctx}. User: "{texto}".
-    JSON: {{"item":null,"valor":null,"categoria":null,"pagamento":null,"recorrencia":"Único","local_compra":null,"missing_info":null,"cancelar":false}}
-    Rules: 'Compras' needs local_compra. If missing info, ASK in 'missing_info' (Portuguese)."""
+    JSON: {ESQUEMA}
+    Rules: 'Compras' needs local_compra. If missing info, ASK in 'missing_info' (Portuguese). {INSTRUCAO_LOTE} {INSTRUCAO_CONFIANCA}"""
     try:
-        resp = client_ai.chat.completions.create(model="gpt-4-turbo", messages=[{"role": "system", "content": prompt}],
-                                                 response_format={"type": "json_object"})
-        return json.loads(resp.choices[0].message.content)
+        dados, _ = extrator_gpt().extrair(texto, lote.itens, prompt, ao_pergunta)
+        return dados
     except:
         return {}
 
 
-def load_lottieurl(url):
+@st.cache_resource
+def executor_voz():
+    # TTS das perguntas antecipadas pela extração roda aqui, fora da thread do script
+    return ThreadPoolExecutor(max_workers=8, thread_name_prefix="voz")
+
+
+@st.cache_resource
+def medidor_voz():
+    return MedidorEtapas()
+
+
+INTERVALO_SONDA = 30  # segundos entre sondas de mudança do painel
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def figura_categorias(por_categoria):
+    # Chaveada pelo hash da tabela: mesmos dados, mesma figura, sem remontar o plotly
+    col_cat, col_val = por_categoria.columns[:2]
+    fig = px.bar(por_categoria, x=col_cat, y=col_val,
+                 template="plotly_dark", color_continuous_scale=["#00E5FF", "#FF0055"], color=col_val)
+    fig.update_layout(paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)")
+    return fig
+
+
+# Período do painel -> quantidade de meses (None = histórico inteiro, com os resumos dos meses fechados)
+PERIODOS = {"Este mês": 1, "3 meses": 3, "12 meses": 12, "Tudo": None}
+TAMANHO_PAGINA = 10
+
+
+def paginas_painel(ledger, meses):
+    # Linhas da tabela por intervalo A1: a página mais recente, e as antigas só quando pedidas.
+    # Recomeça quando o ledger (revisão) ou o período mudam
+    chave = (SHEET_ID, tuple(meses or ()), st.session_state.get("revisao_painel"))
+    paginas = st.session_state.get("paginas_painel")
+    if not paginas or paginas["chave"] != chave:
+        linhas, cursor = ledger.pagina(SHEET_ID, TAMANHO_PAGINA, None, meses)
+        paginas = {"chave": chave, "linhas": linhas, "cursor": cursor}
+        st.session_state.paginas_painel = paginas
+    return paginas
+
+
+def carregar_antigas(ledger, meses):
+    paginas = st.session_state.paginas_painel
     try:
-        return requests.get(url).json()
+        antigas, paginas["cursor"] = ledger.pagina(SHEET_ID, TAMANHO_PAGINA, paginas["cursor"], meses)
+    except LimiteGoogle:
+        st.toast("O Google está limitando as leituras agora. Tente de novo em instantes.")
+        return
+    paginas["linhas"] = concatenar_tipado(antigas, paginas["linhas"])
+
+
+def desenhar_painel(ledger, meses=None):
+    try:
+        # Revisão anotada antes da leitura: uma mudança no meio dispara mais um redesenho, nunca menos
+        st.session_state.revisao_painel = ledger.revisao(SHEET_ID)
+        paginas = paginas_painel(ledger, meses)
+        recentes = paginas["linhas"]
+    except LimiteGoogle:
+        st.session_state.revisao_painel = None  # a sonda redesenha quando a cota voltar
+        st.warning("O Google está limitando as leituras agora. O painel tenta de novo em instantes.")
+        return
+    except Exception as e:
+        registro_planilhas().invalidar(SHEET_ID)
+        st.error(f"Erro ao ler a planilha: {e}")
+        return
+    if recentes.empty:
+        st.info("Planilha vazia." if meses is None else "Nenhum gasto no período.")
+        return
+    try:
+        # A tabela (só a página, por intervalo) sai primeiro; métrica e gráfico entram acima dela
+        # quando os rollups chegam: meses fechados vêm da aba Resumo, os abertos precisam das
+        # linhas do mês (sync completo na primeira vez, depois só delta)
+        topo = st.container()
+        col_data = achar_coluna(recentes, "data")
+        formato = {col_data: st.column_config.DatetimeColumn(format="DD/MM/YYYY HH:mm:ss")} if col_data else None
+        st.dataframe(recentes, use_container_width=True, hide_index=True, column_config=formato)
+        if paginas["cursor"] is not None:
+            st.button("Carregar mais antigos", on_click=carregar_antigas, args=(ledger, meses))
+
+        rollups = ledger.rollups(SHEET_ID, meses)
+        with topo:
+            st.metric("TOTAL GASTO", f"R$ {rollups.total:,.2f}")
+            por_categoria = rollups.tabela("categoria")
+            if not por_categoria.empty:
+                st.plotly_chart(figura_categorias(por_categoria), use_container_width=True)
+    except LimiteGoogle:
+        st.warning("O Google está limitando as leituras agora. O painel tenta de novo em instantes.")
     except:
-        return None
+        st.error("Erro dados")
 
 
-def limpar_moeda(v):
-    if isinstance(v, str):
-        v = v.replace('R$', '').replace(' ', '')
-        if '.' in v and ',' in v:
-            v = v.replace('.', '').replace(',', '.')
-        elif ',' in v:
-            v = v.replace(',', '.')
-        return v
-    return v
+def legenda_cota():
+    # Fila e contadores do agendador do Google, só depois que houve limitação
+    estado = agendador_google().estado()
+    contadores = estado["contadores"]
+    if contadores.get("429") or contadores.get("5xx") or contadores.get("esperas_esgotadas"):
+        fila = sum(estado["fila"].values())
+        st.caption(f"Google: {fila} na fila · {contadores.get('429', 0)} × 429 · {contadores.get('5xx', 0)} × 5xx"
+                   f" · {contadores.get('esperas', 0)} esperas · {contadores.get('desistencias', 0)} desistências")
+
+
+def _sondar_painel():
+    """Sonda no timer: compara a revisão do ledger (contagem/sentinela) com a do último desenho."""
+    try:
+        revisao = armazenamento().revisao(SHEET_ID)
+    except:
+        return
+    if revisao != st.session_state.get("revisao_painel"):
+        st.rerun()
+
+
+# Só a sonda roda a cada INTERVALO_SONDA; o painel inteiro só quando algo mudou
+sondar_painel = st.fragment(run_every=INTERVALO_SONDA)(_sondar_painel) if hasattr(st, "fragment") else None
+
+
+def formatar_tempos(tempos):
+    nomes = ["transcricao", "extracao", "gravacao", "tts", "primeiro_audio"]
+    return " · ".join(f"{n} {tempos[n]:.2f}s" for n in nomes if n in tempos)
 
 
 # --- APP START ---
@@ -372,7 +572,7 @@ col_h1, col_h2 = st.columns([4, 1])
 with col_h1:
     st.markdown(f"""
     <div style="display:flex; align-items:center; margin-bottom:10px;">
-        <img src="data:image/png;base64,{logo_img}" style="height:35px; margin-right:10px;">
+        <img src="{logo_src}" style="height:35px; margin-right:10px;">
         <h3 style="color:#00E5FF; margin:0;">MYND Finance</h3>
     </div>
     """, unsafe_allow_html=True)
@@ -390,12 +590,13 @@ if "msgs" not in st.session_state:
 tab1, tab2 = st.tabs(["💬 AGENTE", "📊 DASHBOARD"])
 
 with tab1:
+    bg_src = asset_src("bg_mobile.png", largura_max=1280, qualidade=70)
     st.markdown(
-        f"""<div style="position:fixed; top:0; left:0; width:100%; height:100%; background-image:url('data:image/png;base64,{bg_img}'); background-size:cover; z-index:0; pointer-events:none;"></div>""",
+        f"""<div style="position:fixed; top:0; left:0; width:100%; height:100%; background-image:url('{bg_src}'); background-size:cover; z-index:0; pointer-events:none;"></div>""",
         unsafe_allow_html=True)
 
     with st.container():
-        lottie_robot = load_lottieurl("https://lottie.host/020d5e2e-2e4a-4497-b67e-2f943063f282/Gef2CSQ7Qh.json")
+        lottie_robot = assets().lottie("lottie_robot.json", url=LOTTIE_ROBOT_URL)
         c1, c2 = st.columns([1, 2])
         with c1:
             if lottie_robot: st_lottie(lottie_robot, height=120, key="robot")
@@ -405,11 +606,21 @@ with tab1:
 
     st.markdown("---")
 
-    with st.container():
+    chat = st.container()
+    with chat:
         for msg in st.session_state.msgs:
             av = carie_icon_path if msg["role"] == "assistant" else None
             with st.chat_message(msg["role"], avatar=av): st.write(msg["content"])
 
+    audio_resposta = st.session_state.pop("audio_resposta", None)
+    if audio_resposta:
+        # Servido pelo endpoint de mídia do Streamlit, sem inflar a página com base64
+        st.audio(audio_resposta, format="audio/mpeg", autoplay=True)
+
+    if "tempos_turno" in st.session_state:
+        p50, p95, n = medidor_voz().resumo().get("primeiro_audio", (0, 0, 0))
+        st.caption(f"⏱ {formatar_tempos(st.session_state.tempos_turno)} | 1º áudio p50 {p50:.2f}s p95 {p95:.2f}s ({n})")
+
     st.write("##");
     st.write("##")
 
@@ -420,66 +631,67 @@ with tab1:
     if audio_bytes:
         if "last_audio" not in st.session_state or st.session_state.last_audio != audio_bytes:
             st.session_state.last_audio = audio_bytes
+            turno = TurnoVoz(executor_voz(), medidor_voz())
             with st.spinner("."):
-                txt = transcrever(audio_bytes)
+                txt = turno.etapa("transcricao", transcrever, audio_bytes)
             if txt and len(txt) > 2:
                 st.session_state.msgs.append({"role": "user", "content": txt})
-                dados = processar_gpt(txt)
+                # Mostra a transcrição já, antes da extração
+                with chat:
+                    with st.chat_message("user"): st.write(txt)
+                # Pergunta de follow-up que já saiu do stream do GPT vai para o TTS antes do fim da extração
+                antecipadas = {}
+
+                def antecipar(pergunta):
+                    antecipadas[pergunta] = turno.em_paralelo("tts", falar, pergunta)
+
+                dados = turno.etapa("extracao", processar_gpt, txt, antecipar)
+                lote = st.session_state.lote
+                sintese = None
                 if dados.get("cancelar"):
-                    st.session_state.dados = {};
+                    lote.esvaziar();
                     resp = "Cancelado."
                 else:
-                    for k, v in dados.items():
-                        if v: st.session_state.dados[k] = v
-                    falta = dados.get("missing_info")
-                    if not falta:
-                        if not st.session_state.dados.get("item"):
-                            falta = "Item?"
-                        elif not st.session_state.dados.get("valor"):
-                            falta = "Valor?"
+                    # Vários gastos na mesma fala: cada um é completado por vez e o lote é gravado junto
+                    lote.aplicar(dados)
+                    falta = lote.pergunta()
+                    if falta and dados.get("missing_info"):
+                        falta = dados["missing_info"]
+                    if falta and antecipadas:
+                        falta = next(iter(antecipadas))  # a pergunta que já está sendo sintetizada
                     if falta:
                         resp = falta
+                        sintese = antecipadas.get(falta)
                     else:
-                        ok, m = salvar_na_nuvem(st.session_state.dados)
+                        # A gravação é write-behind (só o journal local): a confirmação só é
+                        # sintetizada depois dela, para nunca tocar "Salvo" de um save que falhou
+                        ok, m = turno.etapa("gravacao", salvar_na_nuvem, [dict(g) for g in lote.itens],
+                                            armazenamento())
                         if ok:
-                            resp = f"Salvo: {st.session_state.dados['item']}"
-                            st.session_state.dados = {};
+                            resp = f"Salvo: {', '.join(str(g['item']) for g in lote.itens)}"
+                            lote.esvaziar();
                             st.balloons()
                         else:
                             resp = f"Erro: {m}"
                 st.session_state.msgs.append({"role": "assistant", "content": resp})
-                mp3 = falar(resp)
-                if mp3:
-                    b64 = base64.b64encode(mp3).decode()
-                    st.markdown(
-                        f"""<audio autoplay="true"><source src="data:audio/mp3;base64,{b64}" type="audio/mp3"></audio>""",
-                        unsafe_allow_html=True)
+                mp3 = sintese.result() if sintese else turno.etapa("tts", falar, resp)
+                turno.marcar("primeiro_audio")
+                st.session_state.tempos_turno = turno.concluir()
+                # Toca depois do rerun (antes o elemento sumia junto com a execução)
+                st.session_state.audio_resposta = mp3
                 st.rerun()
 
 with tab2:
     st.markdown('<div style="position:relative; z-index:10;">', unsafe_allow_html=True)
-    st_autorefresh(interval=30000)
-    df = carregar_dados()
-    if not df.empty:
-        try:
-            cols = df.columns.tolist()
-            col_val = next((c for c in cols if "valor" in c.lower()), None)
-            col_cat = next((c for c in cols if "categoria" in c.lower()), None)
-            if col_val:
-                df[col_val] = df[col_val].apply(limpar_moeda)
-                df[col_val] = pd.to_numeric(df[col_val], errors='coerce').fillna(0)
-                total = df[col_val].sum()
-                st.metric("TOTAL GASTO", f"R$ {total:,.2f}")
-
-                if col_cat:
-                    fig = px.bar(df.groupby(col_cat)[col_val].sum().reset_index(), x=col_cat, y=col_val,
-                                 template="plotly_dark", color_continuous_scale=["#00E5FF", "#FF0055"], color=col_val)
-                    fig.update_layout(paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)")
-                    st.plotly_chart(fig, use_container_width=True)
-
-                st.dataframe(df.tail(10), use_container_width=True, hide_index=True)
-        except:
-            st.error("Erro dados")
+    ledger = armazenamento()
+    if planilha_em_uso():
+        compactador().agendar(SHEET_ID)  # no máximo uma vez por hora por ledger
+    periodo = st.radio("Período", list(PERIODOS), horizontal=True, label_visibility="collapsed")
+    meses = ultimos_meses(PERIODOS[periodo]) if PERIODOS[periodo] else None
+    if sondar_painel is not None:
+        sondar_painel()  # timer leve: o app só reexecuta quando o ledger mudou
     else:
-        st.info("Planilha vazia.")
-    st.markdown('</div>', unsafe_allow_html=True)
\ No newline at end of file
+        st_autorefresh(interval=INTERVALO_SONDA * 1000)  # Streamlit sem st.fragment
+    desenhar_painel(ledger, meses)
+    legenda_cota()
+    st.markdown('</div>', unsafe_allow_html=True)